@@ -1,9 +1,11 @@
 """ATS (Applicant Tracking System) analysis endpoints."""
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from typing import Literal, Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query, status
 from fastapi.responses import Response
 
-from app.core.security import get_current_user
+from app.core.security import get_current_user, require_quota
 from app.schemas.ats import (
     ATSAnalyzeRequest,
     ATSAnalysisResult,
@@ -19,7 +21,7 @@ router = APIRouter()
 @router.post("/analyze", response_model=ATSAnalysisResult)
 async def analyze_cv(
     body: ATSAnalyzeRequest,
-    user: dict = Depends(get_current_user),
+    user: dict = Depends(require_quota("ats_analyses")),
 ):
     """Analyze a CV against a job description for ATS compatibility."""
     import asyncio
@@ -142,7 +144,7 @@ async def apply_changes(
 @router.post("/fetch-job", response_model=JobPostingData)
 async def fetch_job(
     body: FetchJobRequest,
-    user: dict = Depends(get_current_user),
+    user: dict = Depends(require_quota("imports")),
 ):
     """Fetch and parse a job posting from a URL."""
     try:
@@ -267,27 +269,50 @@ async def download_optimized(
         raise HTTPException(status_code=404, detail="CV not found")
 
     # ── 2. Get original PDF bytes (Firebase Storage → ReportLab fallback) ────
-    # NOTE: blob.exists() and blob.download_as_bytes() are synchronous blocking
+    # NOTE: blob.reload() and blob.download_as_bytes() are synchronous blocking
     # calls — run them in a thread to avoid blocking the asyncio event loop.
+    # Originals are indexed once per blob generation: repeat downloads with a
+    # different selection of changes skip the download and text extraction.
+    from app.services.pdf.ats_modifier import cached_document, prepare_document
+
     pdf_bytes: bytes | None = None
+    prepared = None
+    doc_key: tuple | None = None
     if _settings.FIREBASE_STORAGE_BUCKET:
         try:
+            from google.api_core.exceptions import NotFound
             from app.core.firebase import get_storage_bucket
             bucket = get_storage_bucket()
             blob = bucket.blob(f"cvs/{user['uid']}/{body.cv_id}/original.pdf")
-            blob_exists = await asyncio.to_thread(blob.exists)
-            if blob_exists:
-                pdf_bytes = await asyncio.to_thread(blob.download_as_bytes)
+            try:
+                await asyncio.to_thread(blob.reload)  # metadata only
+            except NotFound:
+                pass
+            else:
+                doc_key = (user["uid"], body.cv_id, blob.generation)
+                prepared = cached_document(doc_key)
+                if prepared is None:
+                    pdf_bytes = await asyncio.to_thread(blob.download_as_bytes)
         except Exception as exc:
             _log.warning("Could not fetch original PDF from Storage: %s", exc)
 
-    if pdf_bytes is None:
+    if prepared is None and pdf_bytes is None:
         # No original stored — generate with ReportLab
-        from app.services.pdf.generator import generate_cv_pdf
+        from app.services.pdf.generator import cv_render_key, generate_cv_pdf
+        from app.services.pdf.render_pool import RenderQueueFull, RenderTimeout
         try:
-            pdf_bytes = await generate_cv_pdf(cv)
+            # Uncompacted: the output mode is applied once, after the edits
+            pdf_bytes = await generate_cv_pdf(cv, "standard")
+        except RenderQueueFull as exc:
+            raise HTTPException(status_code=503, detail=str(exc))
+        except RenderTimeout as exc:
+            raise HTTPException(status_code=504, detail=str(exc))
         except Exception as exc:
             raise HTTPException(status_code=500, detail=f"PDF generation failed: {exc}")
+        doc_key = ("render", cv_render_key(cv))
+
+    if prepared is not None:
+        pdf_bytes = prepared.pdf_bytes
 
     # ── 3. Build list of accepted DiffChange dicts ───────────────────────────
     accepted_diffs = [
@@ -299,17 +324,33 @@ async def download_optimized(
     # ── 4. Apply in-place modifications with PyMuPDF ─────────────────────────
     # Run in a thread: apply_ats_to_pdf is CPU-bound (synchronous PyMuPDF ops)
     # that would block the event loop if called directly.
+    from app.services.pdf.output import optimize_pdf, resolve_output
+    output = resolve_output(body.output)
+    modified = False
     if accepted_diffs or body.added_keywords:
         try:
             from app.services.pdf.ats_modifier import apply_ats_to_pdf
+            if prepared is None:
+                prepared = await asyncio.to_thread(prepare_document, doc_key, pdf_bytes)
             pdf_bytes = await asyncio.to_thread(
-                apply_ats_to_pdf, pdf_bytes, accepted_diffs, list(body.added_keywords)
+                apply_ats_to_pdf,
+                prepared.pdf_bytes,
+                accepted_diffs,
+                list(body.added_keywords),
+                prepared.index,
+                output,
             )
+            modified = True
         except Exception as exc:
             _log.warning(
                 "PyMuPDF modification failed, serving unmodified PDF: %s", exc
             )
             # Non-fatal: serve the original (or ReportLab) PDF unchanged
+    if not modified:
+        try:
+            pdf_bytes = await asyncio.to_thread(optimize_pdf, pdf_bytes, output, "ats")
+        except Exception as exc:
+            _log.warning("PDF compaction failed, serving it as is: %s", exc)
 
     # ── 5. Return ────────────────────────────────────────────────────────────
     title = (cv.get("title") or "cv").replace('"', "").replace("'", "")
@@ -328,12 +369,14 @@ async def download_optimized(
 @router.get("/download-tailored")
 async def download_tailored(
     cv_id: str,
+    output: Optional[Literal["standard", "compact", "web"]] = Query(None, description="PDF output mode"),
     user: dict = Depends(get_current_user),
 ):
     """Generate and download a tailored PDF CV optimized for the job description."""
     import asyncio
     from app.services.firebase.cv_service import get_cv
     from app.services.pdf.generator import generate_cv_pdf
+    from app.services.pdf.render_pool import RenderQueueFull, RenderTimeout
 
     try:
         cv = await asyncio.to_thread(get_cv, user["uid"], cv_id)
@@ -344,7 +387,11 @@ async def download_tailored(
         raise HTTPException(status_code=404, detail="CV not found")
 
     try:
-        pdf_bytes = await generate_cv_pdf(cv)
+        pdf_bytes = await generate_cv_pdf(cv, output)
+    except RenderQueueFull as exc:
+        raise HTTPException(status_code=503, detail=str(exc))
+    except RenderTimeout as exc:
+        raise HTTPException(status_code=504, detail=str(exc))
     except Exception as exc:
         raise HTTPException(status_code=500, detail=f"PDF generation failed: {exc}")
 
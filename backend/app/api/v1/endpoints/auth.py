@@ -1,7 +1,9 @@
 """Authentication endpoints: signup, login, OAuth, refresh, verify-email."""
 
-from fastapi import APIRouter, HTTPException, status
+import httpx
+from fastapi import APIRouter, Depends, HTTPException, status
 
+from app.core.http import get_http_client, post_json
 from app.schemas.auth import (
     SignupRequest,
     LoginRequest,
@@ -12,6 +14,9 @@ from app.schemas.auth import (
 
 router = APIRouter()
 
+IDENTITY_TOOLKIT_URL = "https://identitytoolkit.googleapis.com/v1"
+SECURE_TOKEN_URL = "https://securetoken.googleapis.com/v1"
+
 
 @router.post("/signup", response_model=AuthResponse, status_code=status.HTTP_201_CREATED)
 async def signup(body: SignupRequest):
@@ -58,19 +63,18 @@ async def signup(body: SignupRequest):
 
 
 @router.post("/login", response_model=AuthResponse)
-async def login(body: LoginRequest):
+async def login(body: LoginRequest, http: httpx.AsyncClient = Depends(get_http_client)):
     """Verify credentials with Firebase Auth and return a token."""
     try:
-        import requests
         from app.core.config import settings
 
         # Use Firebase REST API to sign in with email/password
-        url = f"https://identitytoolkit.googleapis.com/v1/accounts:signInWithPassword?key={settings.FIREBASE_API_KEY}"
-        resp = requests.post(url, json={
+        url = f"{IDENTITY_TOOLKIT_URL}/accounts:signInWithPassword?key={settings.FIREBASE_API_KEY}"
+        resp = await post_json(http, url, {
             "email": body.email,
             "password": body.password,
             "returnSecureToken": True,
-        }, timeout=10)
+        })
 
         if resp.status_code != 200:
             raise HTTPException(
@@ -181,17 +185,16 @@ async def linkedin_oauth(body: OAuthRequest):
 
 
 @router.post("/refresh")
-async def refresh_token(body: RefreshRequest):
+async def refresh_token(body: RefreshRequest, http: httpx.AsyncClient = Depends(get_http_client)):
     """Refresh a Firebase token using the refresh_token."""
     try:
-        import requests
         from app.core.config import settings
 
-        url = f"https://securetoken.googleapis.com/v1/token?key={settings.FIREBASE_API_KEY}"
-        resp = requests.post(url, json={
+        url = f"{SECURE_TOKEN_URL}/token?key={settings.FIREBASE_API_KEY}"
+        resp = await post_json(http, url, {
             "grant_type": "refresh_token",
             "refresh_token": body.refresh_token,
-        }, timeout=10)
+        })
 
         if resp.status_code != 200:
             raise HTTPException(
@@ -215,19 +218,18 @@ async def refresh_token(body: RefreshRequest):
 
 
 @router.post("/verify-email", status_code=status.HTTP_200_OK)
-async def verify_email(body: LoginRequest):
+async def verify_email(body: LoginRequest, http: httpx.AsyncClient = Depends(get_http_client)):
     """Send a verification email to the user."""
     try:
-        import requests
         from app.core.config import settings
 
         # First sign in to get the id_token
-        url = f"https://identitytoolkit.googleapis.com/v1/accounts:signInWithPassword?key={settings.FIREBASE_API_KEY}"
-        resp = requests.post(url, json={
+        url = f"{IDENTITY_TOOLKIT_URL}/accounts:signInWithPassword?key={settings.FIREBASE_API_KEY}"
+        resp = await post_json(http, url, {
             "email": body.email,
             "password": body.password,
             "returnSecureToken": True,
-        }, timeout=10)
+        })
 
         if resp.status_code != 200:
             raise HTTPException(
@@ -237,12 +239,13 @@ async def verify_email(body: LoginRequest):
 
         id_token = resp.json()["idToken"]
 
-        # Send verification email
-        verify_url = f"https://identitytoolkit.googleapis.com/v1/accounts:sendOobCode?key={settings.FIREBASE_API_KEY}"
-        verify_resp = requests.post(verify_url, json={
+        # Send verification email (not retried: a timed-out attempt may
+        # still have sent it)
+        verify_url = f"{IDENTITY_TOOLKIT_URL}/accounts:sendOobCode?key={settings.FIREBASE_API_KEY}"
+        verify_resp = await post_json(http, verify_url, {
             "requestType": "VERIFY_EMAIL",
             "idToken": id_token,
-        }, timeout=10)
+        }, retries=0)
 
         if verify_resp.status_code != 200:
             raise HTTPException(
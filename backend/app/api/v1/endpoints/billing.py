@@ -1,8 +1,9 @@
 """Billing and subscription endpoints: plan, checkout, webhook, history, portal."""
 
-from fastapi import APIRouter, Depends, HTTPException, Request, status
-from typing import List
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Query, Request, status
+from typing import List, Optional
 
+from app.core.plans import PLAN_FEATURES
 from app.core.security import get_current_user
 from app.schemas.billing import (
     CurrentPlan,
@@ -16,72 +17,6 @@ from app.schemas.billing import (
 router = APIRouter()
 
 
-# ---------------------------------------------------------------------------
-# Plan feature definitions
-# ---------------------------------------------------------------------------
-
-PLAN_FEATURES = {
-    "free": {
-        "price": 0,
-        "features": [
-            "1 CV",
-            "Basic ATS analysis",
-            "3 AI improvements/month",
-            "1 cover letter/month",
-            "Basic templates",
-        ],
-        "limits": {
-            "cvs": 1,
-            "ai_improvements": 3,
-            "cover_letters": 1,
-            "interview_sessions": 2,
-            "ats_analyses": 3,
-        },
-    },
-    "starter": {
-        "price": 9.99,
-        "features": [
-            "5 CVs",
-            "Full ATS analysis",
-            "25 AI improvements/month",
-            "10 cover letters/month",
-            "All templates",
-            "Interview practice",
-            "Job tracker",
-        ],
-        "limits": {
-            "cvs": 5,
-            "ai_improvements": 25,
-            "cover_letters": 10,
-            "interview_sessions": 10,
-            "ats_analyses": 20,
-        },
-    },
-    "pro": {
-        "price": 19.99,
-        "features": [
-            "Unlimited CVs",
-            "Full ATS analysis",
-            "Unlimited AI improvements",
-            "Unlimited cover letters",
-            "All templates",
-            "Interview practice",
-            "Job tracker",
-            "Market intelligence",
-            "LinkedIn optimizer",
-            "Priority support",
-        ],
-        "limits": {
-            "cvs": -1,  # unlimited
-            "ai_improvements": -1,
-            "cover_letters": -1,
-            "interview_sessions": -1,
-            "ats_analyses": -1,
-        },
-    },
-}
-
-
 # ---------------------------------------------------------------------------
 # Endpoints
 # ---------------------------------------------------------------------------
@@ -90,6 +25,7 @@ PLAN_FEATURES = {
 async def get_current_plan(user: dict = Depends(get_current_user)):
     """Get the current user's plan, features, and usage."""
     try:
+        from app.services.firebase.usage_service import get_usage, next_reset
         from app.services.firebase.user_service import get_user
 
         profile = get_user(user["uid"])
@@ -103,13 +39,12 @@ async def get_current_plan(user: dict = Depends(get_current_user)):
         plan_info = PLAN_FEATURES.get(plan_name, PLAN_FEATURES["free"])
         limits = plan_info["limits"]
 
-        # Get current usage from Firestore
+        # Usage for the current period (includes counts not yet flushed)
         try:
-            from app.core.firebase import get_db
+            from app.services.firebase.cv_service import count_cvs
 
-            db = get_db()
-            usage_doc = db.collection("users").document(user["uid"]).collection("usage").document("current").get()
-            usage_data = usage_doc.to_dict() if usage_doc.exists else {}
+            usage_data = get_usage(user["uid"])
+            usage_data["cvs"] = count_cvs(user["uid"])
         except Exception:
             usage_data = {}
 
@@ -121,6 +56,8 @@ async def get_current_plan(user: dict = Depends(get_current_user)):
             "cover_letters": "Cover letters",
             "interview_sessions": "Interview sessions",
             "ats_analyses": "ATS analyses",
+            "market_insights": "Market insights",
+            "imports": "Imports (CVs, jobs, LinkedIn)",
         }
 
         for key, label in usage_map.items():
@@ -145,7 +82,7 @@ async def get_current_plan(user: dict = Depends(get_current_user)):
             next_billing_date=profile.get("next_billing_date"),
             features=plan_info["features"],
             usage=usage_items,
-            usage_reset_date=profile.get("usage_reset_date"),
+            usage_reset_date=next_reset(),
         )
     except HTTPException:
         raise
@@ -164,9 +101,7 @@ async def create_checkout(
     """Create a Stripe checkout session for plan upgrade."""
     try:
         from app.core.config import settings
-        import stripe
-
-        stripe.api_key = settings.STRIPE_SECRET_KEY
+        from app.services.stripe.stripe_service import get_client
 
         # Map plan to Stripe price IDs
         price_map = {
@@ -183,20 +118,20 @@ async def create_checkout(
                 detail=f"Invalid plan/billing combination: {body.plan}/{body.billing_cycle}",
             )
 
-        session = stripe.checkout.Session.create(
-            mode="subscription",
-            payment_method_types=["card"],
-            line_items=[{"price": price_id, "quantity": 1}],
-            success_url=f"{settings.FRONTEND_URL}/settings/billing?success=true",
-            cancel_url=f"{settings.FRONTEND_URL}/settings/billing?canceled=true",
-            client_reference_id=user["uid"],
-            customer_email=user.get("email"),
-            metadata={
+        session = await get_client().checkout.sessions.create_async(params={
+            "mode": "subscription",
+            "payment_method_types": ["card"],
+            "line_items": [{"price": price_id, "quantity": 1}],
+            "success_url": f"{settings.FRONTEND_URL}/settings/billing?success=true",
+            "cancel_url": f"{settings.FRONTEND_URL}/settings/billing?canceled=true",
+            "client_reference_id": user["uid"],
+            "customer_email": user.get("email"),
+            "metadata": {
                 "uid": user["uid"],
                 "plan": body.plan,
                 "billing_cycle": body.billing_cycle,
             },
-        )
+        })
 
         return CheckoutResponse(
             checkout_url=session.url,
@@ -212,13 +147,19 @@ async def create_checkout(
 
 
 @router.post("/webhook", status_code=status.HTTP_200_OK)
-async def stripe_webhook(request: Request):
-    """Handle Stripe webhook events (no auth, uses Stripe signature verification)."""
+async def stripe_webhook(request: Request, background_tasks: BackgroundTasks):
+    """Handle Stripe webhook events (no auth, uses Stripe signature verification).
+
+    The verified event is recorded in the ``stripe_events`` ledger keyed by
+    its id and acknowledged right away; the Firestore updates run in the
+    background.  Stripe retries of an already recorded event are no-ops.
+    """
     try:
         from app.core.config import settings
+        from app.services.firebase.billing_service import record_event
+        from app.services.stripe.stripe_service import process_event
         import stripe
 
-        stripe.api_key = settings.STRIPE_SECRET_KEY
         payload = await request.body()
         sig_header = request.headers.get("stripe-signature", "")
 
@@ -232,59 +173,10 @@ async def stripe_webhook(request: Request):
                 detail="Invalid webhook signature",
             )
 
-        event_type = event["type"]
-        data = event["data"]["object"]
-
-        if event_type == "checkout.session.completed":
-            uid = data.get("client_reference_id") or data.get("metadata", {}).get("uid")
-            plan = data.get("metadata", {}).get("plan", "starter")
-            billing_cycle = data.get("metadata", {}).get("billing_cycle", "monthly")
-
-            if uid:
-                from app.services.firebase.user_service import update_user
-
-                update_user(uid, {
-                    "plan": plan,
-                    "billing_cycle": billing_cycle,
-                    "stripe_customer_id": data.get("customer"),
-                    "stripe_subscription_id": data.get("subscription"),
-                })
-
-        elif event_type == "customer.subscription.deleted":
-            # Downgrade to free
-            customer_id = data.get("customer")
-            if customer_id:
-                try:
-                    from app.core.firebase import get_db
-
-                    db = get_db()
-                    users = db.collection("users").where("stripe_customer_id", "==", customer_id).limit(1).stream()
-                    for user_doc in users:
-                        user_doc.reference.update({"plan": "free"})
-                except Exception:
-                    pass
-
-        elif event_type == "invoice.paid":
-            # Record invoice
-            customer_id = data.get("customer")
-            if customer_id:
-                try:
-                    from app.core.firebase import get_db
-
-                    db = get_db()
-                    users = db.collection("users").where("stripe_customer_id", "==", customer_id).limit(1).stream()
-                    for user_doc in users:
-                        user_doc.reference.collection("invoices").add({
-                            "stripe_invoice_id": data.get("id"),
-                            "amount": data.get("amount_paid", 0) / 100,
-                            "currency": data.get("currency", "usd"),
-                            "status": "paid",
-                            "date": data.get("created"),
-                            "pdf_url": data.get("invoice_pdf"),
-                        })
-                except Exception:
-                    pass
+        if not record_event(event["id"], event["type"], payload.decode("utf-8")):
+            return {"status": "duplicate"}
 
+        background_tasks.add_task(process_event, event["id"])
         return {"status": "ok"}
     except HTTPException:
         raise
@@ -296,32 +188,26 @@ async def stripe_webhook(request: Request):
 
 
 @router.get("/history", response_model=List[Invoice])
-async def get_billing_history(user: dict = Depends(get_current_user)):
-    """List billing invoices for the current user."""
+async def get_billing_history(
+    limit: int = Query(20, ge=1, le=100),
+    starting_after: Optional[str] = Query(None, description="Id of the last invoice of the previous page"),
+    user: dict = Depends(get_current_user),
+):
+    """List billing invoices for the current user from the local ledger, newest first."""
     try:
-        from app.core.firebase import get_db
-
-        db = get_db()
-        docs = (
-            db.collection("users")
-            .document(user["uid"])
-            .collection("invoices")
-            .order_by("date", direction="DESCENDING")
-            .stream()
-        )
-
-        invoices = []
-        for doc in docs:
-            data = doc.to_dict()
-            invoices.append(Invoice(
-                id=doc.id,
-                date=str(data.get("date", "")),
-                amount=data.get("amount", 0),
-                currency=data.get("currency", "usd"),
-                status=data.get("status", "paid"),
-                pdf_url=data.get("pdf_url"),
-            ))
-        return invoices
+        from app.services.firebase.billing_service import list_invoices
+
+        return [
+            Invoice(
+                id=item["id"],
+                date=str(item.get("date", "")),
+                amount=item.get("amount", 0),
+                currency=item.get("currency", "usd"),
+                status=item.get("status", "paid"),
+                pdf_url=item.get("pdf_url"),
+            )
+            for item in list_invoices(user["uid"], limit=limit, starting_after=starting_after)
+        ]
     except Exception as exc:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -335,9 +221,7 @@ async def create_portal_session(user: dict = Depends(get_current_user)):
     try:
         from app.core.config import settings
         from app.services.firebase.user_service import get_user
-        import stripe
-
-        stripe.api_key = settings.STRIPE_SECRET_KEY
+        from app.services.stripe.stripe_service import get_client
 
         profile = get_user(user["uid"])
         if profile is None:
@@ -353,10 +237,10 @@ async def create_portal_session(user: dict = Depends(get_current_user)):
                 detail="No active subscription found. Please subscribe first.",
             )
 
-        session = stripe.billing_portal.Session.create(
-            customer=customer_id,
-            return_url=f"{settings.FRONTEND_URL}/settings/billing",
-        )
+        session = await get_client().billing_portal.sessions.create_async(params={
+            "customer": customer_id,
+            "return_url": f"{settings.FRONTEND_URL}/settings/billing",
+        })
 
         return PortalResponse(portal_url=session.url)
     except HTTPException:
@@ -4,12 +4,13 @@ from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.responses import Response
 from typing import List
 
-from app.core.security import get_current_user
+from app.core.security import get_current_user, require_quota
 from app.schemas.cover_letter import (
     CoverLetterGenerateRequest,
     CoverLetterRewriteRequest,
     CoverLetterContent,
     CoverLetterVersion,
+    CoverLetterVersionDetail,
     CoverLetterDownloadRequest,
 )
 
@@ -19,7 +20,7 @@ router = APIRouter()
 @router.post("/generate", response_model=CoverLetterContent)
 async def generate_cover_letter(
     body: CoverLetterGenerateRequest,
-    user: dict = Depends(get_current_user),
+    user: dict = Depends(require_quota("cover_letters")),
 ):
     """Generate a cover letter based on CV content and a job description."""
     try:
@@ -91,7 +92,7 @@ async def generate_cover_letter(
 @router.post("/rewrite-paragraph")
 async def rewrite_paragraph(
     body: CoverLetterRewriteRequest,
-    user: dict = Depends(get_current_user),
+    user: dict = Depends(require_quota("ai_improvements")),
 ):
     """Rewrite a specific paragraph of a cover letter."""
     try:
@@ -117,33 +118,15 @@ async def save_version(
 ):
     """Save the current state of a cover letter as a version."""
     try:
-        from app.core.firebase import get_db
-        from datetime import datetime
+        from app.services.firebase.cover_letter_service import save_version as _save_version
 
-        db = get_db()
-        cl_ref = db.collection("users").document(user["uid"]).collection("cover_letters").document(cl_id)
-        cl_doc = cl_ref.get()
-
-        if not cl_doc.exists:
+        version = _save_version(user["uid"], cl_id)
+        if version is None:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail="Cover letter not found",
             )
-
-        cl_data = cl_doc.to_dict()
-        version_data = {
-            "paragraphs": cl_data.get("paragraphs", []),
-            "tone": cl_data.get("tone", "professional"),
-            "created_at": datetime.utcnow().isoformat(),
-        }
-
-        _, version_ref = cl_ref.collection("versions").add(version_data)
-
-        return CoverLetterVersion(
-            id=version_ref.id,
-            tone=version_data["tone"],
-            created_at=version_data["created_at"],
-        )
+        return CoverLetterVersion(**version)
     except HTTPException:
         raise
     except Exception as exc:
@@ -160,27 +143,14 @@ async def list_versions(
 ):
     """List all saved versions of a cover letter."""
     try:
-        from app.core.firebase import get_db
+        from app.services.firebase.cover_letter_service import list_versions as _list_versions
 
-        db = get_db()
-        cl_ref = db.collection("users").document(user["uid"]).collection("cover_letters").document(cl_id)
-
-        # Verify cover letter exists
-        if not cl_ref.get().exists:
+        versions = _list_versions(user["uid"], cl_id)
+        if versions is None:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail="Cover letter not found",
             )
-
-        versions = []
-        docs = cl_ref.collection("versions").order_by("created_at", direction="DESCENDING").stream()
-        for doc in docs:
-            data = doc.to_dict()
-            versions.append(CoverLetterVersion(
-                id=doc.id,
-                tone=data.get("tone", "professional"),
-                created_at=data.get("created_at", ""),
-            ))
         return versions
     except HTTPException:
         raise
@@ -191,12 +161,66 @@ async def list_versions(
         )
 
 
+@router.get("/{cl_id}/versions/{version_id}", response_model=CoverLetterVersionDetail)
+async def get_version(
+    cl_id: str,
+    version_id: str,
+    user: dict = Depends(get_current_user),
+):
+    """Get the paragraphs of a saved version."""
+    try:
+        from app.services.firebase.cover_letter_service import get_version as _get_version
+
+        version = _get_version(user["uid"], cl_id, version_id)
+        if version is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Version not found",
+            )
+        return version
+    except HTTPException:
+        raise
+    except Exception as exc:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to get version: {exc}",
+        )
+
+
+@router.post("/{cl_id}/versions/{version_id}/restore", response_model=CoverLetterContent)
+async def restore_version(
+    cl_id: str,
+    version_id: str,
+    user: dict = Depends(get_current_user),
+):
+    """Restore a cover letter to a saved version (the current state is saved first)."""
+    try:
+        from app.services.firebase.cover_letter_service import restore_version as _restore_version
+
+        cl = _restore_version(user["uid"], cl_id, version_id)
+        if cl is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Cover letter or version not found",
+            )
+        return cl
+    except HTTPException:
+        raise
+    except Exception as exc:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to restore version: {exc}",
+        )
+
+
 @router.post("/download")
 async def download_cover_letter(
     body: CoverLetterDownloadRequest,
     user: dict = Depends(get_current_user),
 ):
     """Generate and download a cover letter as PDF or DOCX."""
+    from app.services.pdf.render_pool import RenderQueueFull, RenderTimeout
+
     try:
         full_text = "\n\n".join(body.paragraphs)
 
@@ -208,6 +232,7 @@ async def download_cover_letter(
                     text=full_text,
                     tone=body.tone,
                     letter_format=body.letter_format,
+                    output=body.output,
                 )
                 return Response(
                     content=pdf_bytes,
@@ -250,6 +275,16 @@ async def download_cover_letter(
             )
     except HTTPException:
         raise
+    except RenderQueueFull as exc:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=str(exc),
+        )
+    except RenderTimeout as exc:
+        raise HTTPException(
+            status_code=status.HTTP_504_GATEWAY_TIMEOUT,
+            detail=str(exc),
+        )
     except Exception as exc:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
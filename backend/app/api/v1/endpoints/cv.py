@@ -1,16 +1,27 @@
-"""CV CRUD endpoints: list, create, upload-pdf, get, update, delete, duplicate, auto-save, preview."""
+"""CV CRUD endpoints: list, create, upload-pdf, get, update, patch, section update, delete, duplicate, auto-save, versions, preview, layout, thumbnail."""
 
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, status
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, UploadFile, File, status
 from fastapi.responses import Response
-from typing import List
+from pydantic import ValidationError
+from typing import List, Literal, Optional
 
-from app.core.security import get_current_user
+from app.core.security import get_current_user, get_user_or_signed_url, require_quota
 from app.schemas.cv import (
     CVCreate,
     CVUpdate,
     CVSummary,
     CVDetail,
     CVContent,
+    CVPatchRequest,
+    CVPatchResponse,
+    CVSectionUpdate,
+    CVSectionResponse,
+    validate_section,
+    CV_SECTIONS,
+    CVVersionCreate,
+    CVVersion,
+    CVVersionDetail,
+    CVLayout,
 )
 
 router = APIRouter()
@@ -21,9 +32,15 @@ router = APIRouter()
 async def list_cvs(user: dict = Depends(get_current_user)):
     """List all CVs for the current user."""
     try:
+        from app.core.config import settings as _settings
+        from app.core.security import sign_url
         from app.services.firebase.cv_service import list_cvs as _list_cvs
 
         cvs = _list_cvs(user["uid"])
+        for item in cvs:
+            # Signed, so a plain <img src> can load it without a Bearer token
+            path = f"{_settings.API_V1_PREFIX}/cv/{item['id']}/thumbnail"
+            item["thumbnail_url"] = sign_url(path, user["uid"])
         return cvs
     except Exception as exc:
         raise HTTPException(
@@ -60,11 +77,17 @@ async def create_cv(
 @router.post("/upload-pdf", response_model=CVDetail, status_code=status.HTTP_201_CREATED)
 async def upload_pdf_cv(
     file: UploadFile = File(...),
-    user: dict = Depends(get_current_user),
+    user: dict = Depends(require_quota("imports")),
 ):
-    """Upload a PDF CV, extract its content with AI, and create a new CV document."""
-    import io
-    import PyPDF2
+    """Upload a PDF CV, extract its content with AI, and create a new CV document.
+
+    Results are cached by file hash: re-uploading the same PDF skips the
+    extraction and the Gemini call, and does not count as an import.
+    """
+    import asyncio
+    from app.services.firebase import parse_cache
+    from app.services.firebase.usage_service import refund
+    from app.services.pdf.extraction import extract_pdf_async
 
     # ── 1. Validate file ──────────────────────────────────────────────────────
     if not file.filename or not file.filename.lower().endswith(".pdf"):
@@ -80,78 +103,43 @@ async def upload_pdf_cv(
             detail="PDF file is too large (max 10 MB).",
         )
 
+    digest = parse_cache.file_hash(pdf_bytes)
+    cached = await asyncio.to_thread(parse_cache.lookup, user["uid"], digest)
+    parsed = cached["parsed"].get("cv")
+    if parsed is not None:
+        refund(user["uid"], "imports")
+
     # ── 2. Extract text from PDF ──────────────────────────────────────────────
-    try:
-        reader = PyPDF2.PdfReader(io.BytesIO(pdf_bytes))
-        pages_text = [page.extract_text() or "" for page in reader.pages]
-        raw_text = "\n".join(pages_text).strip()
-    except Exception as exc:
-        raise HTTPException(
-            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
-            detail=f"Could not read PDF: {exc}",
-        )
+    raw_text = cached["text"]
+    if parsed is None and raw_text is None:
+        try:
+            raw_text = (await extract_pdf_async(pdf_bytes)).text
+        except Exception as exc:
+            raise HTTPException(
+                status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                detail=f"Could not read PDF: {exc}",
+            )
+        if raw_text:
+            await asyncio.to_thread(parse_cache.store_text, user["uid"], digest, raw_text)
 
-    if not raw_text:
+    if parsed is None and not raw_text:
         raise HTTPException(
             status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
             detail="The PDF appears to be empty or image-based (non-selectable text). Please use a text-based PDF.",
         )
 
-    # ── 3. Parse CV structure with Gemini ─────────────────────────────────────
-    try:
-        from app.services.ai.gemini_client import generate_json
-
-        prompt = f"""Extract the following CV/resume text into a structured JSON object.
-
-CV TEXT:
-{raw_text[:8000]}
-
-Return ONLY a JSON object with this exact structure (omit fields that are not present):
-{{
-  "title": "Inferred CV title like 'John Doe — Software Engineer'",
-  "contact_info": {{
-    "name": "Full name",
-    "email": "email@example.com",
-    "phone": "+1234567890",
-    "location": "City, Country",
-    "linkedin": "linkedin URL if present",
-    "website": "personal website if present"
-  }},
-  "summary": "Professional summary paragraph if present",
-  "experience": [
-    {{
-      "job_title": "Job Title",
-      "company": "Company Name",
-      "location": "City, Country",
-      "start_date": "Month Year",
-      "end_date": "Month Year",
-      "current": false,
-      "bullets": ["Achievement or responsibility 1", "Achievement 2"]
-    }}
-  ],
-  "education": [
-    {{
-      "school": "University Name",
-      "degree": "Bachelor / Master / PhD",
-      "field": "Computer Science",
-      "graduation_date": "2020",
-      "gpa": "3.8"
-    }}
-  ],
-  "skills": ["Python", "React", "SQL"],
-  "languages": ["English", "French"],
-  "certifications": ["AWS Certified", "PMP"],
-  "projects": [
-    {{"name": "Project Name", "description": "Short description", "url": ""}}
-  ]
-}}"""
-
-        parsed = await generate_json(prompt)
-    except Exception as exc:
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=f"AI parsing failed: {exc}",
-        )
+    # ── 3. Parse CV structure with Gemini (skipped on a cache hit) ────────────
+    if parsed is None:
+        try:
+            from app.services.ai.cv_parser import parse_cv_text
+
+            parsed = await parse_cv_text(raw_text)
+        except Exception as exc:
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail=f"AI parsing failed: {exc}",
+            )
+        await asyncio.to_thread(parse_cache.store_parsed, user["uid"], digest, "cv", parsed)
 
     # ── 4. Build CVContent from parsed data ───────────────────────────────────
     doc_title = str(parsed.get("title") or "Uploaded CV").strip()[:80]
@@ -266,6 +254,54 @@ async def update_cv(
         )
 
 
+@router.patch("/{cv_id}/sections/{section}", response_model=CVSectionResponse)
+async def update_cv_section(
+    cv_id: str,
+    section: str,
+    body: CVSectionUpdate,
+    user: dict = Depends(get_current_user),
+):
+    """Replace a single content section (e.g. ``experience``).
+
+    Only that section is validated and only ``content.<section>`` is written.
+    """
+    if body.section is not None and body.section != section:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Section in body does not match the URL",
+        )
+    try:
+        data = validate_section(section, body.data)
+    except KeyError:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Unknown CV section: {section} (expected one of: {', '.join(CV_SECTIONS)})",
+        )
+    except ValidationError as exc:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=f"Invalid {section}: {exc}",
+        )
+
+    try:
+        from app.services.firebase.cv_service import update_cv_section as _update_cv_section
+
+        updated_at = _update_cv_section(user["uid"], cv_id, section, data)
+        if updated_at is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="CV not found",
+            )
+        return {"section": section, "data": data, "updated_at": updated_at}
+    except HTTPException:
+        raise
+    except Exception as exc:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to update CV section: {exc}",
+        )
+
+
 @router.delete("/{cv_id}", status_code=status.HTTP_200_OK)
 async def delete_cv(cv_id: str, user: dict = Depends(get_current_user)):
     """Delete a CV."""
@@ -316,18 +352,23 @@ async def auto_save_cv(
     body: CVContent,
     user: dict = Depends(get_current_user),
 ):
-    """Auto-save CV content (lightweight update for the content field only)."""
+    """Auto-save CV content.
+
+    The content is buffered and written to Firestore after a short debounce
+    window, so bursts of auto-saves while typing coalesce into one write.
+    The returned ``revision`` is the one the write will store; send it with
+    the next ``PATCH /{cv_id}/content``.
+    """
     try:
-        from app.services.firebase.cv_service import update_cv as _update_cv
+        from app.services.firebase.cv_service import buffer_autosave
 
-        update_data = {"content": body.model_dump()}
-        cv = _update_cv(user["uid"], cv_id, update_data)
-        if cv is None:
+        saved = buffer_autosave(user["uid"], cv_id, body.model_dump())
+        if saved is None:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail="CV not found",
             )
-        return {"message": "Auto-saved successfully", "updated_at": cv.get("updated_at")}
+        return {"message": "Auto-saved successfully", **saved}
     except HTTPException:
         raise
     except Exception as exc:
@@ -337,11 +378,168 @@ async def auto_save_cv(
         )
 
 
+@router.patch("/{cv_id}/content", response_model=CVPatchResponse)
+async def patch_cv_content(
+    cv_id: str,
+    body: CVPatchRequest,
+    user: dict = Depends(get_current_user),
+):
+    """Apply a JSON Patch (RFC 6902) delta to the CV content.
+
+    ``revision`` must match the stored revision, otherwise 409 is returned
+    and the client should re-fetch the CV and rebase its changes.
+    """
+    try:
+        from app.services.firebase.cv_service import (
+            RevisionConflict,
+            patch_cv_content as _patch_cv_content,
+        )
+        from app.utils.json_patch import JsonPatchError, JsonPatchTestFailed
+
+        operations = [op.model_dump(by_alias=True, exclude_unset=True) for op in body.operations]
+        try:
+            result = _patch_cv_content(
+                user["uid"],
+                cv_id,
+                body.revision,
+                operations,
+                validate=lambda content: CVContent(**content).model_dump(),
+            )
+        except RevisionConflict as exc:
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail=f"CV has been modified (current revision: {exc.current})",
+            )
+        except JsonPatchTestFailed as exc:
+            raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(exc))
+        except (JsonPatchError, ValidationError) as exc:
+            raise HTTPException(
+                status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                detail=f"Invalid patch: {exc}",
+            )
+
+        if result is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="CV not found",
+            )
+        return result
+    except HTTPException:
+        raise
+    except Exception as exc:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to patch CV: {exc}",
+        )
+
+
+@router.post("/{cv_id}/versions", response_model=CVVersion, status_code=status.HTTP_201_CREATED)
+async def save_cv_version(
+    cv_id: str,
+    body: Optional[CVVersionCreate] = None,
+    user: dict = Depends(get_current_user),
+):
+    """Save the current state of a CV as a version."""
+    try:
+        from app.services.firebase.cv_service import save_cv_version as _save_cv_version
+
+        version = _save_cv_version(user["uid"], cv_id, label=body.label if body else None)
+        if version is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="CV not found",
+            )
+        return version
+    except HTTPException:
+        raise
+    except Exception as exc:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to save version: {exc}",
+        )
+
+
+@router.get("/{cv_id}/versions", response_model=List[CVVersion])
+async def list_cv_versions(cv_id: str, user: dict = Depends(get_current_user)):
+    """List saved versions of a CV (metadata only)."""
+    try:
+        from app.services.firebase.cv_service import list_cv_versions as _list_cv_versions
+
+        versions = _list_cv_versions(user["uid"], cv_id)
+        if versions is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="CV not found",
+            )
+        return versions
+    except HTTPException:
+        raise
+    except Exception as exc:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to list versions: {exc}",
+        )
+
+
+@router.get("/{cv_id}/versions/{version_id}", response_model=CVVersionDetail)
+async def get_cv_version(cv_id: str, version_id: str, user: dict = Depends(get_current_user)):
+    """Get the full content of a saved version."""
+    try:
+        from app.services.firebase.cv_service import get_cv_version as _get_cv_version
+
+        version = _get_cv_version(user["uid"], cv_id, version_id)
+        if version is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Version not found",
+            )
+        return version
+    except HTTPException:
+        raise
+    except Exception as exc:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to get version: {exc}",
+        )
+
+
+@router.post("/{cv_id}/versions/{version_id}/restore", response_model=CVDetail)
+async def restore_cv_version(cv_id: str, version_id: str, user: dict = Depends(get_current_user)):
+    """Restore a CV to a saved version (the current state is saved first)."""
+    try:
+        from app.services.firebase.cv_service import restore_cv_version as _restore_cv_version
+
+        cv = _restore_cv_version(user["uid"], cv_id, version_id)
+        if cv is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="CV or version not found",
+            )
+        return cv
+    except HTTPException:
+        raise
+    except Exception as exc:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to restore version: {exc}",
+        )
+
+
 @router.get("/{cv_id}/preview")
-async def preview_cv(cv_id: str, user: dict = Depends(get_current_user)):
-    """Get a PDF preview of the CV."""
+async def preview_cv(
+    cv_id: str,
+    output: Optional[Literal["standard", "compact", "web"]] = Query(None, description="PDF output mode"),
+    if_none_match: Optional[str] = Header(None),
+    user: dict = Depends(get_current_user),
+):
+    """Get a PDF preview of the CV.
+
+    Responses carry a strong ``ETag``; a matching ``If-None-Match`` gets a
+    304 without rendering or downloading anything.
+    """
     try:
         from app.services.firebase.cv_service import get_cv as _get_cv
+        from app.services.pdf.render_cache import etag_matches
 
         cv = _get_cv(user["uid"], cv_id)
         if cv is None:
@@ -350,6 +548,16 @@ async def preview_cv(cv_id: str, user: dict = Depends(get_current_user)):
                 detail="CV not found",
             )
 
+        _title = (cv.get("title") or "cv").replace("\u2014", "-").replace("\u2013", "-")
+        _title = _title.encode("latin-1", "ignore").decode("latin-1").strip() or "cv"
+
+        def _pdf_response(pdf_bytes: Optional[bytes], etag: str) -> Response:
+            headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+            if pdf_bytes is None:
+                return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+            headers["Content-Disposition"] = f'inline; filename="{_title}.pdf"'
+            return Response(content=pdf_bytes, media_type="application/pdf", headers=headers)
+
         # Try to serve the original uploaded PDF from Firebase Storage first
         import asyncio as _asyncio
         from app.core.config import settings as _settings
@@ -358,41 +566,45 @@ async def preview_cv(cv_id: str, user: dict = Depends(get_current_user)):
                 from app.core.firebase import get_storage_bucket
                 bucket = get_storage_bucket()
                 blob = bucket.blob(f"cvs/{user['uid']}/{cv_id}/original.pdf")
-                blob_exists = await _asyncio.to_thread(blob.exists)
-                if blob_exists:
-                    pdf_bytes = await _asyncio.to_thread(blob.download_as_bytes)
-                    _title = (cv.get("title") or "cv").replace("\u2014", "-").replace("\u2013", "-")
-                    _title = _title.encode("latin-1", "ignore").decode("latin-1").strip() or "cv"
-                    return Response(
-                        content=pdf_bytes,
-                        media_type="application/pdf",
-                        headers={
-                            "Content-Disposition": f'inline; filename="{_title}.pdf"',
-                        },
-                    )
+                # reload() fetches metadata (raises NotFound if missing), so
+                # a revalidation never downloads the file itself
+                await _asyncio.to_thread(blob.reload)
+                etag = f'"gcs-{blob.generation}"'
+                if etag_matches(if_none_match, etag):
+                    return _pdf_response(None, etag)
+                pdf_bytes = await _asyncio.to_thread(blob.download_as_bytes)
+                return _pdf_response(pdf_bytes, etag)
             except Exception:
                 pass  # Fall through to ReportLab generation
 
-        # Generate PDF with ReportLab template
+        # Generate PDF with ReportLab template (cached by content hash)
         try:
-            from app.services.pdf.generator import generate_cv_pdf
-
-            pdf_bytes = await generate_cv_pdf(cv)
-            _title = (cv.get("title") or "cv").replace("\u2014", "-").replace("\u2013", "-")
-            _title = _title.encode("latin-1", "ignore").decode("latin-1").strip() or "cv"
-            return Response(
-                content=pdf_bytes,
-                media_type="application/pdf",
-                headers={
-                    "Content-Disposition": f'inline; filename="{_title}.pdf"',
-                },
-            )
+            from app.services.pdf.generator import cv_render_key, generate_cv_pdf
+            from app.services.pdf.output import resolve_output
+            from app.services.pdf.render_pool import RenderQueueFull, RenderTimeout
+
+            output = resolve_output(output)
+            etag = f'"{cv_render_key(cv, output)}"'
+            if etag_matches(if_none_match, etag):
+                return _pdf_response(None, etag)
+            pdf_bytes = await generate_cv_pdf(cv, output)
+            return _pdf_response(pdf_bytes, etag)
         except ImportError:
             # PDF generator not yet implemented
             raise HTTPException(
                 status_code=status.HTTP_501_NOT_IMPLEMENTED,
                 detail="PDF preview generation is not yet available",
             )
+        except RenderQueueFull as exc:
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail=str(exc),
+            )
+        except RenderTimeout as exc:
+            raise HTTPException(
+                status_code=status.HTTP_504_GATEWAY_TIMEOUT,
+                detail=str(exc),
+            )
     except HTTPException:
         raise
     except Exception as exc:
@@ -400,3 +612,119 @@ async def preview_cv(cv_id: str, user: dict = Depends(get_current_user)):
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Failed to generate preview: {exc}",
         )
+
+
+@router.get("/{cv_id}/layout", response_model=CVLayout)
+async def layout_cv(
+    cv_id: str,
+    max_pages: int = Query(1, ge=1, le=10),
+    user: dict = Depends(get_current_user),
+):
+    """Describe how the CV lays out (pages, section boxes, overflow) without
+    producing a PDF; ``fits`` answers "does it fit on *max_pages* pages?"."""
+    try:
+        import asyncio as _asyncio
+        from app.services.firebase.cv_service import get_cv as _get_cv
+        from app.services.pdf.generator import generate_cv_layout
+        from app.services.pdf.render_pool import RenderQueueFull, RenderTimeout
+
+        cv = await _asyncio.to_thread(_get_cv, user["uid"], cv_id)
+        if cv is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="CV not found",
+            )
+
+        try:
+            layout = await generate_cv_layout(cv)
+        except RenderQueueFull as exc:
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail=str(exc),
+            )
+        except RenderTimeout as exc:
+            raise HTTPException(
+                status_code=status.HTTP_504_GATEWAY_TIMEOUT,
+                detail=str(exc),
+            )
+        return CVLayout(
+            **layout,
+            max_pages=max_pages,
+            fits=layout["page_count"] <= max_pages,
+        )
+    except HTTPException:
+        raise
+    except Exception as exc:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to compute layout: {exc}",
+        )
+
+
+@router.get("/{cv_id}/thumbnail")
+async def thumbnail_cv(
+    cv_id: str,
+    width: int = Query(320, ge=1, le=2000, description="Snapped up to 160, 320 or 640 px"),
+    format: str = Query("webp", pattern="^(webp|png)$"),
+    if_none_match: Optional[str] = Header(None),
+    user: dict = Depends(get_user_or_signed_url),
+):
+    """First page of the CV as a small image, for dashboard cards.
+
+    Shows the uploaded original when there is one (like ``/preview``),
+    otherwise the ReportLab rendering.  Cached per content hash and
+    revalidated with ``ETag``/``If-None-Match``.  Accepts a Bearer token
+    or the signed ``thumbnail_url`` returned by ``GET /cv``.
+    """
+    try:
+        import asyncio as _asyncio
+        from app.core.config import settings as _settings
+        from app.services.firebase.cv_service import get_cv as _get_cv
+        from app.services.pdf.generator import cv_render_key, generate_cv_pdf
+        from app.services.pdf.render_cache import etag_matches
+        from app.services.pdf.render_pool import RenderQueueFull, RenderTimeout
+        from app.services.pdf.thumbnails import MEDIA_TYPES, original_key, snap_width, thumbnail
+
+        cv = await _asyncio.to_thread(_get_cv, user["uid"], cv_id)
+        if cv is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="CV not found",
+            )
+        width = snap_width(width)
+
+        key, load_pdf = cv_render_key(cv), lambda: generate_cv_pdf(cv, "standard")
+        if _settings.FIREBASE_STORAGE_BUCKET:
+            try:
+                from app.core.firebase import get_storage_bucket
+                blob = get_storage_bucket().blob(f"cvs/{user['uid']}/{cv_id}/original.pdf")
+                await _asyncio.to_thread(blob.reload)  # raises NotFound if missing
+                key = original_key(user["uid"], cv_id, blob.generation)
+                load_pdf = lambda: _asyncio.to_thread(blob.download_as_bytes)  # noqa: E731
+            except Exception:
+                pass  # No original: thumbnail of the ReportLab rendering
+
+        etag = f'"{key}-w{width}.{format}"'
+        headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+        if etag_matches(if_none_match, etag):
+            return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+        try:
+            data = await thumbnail(key, load_pdf, width, format)
+        except RenderQueueFull as exc:
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail=str(exc),
+            )
+        except RenderTimeout as exc:
+            raise HTTPException(
+                status_code=status.HTTP_504_GATEWAY_TIMEOUT,
+                detail=str(exc),
+            )
+        return Response(content=data, media_type=MEDIA_TYPES[format], headers=headers)
+    except HTTPException:
+        raise
+    except Exception as exc:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to generate thumbnail: {exc}",
+        )
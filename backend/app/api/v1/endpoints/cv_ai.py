@@ -4,7 +4,7 @@ from fastapi import APIRouter, Depends, HTTPException, status
 from pydantic import BaseModel
 from typing import List, Optional
 
-from app.core.security import get_current_user
+from app.core.security import require_quota
 
 router = APIRouter()
 
@@ -50,7 +50,7 @@ class SuggestBulletsResponse(BaseModel):
 @router.post("/improve-text", response_model=ImproveTextResponse)
 async def improve_text(
     body: ImproveTextRequest,
-    user: dict = Depends(get_current_user),
+    user: dict = Depends(require_quota("ai_improvements")),
 ):
     """Improve a piece of CV text using AI to make it more impactful and ATS-friendly."""
     try:
@@ -72,7 +72,7 @@ async def improve_text(
 @router.post("/generate-summary", response_model=GenerateSummaryResponse)
 async def generate_summary(
     body: GenerateSummaryRequest,
-    user: dict = Depends(get_current_user),
+    user: dict = Depends(require_quota("ai_improvements")),
 ):
     """Generate a professional summary for a CV based on its content and a target role."""
     try:
@@ -109,7 +109,7 @@ async def generate_summary(
 @router.post("/suggest-bullets", response_model=SuggestBulletsResponse)
 async def suggest_bullets(
     body: SuggestBulletsRequest,
-    user: dict = Depends(get_current_user),
+    user: dict = Depends(require_quota("ai_improvements")),
 ):
     """Suggest achievement-oriented bullet points for a given role."""
     try:
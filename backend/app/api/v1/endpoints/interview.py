@@ -1,10 +1,9 @@
 """Interview practice session endpoints."""
 
 from fastapi import APIRouter, Depends, HTTPException, status
-from typing import List
-from datetime import datetime
+from typing import List, Optional
 
-from app.core.security import get_current_user
+from app.core.security import get_current_user, require_quota
 from app.schemas.interview import (
     InterviewStartRequest,
     InterviewAnswerRequest,
@@ -17,16 +16,45 @@ from app.schemas.interview import (
 router = APIRouter()
 
 
+def _mean_score(scores) -> Optional[float]:
+    """Average the numeric values of a feedback ``scores`` object."""
+    if not isinstance(scores, dict):
+        return None
+    values = [v for v in scores.values() if isinstance(v, (int, float))]
+    return sum(values) / len(values) if values else None
+
+
+def _report_response(session_id: str, session: dict, report: dict, answered: int) -> SessionReport:
+    return SessionReport(
+        session_id=session_id,
+        overall_score=report.get("overall_score", 0),
+        performance=report.get("performance", {}),
+        best_answer=report.get("best_answer"),
+        areas_for_improvement=report.get("areas_for_improvement", []),
+        total_questions=session.get("total_questions", 10),
+        answered_questions=answered,
+    )
+
+
+def _transcript_summary(session: dict) -> str:
+    """Compact text of the last answered turns, for prompt context."""
+    lines = []
+    for turn in session.get("recent_turns") or []:
+        lines.append(f"Q{turn.get('question_number')}: {turn.get('question', '')}")
+        lines.append(f"A: {turn.get('answer', '')}")
+    return "\n".join(lines)
+
+
 @router.post("/start", response_model=InterviewSession, status_code=status.HTTP_201_CREATED)
 async def start_interview(
     body: InterviewStartRequest,
-    user: dict = Depends(get_current_user),
+    user: dict = Depends(require_quota("interview_sessions")),
 ):
     """Start a new interview practice session."""
     try:
         from app.services.firebase.cv_service import get_cv
+        from app.services.firebase.interview_service import create_session
         from app.services.ai.gemini_client import generate_json
-        from app.core.firebase import get_db
         import json
 
         # Fetch CV for context
@@ -52,7 +80,6 @@ async def start_interview(
         )
 
         question_data = await generate_json(prompt)
-        now = datetime.utcnow().isoformat()
 
         # Build initial messages
         system_msg = ChatMessage(
@@ -68,8 +95,7 @@ async def start_interview(
             question_type=question_data.get("question_type", body.interview_type),
         )
 
-        # Save session to Firestore
-        db = get_db()
+        # Save session (and its first messages) to Firestore
         session_data = {
             "cv_id": body.cv_id,
             "job_title": body.job_title,
@@ -78,17 +104,19 @@ async def start_interview(
             "difficulty": body.difficulty,
             "total_questions": body.session_length,
             "current_question": 1,
+            "current_question_text": first_question.content,
             "status": "active",
-            "messages": [system_msg.model_dump(), first_question.model_dump()],
-            "created_at": now,
-            "uid": user["uid"],
             "language": body.language,
         }
-
-        _, ref = db.collection("users").document(user["uid"]).collection("interviews").add(session_data)
+        session = create_session(
+            user["uid"],
+            session_data,
+            messages=[system_msg.model_dump(), first_question.model_dump()],
+        )
+        now = session["created_at"]
 
         return InterviewSession(
-            id=ref.id,
+            id=session["id"],
             cv_id=body.cv_id,
             job_title=body.job_title,
             company=body.company,
@@ -117,36 +145,45 @@ async def submit_answer(
 ):
     """Submit an answer to the current interview question and get AI feedback."""
     try:
-        from app.core.firebase import get_db
+        from app.services.firebase.interview_service import (
+            get_session,
+            append_turn,
+            answered_count,
+            list_messages,
+            message_count,
+        )
         from app.services.ai.gemini_client import generate_json
-        import json
-
-        db = get_db()
-        session_ref = db.collection("users").document(user["uid"]).collection("interviews").document(session_id)
-        session_doc = session_ref.get()
 
-        if not session_doc.exists:
+        session = get_session(user["uid"], session_id)
+        if session is None:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail="Interview session not found",
             )
 
-        session = session_doc.to_dict()
         if session.get("status") != "active":
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="This interview session has ended",
             )
 
-        messages = session.get("messages", [])
+        # The session quota buys total_questions turns, not unlimited ones
+        if answered_count(session) >= session.get("total_questions", 10):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="All questions of this session have been answered; end it to get the report",
+            )
+
         current_q = session.get("current_question", 1)
 
         # Get the last question for context
-        last_question = ""
-        for msg in reversed(messages):
-            if msg.get("role") == "ai-question":
-                last_question = msg.get("content", "")
-                break
+        last_question = session.get("current_question_text")
+        if last_question is None:
+            last_question = ""
+            for msg in reversed(list_messages(user["uid"], session_id, session, last=3)):
+                if msg.get("role") == "ai-question":
+                    last_question = msg.get("content", "")
+                    break
 
         # Generate AI feedback
         prompt = (
@@ -168,14 +205,13 @@ async def submit_answer(
         feedback_data = await generate_json(prompt)
 
         # Build feedback message
-        msg_id = len(messages) + 1
+        msg_id = message_count(session) + 1
         user_msg = ChatMessage(
             id=msg_id,
             role="user",
             content=body.answer,
             question_number=current_q,
         )
-        messages.append(user_msg.model_dump())
 
         feedback_msg = ChatMessage(
             id=msg_id + 1,
@@ -188,15 +224,25 @@ async def submit_answer(
             model_answer=feedback_data.get("model_answer"),
             star_tip=feedback_data.get("star_tip", False),
         )
-        messages.append(feedback_msg.model_dump())
+        new_messages = [user_msg.model_dump(), feedback_msg.model_dump()]
+        turn = {
+            "question_number": current_q,
+            "question": last_question,
+            "answer": body.answer,
+            "score": _mean_score(feedback_msg.scores),
+        }
 
         # Generate next question if session is not over
         total_q = session.get("total_questions", 10)
+        update_data = {"current_question": min(current_q + 1, total_q)}
         if current_q < total_q:
+            summary = _transcript_summary(
+                {"recent_turns": [*(session.get("recent_turns") or []), turn]}
+            )
             next_prompt = (
                 f"Generate the next interview question (question {current_q + 1}/{total_q}) "
                 f"for a {session.get('interview_type', 'behavioral')} interview. "
-                f"Previous questions and answers are in context. "
+                f"Previous questions and answers:\n{summary}\n\n"
                 "Return a JSON object with: content, question_type"
             )
             next_q_data = await generate_json(next_prompt)
@@ -207,14 +253,13 @@ async def submit_answer(
                 question_number=current_q + 1,
                 question_type=next_q_data.get("question_type", session.get("interview_type")),
             )
-            messages.append(next_question.model_dump())
+            new_messages.append(next_question.model_dump())
+            update_data["current_question_text"] = next_question.content
 
-        # Update session
-        update_data = {
-            "messages": messages,
-            "current_question": min(current_q + 1, total_q),
-        }
-        session_ref.update(update_data)
+        # Append the turn and update the session in one transaction, which
+        # assigns the final message ids
+        stored = append_turn(user["uid"], session_id, session, new_messages, update_data, turn=turn)
+        feedback_msg.id = stored[1]["id"]
 
         return feedback_msg
     except HTTPException:
@@ -233,32 +278,41 @@ async def end_interview(
 ):
     """End an interview session and generate a performance report."""
     try:
-        from app.core.firebase import get_db
+        from app.services.firebase.interview_service import (
+            get_session,
+            update_session,
+            list_messages,
+            answered_count,
+        )
         from app.services.ai.gemini_client import generate_json
         import json
 
-        db = get_db()
-        session_ref = db.collection("users").document(user["uid"]).collection("interviews").document(session_id)
-        session_doc = session_ref.get()
-
-        if not session_doc.exists:
+        session = get_session(user["uid"], session_id)
+        if session is None:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail="Interview session not found",
             )
 
-        session = session_doc.to_dict()
-        messages = session.get("messages", [])
-
         # Count answered questions
-        answered = sum(1 for m in messages if m.get("role") == "user")
-        total = session.get("total_questions", 10)
+        answered = answered_count(session)
+
+        # The report is generated once, when the session ends
+        if session.get("status") != "active":
+            if session.get("report"):
+                return _report_response(session_id, session, session["report"], answered)
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="This interview session has ended",
+            )
+
+        messages = list_messages(user["uid"], session_id, session, last=20)
 
         # Generate overall report using AI
         prompt = (
             "Based on the following interview session, generate a performance report.\n"
             f"Interview type: {session.get('interview_type')}\n"
-            f"Messages:\n{json.dumps(messages[-20:], indent=2)}\n\n"
+            f"Messages:\n{json.dumps(messages, indent=2)}\n\n"
             "Return a JSON object with:\n"
             "- overall_score: float (0-100)\n"
             "- performance: object with keys communication, relevance, depth, confidence, structure (each 0-100)\n"
@@ -268,18 +322,14 @@ async def end_interview(
 
         report_data = await generate_json(prompt)
 
-        # Mark session as ended
-        session_ref.update({"status": "ended"})
-
-        return SessionReport(
-            session_id=session_id,
-            overall_score=report_data.get("overall_score", 0),
-            performance=report_data.get("performance", {}),
-            best_answer=report_data.get("best_answer"),
-            areas_for_improvement=report_data.get("areas_for_improvement", []),
-            total_questions=total,
-            answered_questions=answered,
-        )
+        # Mark session as ended and keep the report for GET /report
+        update_session(user["uid"], session_id, {
+            "status": "ended",
+            "report": report_data,
+            "score": report_data.get("overall_score", 0),
+        })
+
+        return _report_response(session_id, session, report_data, answered)
     except HTTPException:
         raise
     except Exception as exc:
@@ -294,6 +344,7 @@ async def list_sessions(user: dict = Depends(get_current_user)):
     """List all interview sessions for the current user."""
     try:
         from app.core.firebase import get_db
+        from app.services.firebase.interview_service import average_score
 
         db = get_db()
         docs = (
@@ -307,15 +358,7 @@ async def list_sessions(user: dict = Depends(get_current_user)):
         sessions = []
         for doc in docs:
             data = doc.to_dict()
-            # Calculate average score from feedback messages
-            scores = []
-            for msg in data.get("messages", []):
-                if msg.get("role") == "ai-feedback" and msg.get("scores"):
-                    score_vals = msg["scores"].values()
-                    if score_vals:
-                        scores.append(sum(score_vals) / len(score_vals))
-
-            avg_score = sum(scores) / len(scores) if scores else None
+            avg_score = average_score(data)
 
             sessions.append(SessionSummary(
                 id=doc.id,
@@ -340,30 +383,39 @@ async def get_report(
 ):
     """Get the performance report for a completed interview session."""
     try:
-        from app.core.firebase import get_db
+        from app.services.firebase.interview_service import (
+            get_session,
+            update_session,
+            list_messages,
+            answered_count,
+        )
         from app.services.ai.gemini_client import generate_json
         import json
 
-        db = get_db()
-        session_ref = db.collection("users").document(user["uid"]).collection("interviews").document(session_id)
-        session_doc = session_ref.get()
-
-        if not session_doc.exists:
+        session = get_session(user["uid"], session_id)
+        if session is None:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail="Interview session not found",
             )
 
-        session = session_doc.to_dict()
-        messages = session.get("messages", [])
-        answered = sum(1 for m in messages if m.get("role") == "user")
-        total = session.get("total_questions", 10)
+        answered = answered_count(session)
+        if session.get("report"):
+            return _report_response(session_id, session, session["report"], answered)
+        if session.get("status") == "active":
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="End the interview session to get its report",
+            )
+
+        # Sessions ended before reports were stored: generate it once
+        messages = list_messages(user["uid"], session_id, session, last=20)
 
         # Generate report
         prompt = (
             "Based on the following interview session, generate a performance report.\n"
             f"Interview type: {session.get('interview_type')}\n"
-            f"Messages:\n{json.dumps(messages[-20:], indent=2)}\n\n"
+            f"Messages:\n{json.dumps(messages, indent=2)}\n\n"
             "Return a JSON object with:\n"
             "- overall_score: float (0-100)\n"
             "- performance: object with keys communication, relevance, depth, confidence, structure (each 0-100)\n"
@@ -372,16 +424,12 @@ async def get_report(
         )
 
         report_data = await generate_json(prompt)
+        update_session(user["uid"], session_id, {
+            "report": report_data,
+            "score": report_data.get("overall_score", 0),
+        })
 
-        return SessionReport(
-            session_id=session_id,
-            overall_score=report_data.get("overall_score", 0),
-            performance=report_data.get("performance", {}),
-            best_answer=report_data.get("best_answer"),
-            areas_for_improvement=report_data.get("areas_for_improvement", []),
-            total_questions=total,
-            answered_questions=answered,
-        )
+        return _report_response(session_id, session, report_data, answered)
     except HTTPException:
         raise
     except Exception as exc:
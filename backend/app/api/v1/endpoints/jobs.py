@@ -1,11 +1,11 @@
 """Job tracking endpoints: CRUD, stages, notes, timeline."""
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, status
 from pydantic import BaseModel
 from typing import List, Optional
 from datetime import datetime
 
-from app.core.security import get_current_user
+from app.core.security import get_current_user, require_quota
 from app.schemas.job import (
     JobCreate,
     JobUpdate,
@@ -40,16 +40,42 @@ class NotesUpdate(BaseModel):
     notes: str
 
 
+# ---------------------------------------------------------------------------
+# Helper: stats
+# ---------------------------------------------------------------------------
+
+def _job_stats(counts: dict) -> JobStats:
+    """Build the kanban JobStats from materialised stage counts."""
+    by_stage = counts.get("by_stage", {})
+    stats = {stage: by_stage.get(stage, 0) for stage in ("saved", "applied", "interview", "offer", "rejected")}
+
+    # Calculate response rate
+    applied_plus = stats["applied"] + stats["interview"] + stats["offer"]
+    response_rate = 0.0
+    if counts.get("total", 0) > 0:
+        response_rate = round((stats["interview"] + stats["offer"]) / max(applied_plus, 1) * 100, 1)
+
+    return JobStats(total=counts.get("total", 0), response_rate=response_rate, **stats)
+
+
 # ---------------------------------------------------------------------------
 # Endpoints
 # ---------------------------------------------------------------------------
 
 @router.get("/")
 @router.get("", include_in_schema=False)
-async def list_jobs(user: dict = Depends(get_current_user)):
-    """List all jobs and compute stats for the current user."""
+async def list_jobs(
+    stats_only: bool = Query(False, description="Return only the stats, without the job list"),
+    user: dict = Depends(get_current_user),
+):
+    """List all jobs and the current user's stats (read from the stats document)."""
     try:
         from app.core.firebase import get_db
+        from app.services.firebase.job_service import get_stage_counts
+
+        stats = _job_stats(get_stage_counts(user["uid"]))
+        if stats_only:
+            return {"jobs": [], "stats": stats}
 
         db = get_db()
         docs = (
@@ -59,35 +85,12 @@ async def list_jobs(user: dict = Depends(get_current_user)):
         )
 
         jobs = []
-        stats = {"total": 0, "saved": 0, "applied": 0, "interview": 0, "offer": 0, "rejected": 0}
-
         for doc in docs:
             data = doc.to_dict()
             data["id"] = doc.id
             jobs.append(data)
-            stats["total"] += 1
-            stage = data.get("stage", "saved")
-            if stage in stats:
-                stats[stage] += 1
-
-        # Calculate response rate
-        applied_plus = stats["applied"] + stats["interview"] + stats["offer"]
-        response_rate = 0.0
-        if stats["total"] > 0:
-            response_rate = round((stats["interview"] + stats["offer"]) / max(applied_plus, 1) * 100, 1)
-
-        return {
-            "jobs": jobs,
-            "stats": JobStats(
-                total=stats["total"],
-                saved=stats["saved"],
-                applied=stats["applied"],
-                interview=stats["interview"],
-                offer=stats["offer"],
-                rejected=stats["rejected"],
-                response_rate=response_rate,
-            ),
-        }
+
+        return {"jobs": jobs, "stats": stats}
     except Exception as exc:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -95,6 +98,20 @@ async def list_jobs(user: dict = Depends(get_current_user)):
         )
 
 
+@router.post("/stats/rebuild", response_model=JobStats)
+async def rebuild_stats(user: dict = Depends(get_current_user)):
+    """Recompute the job stats document from scratch (repair)."""
+    try:
+        from app.services.firebase.job_service import rebuild_stats as _rebuild_stats
+
+        return _job_stats(_rebuild_stats(user["uid"]))
+    except Exception as exc:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to rebuild job stats: {exc}",
+        )
+
+
 @router.post("/", response_model=JobDetail, status_code=status.HTTP_201_CREATED)
 @router.post("", response_model=JobDetail, status_code=status.HTTP_201_CREATED, include_in_schema=False)
 async def create_job(
@@ -103,28 +120,14 @@ async def create_job(
 ):
     """Create a new job entry."""
     try:
-        from app.core.firebase import get_db
-
-        db = get_db()
-        now = datetime.utcnow().isoformat()
-
-        job_data = {
-            **body.model_dump(),
-            "uid": user["uid"],
-            "created_at": now,
-            "updated_at": now,
-        }
-        _, ref = _jobs_col(db, user["uid"]).add(job_data)
-        job_data["id"] = ref.id
-
-        # Log initial timeline event
-        _jobs_col(db, user["uid"]).document(ref.id).collection("timeline").add({
-            "event_type": "saved",
-            "description": f"Job saved: {body.role} at {body.company}",
-            "created_at": now,
-        })
+        from app.services.firebase.job_service import create_job as _create_job
 
-        return job_data
+        return _create_job(
+            user["uid"],
+            body.model_dump(),
+            event_type="saved",
+            description=f"Job saved: {body.role} at {body.company}",
+        )
     except Exception as exc:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -135,13 +138,13 @@ async def create_job(
 @router.post("/import-url", response_model=JobDetail)
 async def import_job_url(
     body: ImportJobUrlRequest,
-    user: dict = Depends(get_current_user),
+    user: dict = Depends(require_quota("imports")),
 ):
     """Import a job from a URL by scraping and parsing."""
     try:
         import requests
         from app.services.ai.gemini_client import generate_json
-        from app.core.firebase import get_db
+        from app.services.firebase.job_service import create_job as _create_job
 
         # Fetch the job page
         resp = requests.get(body.url, timeout=15, headers={
@@ -162,9 +165,6 @@ async def import_job_url(
         )
         parsed = await generate_json(prompt)
 
-        db = get_db()
-        now = datetime.utcnow().isoformat()
-
         job_data = {
             "company": parsed.get("company", "Unknown"),
             "role": parsed.get("role", "Unknown"),
@@ -173,12 +173,13 @@ async def import_job_url(
             "salary": parsed.get("salary"),
             "tags": parsed.get("tags", []),
             "stage": "saved",
-            "uid": user["uid"],
-            "created_at": now,
-            "updated_at": now,
         }
-        _, ref = _jobs_col(db, user["uid"]).add(job_data)
-        job_data["id"] = ref.id
+        job_data = _create_job(
+            user["uid"],
+            job_data,
+            event_type="saved",
+            description=f"Job imported from {body.url}",
+        )
 
         return job_data
     except HTTPException:
@@ -270,26 +271,15 @@ async def update_job(
 
 @router.delete("/{job_id}", status_code=status.HTTP_200_OK)
 async def delete_job(job_id: str, user: dict = Depends(get_current_user)):
-    """Delete a job entry."""
+    """Delete a job entry and its timeline."""
     try:
-        from app.core.firebase import get_db
+        from app.services.firebase.job_service import delete_job as _delete_job
 
-        db = get_db()
-        ref = _job_ref(db, user["uid"], job_id)
-        doc = ref.get()
-
-        if not doc.exists:
+        if not _delete_job(user["uid"], job_id):
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail="Job not found",
             )
-
-        # Delete timeline subcollection
-        timeline_docs = ref.collection("timeline").stream()
-        for tdoc in timeline_docs:
-            tdoc.reference.delete()
-
-        ref.delete()
         return {"message": "Job deleted successfully"}
     except HTTPException:
         raise
@@ -308,7 +298,7 @@ async def update_stage(
 ):
     """Update a job's pipeline stage."""
     try:
-        from app.core.firebase import get_db
+        from app.services.firebase.job_service import update_stage as _update_stage
 
         valid_stages = {"saved", "applied", "interview", "offer", "rejected"}
         if body.stage not in valid_stages:
@@ -317,28 +307,13 @@ async def update_stage(
                 detail=f"Invalid stage. Must be one of: {', '.join(valid_stages)}",
             )
 
-        db = get_db()
-        ref = _job_ref(db, user["uid"], job_id)
-        doc = ref.get()
-
-        if not doc.exists:
+        job = _update_stage(user["uid"], job_id, body.stage)
+        if job is None:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail="Job not found",
             )
-
-        now = datetime.utcnow().isoformat()
-        ref.update({"stage": body.stage, "updated_at": now})
-
-        # Log timeline event
-        ref.collection("timeline").add({
-            "event_type": body.stage,
-            "description": f"Stage updated to: {body.stage}",
-            "created_at": now,
-        })
-
-        merged = {**doc.to_dict(), "stage": body.stage, "updated_at": now, "id": doc.id}
-        return merged
+        return job
     except HTTPException:
         raise
     except Exception as exc:
@@ -409,33 +384,23 @@ async def update_notes(
 async def get_timeline(job_id: str, user: dict = Depends(get_current_user)):
     """Get the activity timeline for a specific job."""
     try:
-        from app.core.firebase import get_db
+        from app.services.firebase.job_service import get_timeline as _get_timeline
 
-        db = get_db()
-        job_doc = _job_ref(db, user["uid"], job_id).get()
-
-        if not job_doc.exists:
+        events = _get_timeline(user["uid"], job_id)
+        if events is None:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail="Job not found",
             )
-
-        events = []
-        docs = (
-            _job_ref(db, user["uid"], job_id)
-            .collection("timeline")
-            .order_by("created_at", direction="DESCENDING")
-            .stream()
-        )
-        for doc in docs:
-            data = doc.to_dict()
-            events.append(TimelineEvent(
-                id=doc.id,
-                event_type=data.get("event_type", ""),
-                description=data.get("description", ""),
-                created_at=data.get("created_at", ""),
-            ))
-        return events
+        return [
+            TimelineEvent(
+                id=event["id"],
+                event_type=event.get("event_type", ""),
+                description=event.get("description", ""),
+                created_at=event.get("created_at", ""),
+            )
+            for event in events
+        ]
     except HTTPException:
         raise
     except Exception as exc:
@@ -453,35 +418,15 @@ async def log_activity(
 ):
     """Log an activity event in the job timeline."""
     try:
-        from app.core.firebase import get_db
-
-        db = get_db()
-        job_doc = _job_ref(db, user["uid"], job_id).get()
+        from app.services.firebase.job_service import log_activity as _log_activity
 
-        if not job_doc.exists:
+        event = _log_activity(user["uid"], job_id, body.event_type, body.description)
+        if event is None:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail="Job not found",
             )
-
-        now = datetime.utcnow().isoformat()
-        event_data = {
-            "event_type": body.event_type,
-            "description": body.description,
-            "created_at": now,
-        }
-
-        _, ref = _job_ref(db, user["uid"], job_id).collection("timeline").add(event_data)
-
-        # Also update job's updated_at
-        _job_ref(db, user["uid"], job_id).update({"updated_at": now})
-
-        return TimelineEvent(
-            id=ref.id,
-            event_type=body.event_type,
-            description=body.description,
-            created_at=now,
-        )
+        return TimelineEvent(**event)
     except HTTPException:
         raise
     except Exception as exc:
@@ -2,7 +2,7 @@
 
 from fastapi import APIRouter, Depends, HTTPException, status
 
-from app.core.security import get_current_user
+from app.core.security import require_quota
 from app.schemas.linkedin import (
     LinkedInImportRequest,
     LinkedInAnalysis,
@@ -15,7 +15,7 @@ router = APIRouter()
 @router.post("/import")
 async def import_linkedin(
     body: LinkedInImportRequest,
-    user: dict = Depends(get_current_user),
+    user: dict = Depends(require_quota("imports")),
 ):
     """Import LinkedIn profile data from a URL or pasted text."""
     try:
@@ -77,7 +77,7 @@ async def import_linkedin(
 @router.post("/analyze", response_model=LinkedInAnalysis)
 async def analyze_profile(
     body: LinkedInImportRequest,
-    user: dict = Depends(get_current_user),
+    user: dict = Depends(require_quota("ai_improvements")),
 ):
     """Analyze a LinkedIn profile and provide an optimization score with suggestions."""
     try:
@@ -135,7 +135,7 @@ async def analyze_profile(
 @router.post("/generate-suggestions")
 async def generate_suggestions(
     body: GenerateSuggestionsRequest,
-    user: dict = Depends(get_current_user),
+    user: dict = Depends(require_quota("ai_improvements")),
 ):
     """Generate AI-powered suggestions to improve a specific LinkedIn section."""
     try:
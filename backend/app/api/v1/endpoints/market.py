@@ -3,7 +3,7 @@
 from fastapi import APIRouter, Depends, HTTPException, Query, status
 from typing import List, Optional
 
-from app.core.security import get_current_user
+from app.core.security import require_quota
 from app.schemas.market import (
     SalaryData,
     SkillDemand,
@@ -21,7 +21,7 @@ async def get_salary_data(
     country: str = Query(..., description="Country code or name"),
     city: Optional[str] = Query(None, description="City name"),
     experience: Optional[str] = Query(None, description="Experience level: junior, mid, senior"),
-    user: dict = Depends(get_current_user),
+    user: dict = Depends(require_quota("market_insights")),
 ):
     """Get salary data for a role in a specific location."""
     try:
@@ -55,7 +55,7 @@ async def get_salary_data(
 async def get_skills_demand(
     role: str = Query(..., description="Job title / role"),
     country: Optional[str] = Query(None, description="Country code or name"),
-    user: dict = Depends(get_current_user),
+    user: dict = Depends(require_quota("market_insights")),
 ):
     """Get in-demand skills for a role."""
     try:
@@ -96,7 +96,7 @@ async def get_skills_demand(
 async def get_competition_data(
     role: str = Query(..., description="Job title / role"),
     country: Optional[str] = Query(None, description="Country code or name"),
-    user: dict = Depends(get_current_user),
+    user: dict = Depends(require_quota("market_insights")),
 ):
     """Get competition data for a role in a market."""
     try:
@@ -124,7 +124,7 @@ async def get_competition_data(
 @router.get("/countries", response_model=List[CountryComparison])
 async def get_country_comparison(
     role: str = Query(..., description="Job title / role"),
-    user: dict = Depends(get_current_user),
+    user: dict = Depends(require_quota("market_insights")),
 ):
     """Compare job markets for a role across countries."""
     try:
@@ -156,7 +156,7 @@ async def get_country_comparison(
 
 @router.get("/insights", response_model=List[MarketInsight])
 async def get_personalized_insights(
-    user: dict = Depends(get_current_user),
+    user: dict = Depends(require_quota("market_insights")),
 ):
     """Get personalized market insights based on the user's profile and activity."""
     try:
@@ -2,7 +2,7 @@
 
 from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, status
 
-from app.core.security import get_current_user
+from app.core.security import get_current_user, require_quota
 from app.schemas.onboarding import OnboardingSaveRequest, OnboardingStatus
 
 router = APIRouter()
@@ -72,9 +72,14 @@ async def import_linkedin(user: dict = Depends(get_current_user)):
 @router.post("/parse-pdf", status_code=status.HTTP_200_OK)
 async def parse_pdf(
     file: UploadFile = File(...),
-    user: dict = Depends(get_current_user),
+    user: dict = Depends(require_quota("imports")),
 ):
-    """Parse an uploaded PDF CV and extract structured data."""
+    """Parse an uploaded PDF CV and extract structured data.
+
+    Shares the per-file-hash parse cache with ``/cv/upload-pdf``, so
+    uploading the same PDF there afterwards skips extraction and Gemini
+    (a cache hit does not count as an import).
+    """
     if not file.filename or not file.filename.lower().endswith(".pdf"):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -82,6 +87,9 @@ async def parse_pdf(
         )
 
     try:
+        import asyncio
+        from app.services.firebase import parse_cache
+
         contents = await file.read()
 
         if len(contents) > 10 * 1024 * 1024:  # 10MB limit
@@ -90,48 +98,50 @@ async def parse_pdf(
                 detail="File too large. Maximum size is 10MB.",
             )
 
+        digest = parse_cache.file_hash(contents)
+        cached = await asyncio.to_thread(parse_cache.lookup, user["uid"], digest)
+
         # Try to extract text from PDF
-        try:
-            import PyPDF2
-            import io
-
-            reader = PyPDF2.PdfReader(io.BytesIO(contents))
-            text = ""
-            for page in reader.pages:
-                text += page.extract_text() or ""
-        except ImportError:
-            # Fallback: return raw content info if PyPDF2 not available
-            return {
-                "message": "PDF parsing library not available",
-                "file_name": file.filename,
-                "file_size": len(contents),
-                "text": "",
-            }
-
-        # Use AI to extract structured CV data from text
-        try:
-            from app.services.ai.gemini_client import generate_json
-
-            prompt = (
-                "Extract structured CV data from the following text. "
-                "Return a JSON object with keys: contact_info (name, email, phone, location), "
-                "summary, experience (list of {job_title, company, start_date, end_date, bullets}), "
-                "education (list of {school, degree, field, graduation_date}), "
-                "skills (list of strings), languages (list of strings).\n\n"
-                f"CV Text:\n{text[:8000]}"
-            )
-            structured = await generate_json(prompt)
-            return {
-                "message": "PDF parsed successfully",
-                "data": structured,
-                "raw_text": text[:2000],
-            }
-        except Exception:
-            # Return raw text if AI parsing fails
-            return {
-                "message": "PDF text extracted, AI structuring failed",
-                "raw_text": text[:2000],
-            }
+        text = cached["text"]
+        if text is None:
+            try:
+                from app.services.pdf.extraction import extract_pdf_async
+
+                text = (await extract_pdf_async(contents)).text
+            except ImportError:
+                # Fallback: return raw content info if PyMuPDF is not available
+                return {
+                    "message": "PDF parsing library not available",
+                    "file_name": file.filename,
+                    "file_size": len(contents),
+                    "text": "",
+                }
+            if text:
+                await asyncio.to_thread(parse_cache.store_text, user["uid"], digest, text)
+
+        # Use AI to extract structured CV data from text (unless cached)
+        structured = cached["parsed"].get("cv")
+        if structured is not None:
+            from app.services.firebase.usage_service import refund
+
+            refund(user["uid"], "imports")
+        else:
+            try:
+                from app.services.ai.cv_parser import parse_cv_text
+
+                structured = await parse_cv_text(text)
+            except Exception:
+                # Return raw text if AI parsing fails
+                return {
+                    "message": "PDF text extracted, AI structuring failed",
+                    "raw_text": text[:2000],
+                }
+            await asyncio.to_thread(parse_cache.store_parsed, user["uid"], digest, "cv", structured)
+        return {
+            "message": "PDF parsed successfully",
+            "data": structured,
+            "raw_text": text[:2000],
+        }
     except HTTPException:
         raise
     except Exception as exc:
@@ -1,8 +1,10 @@
 """CV template browsing endpoints (no auth required)."""
 
-from fastapi import APIRouter, HTTPException, Query, status
+from fastapi import APIRouter, Header, HTTPException, Query, status
+from fastapi.responses import Response
 from typing import List, Optional
 
+from app.core.config import settings
 from app.schemas.template import Template, TemplateListResponse
 
 router = APIRouter()
@@ -145,6 +147,10 @@ TEMPLATES: List[dict] = [
 ]
 
 
+def _template(t: dict) -> Template:
+    return Template(**t, thumbnail_url=f"{settings.API_V1_PREFIX}/templates/{t['id']}/thumbnail")
+
+
 # ---------------------------------------------------------------------------
 # Endpoints
 # ---------------------------------------------------------------------------
@@ -196,7 +202,7 @@ async def list_templates(
         filtered.sort(key=lambda t: t["name"])
     # "newest" would sort by created_at, but since these are static, keep order
 
-    templates = [Template(**t) for t in filtered]
+    templates = [_template(t) for t in filtered]
     return TemplateListResponse(templates=templates, total=len(templates))
 
 
@@ -205,9 +211,60 @@ async def get_template(template_id: str):
     """Get details for a specific template."""
     for t in TEMPLATES:
         if t["id"] == template_id:
-            return Template(**t)
+            return _template(t)
 
     raise HTTPException(
         status_code=status.HTTP_404_NOT_FOUND,
         detail=f"Template '{template_id}' not found",
     )
+
+
+@router.get("/{template_id}/thumbnail")
+async def template_thumbnail(
+    template_id: str,
+    width: int = Query(320, ge=1, le=2000, description="Snapped up to 160, 320 or 640 px"),
+    format: str = Query("webp", pattern="^(webp|png)$"),
+    if_none_match: Optional[str] = Header(None),
+):
+    """The template rendered with sample data, as a small image (pre-rendered at startup)."""
+    if not any(t["id"] == template_id for t in TEMPLATES):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Template '{template_id}' not found",
+        )
+    try:
+        from app.services.pdf.generator import cv_render_key
+        from app.services.pdf.render_cache import etag_matches
+        from app.services.pdf.render_pool import RenderQueueFull, RenderTimeout
+        from app.services.pdf.thumbnails import (
+            MEDIA_TYPES,
+            generate_template_thumbnail,
+            snap_width,
+            template_sample,
+        )
+
+        width = snap_width(width)
+        etag = f'"{cv_render_key(template_sample(template_id))}-w{width}.{format}"'
+        headers = {"ETag": etag, "Cache-Control": "public, max-age=86400"}
+        if etag_matches(if_none_match, etag):
+            return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+        try:
+            data = await generate_template_thumbnail(template_id, width, format)
+        except RenderQueueFull as exc:
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail=str(exc),
+            )
+        except RenderTimeout as exc:
+            raise HTTPException(
+                status_code=status.HTTP_504_GATEWAY_TIMEOUT,
+                detail=str(exc),
+            )
+        return Response(content=data, media_type=MEDIA_TYPES[format], headers=headers)
+    except HTTPException:
+        raise
+    except Exception as exc:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to generate thumbnail: {exc}",
+        )
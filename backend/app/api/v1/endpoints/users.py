@@ -1,6 +1,8 @@
 """User profile and preferences endpoints."""
 
-from fastapi import APIRouter, Depends, HTTPException, status
+import logging
+
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, status
 
 from app.core.security import get_current_user
 from app.schemas.user import (
@@ -14,6 +16,8 @@ from app.schemas.user import (
 
 router = APIRouter()
 
+logger = logging.getLogger(__name__)
+
 
 @router.get("/profile", response_model=UserProfile)
 async def get_profile(user: dict = Depends(get_current_user)):
@@ -176,29 +180,42 @@ async def export_data(user: dict = Depends(get_current_user)):
         )
 
 
-@router.delete("/account", status_code=status.HTTP_200_OK)
-async def delete_account(user: dict = Depends(get_current_user)):
-    """Delete the user's account and all associated data."""
+def _delete_account_task(uid: str) -> None:
+    """Background job: remove all Firestore data, then the Firebase Auth user."""
+    from app.services.firebase.user_service import delete_user
+    from app.core.firebase import get_auth
+
     try:
-        from app.services.firebase.user_service import delete_user
-        from app.core.firebase import get_auth
+        delete_user(uid)
+    except Exception:
+        logger.exception("Account data deletion failed for %s", uid)
+        return
+
+    # Delete Firebase Auth user
+    try:
+        get_auth().delete_user(uid)
+    except Exception:
+        pass  # Best-effort deletion of auth record
+    logger.info("Account %s deleted", uid)
+
 
-        # Delete Firestore data
-        deleted = delete_user(user["uid"])
-        if not deleted:
+@router.delete("/account", status_code=status.HTTP_202_ACCEPTED)
+async def delete_account(
+    background_tasks: BackgroundTasks,
+    user: dict = Depends(get_current_user),
+):
+    """Schedule deletion of the user's account and all associated data."""
+    try:
+        from app.services.firebase.user_service import user_exists
+
+        if not user_exists(user["uid"]):
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail="User not found",
             )
 
-        # Delete Firebase Auth user
-        try:
-            auth = get_auth()
-            auth.delete_user(user["uid"])
-        except Exception:
-            pass  # Best-effort deletion of auth record
-
-        return {"message": "Account deleted successfully"}
+        background_tasks.add_task(_delete_account_task, user["uid"])
+        return {"message": "Account deletion started"}
     except HTTPException:
         raise
     except Exception as exc:
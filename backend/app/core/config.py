@@ -35,6 +35,47 @@ class Settings(BaseSettings):
     STRIPE_PRICE_ID_STARTER: str = ""
     STRIPE_PRICE_ID_PRO: str = ""
 
+    # In-process caches
+    USER_CACHE_TTL: int = 300  # seconds a cached profile/preferences doc stays fresh
+    USER_CACHE_SIZE: int = 10000
+    USER_CACHE_LISTEN: bool = False  # cross-worker invalidation via Firestore listener
+
+    # Outbound HTTP (shared async client)
+    HTTP_TIMEOUT_SECONDS: float = 10.0
+    HTTP_MAX_CONNECTIONS: int = 100
+    HTTP_CONNECT_RETRIES: int = 2  # transport-level retries of failed connects
+    HTTP_MAX_RETRIES: int = 2  # retries of timeouts and 429/502/503/504
+
+    # ID-token verification
+    AUTH_TOKEN_CACHE_SIZE: int = 10000  # decoded tokens kept in memory
+    AUTH_CERT_REFRESH_SECONDS: int = 600  # how often the signing certs are re-fetched
+    URL_SIGNING_SECRET: str = ""  # signs <img>-loadable URLs; empty = random per process (single worker)
+    SIGNED_URL_TTL: int = 3600  # signed URLs stay valid between one and two TTLs
+
+    # CV auto-save write-behind buffer (per process: single worker only)
+    AUTOSAVE_DEBOUNCE_SECONDS: float = 5.0  # flush after this much idle time; 0 = write immediately
+    AUTOSAVE_MAX_DELAY_SECONDS: float = 30.0  # ...or at most this long after the first edit
+
+    # PDF/DOCX rendering process pool
+    RENDER_WORKERS: int = 0  # worker processes; 0 = CPU count - 1
+    RENDER_QUEUE_SIZE: int = 16  # jobs allowed to wait beyond one per worker
+    RENDER_TIMEOUT_SECONDS: float = 20.0  # per-job deadline
+    RENDER_CACHE_MEMORY_ITEMS: int = 256  # rendered documents kept in memory
+    RENDER_CACHE_DIR: str = ""  # disk tier location; empty = <tmp>/cvflow-render-cache
+    RENDER_CACHE_DISK_MB: int = 512  # disk tier cap; 0 disables it
+    PDF_OUTPUT_MODE: str = "compact"  # standard, compact or web (linearised; needs pikepdf)
+    ATS_DOCUMENT_CACHE_SIZE: int = 64  # original PDFs kept indexed for repeat ATS downloads
+    ATS_DOCUMENT_CACHE_TTL: int = 900  # seconds an indexed original stays cached
+
+    # Upload parse cache (keyed by file hash)
+    PARSE_CACHE_TTL_DAYS: int = 30  # per-user extracted text + structured results
+    PARSE_CACHE_GLOBAL_TEXT: bool = False  # share extracted text (never AI results) across users
+
+    # Usage metering
+    USAGE_FLUSH_SECONDS: float = 10.0  # how often accumulated usage is written
+    USAGE_COUNTER_SHARDS: int = 4  # counter shards per user and month
+    USAGE_CACHE_TTL: int = 60  # seconds persisted totals are trusted for quota checks
+
     # Rate Limiting
     RATE_LIMIT_REQUESTS: int = 100
     RATE_LIMIT_PERIOD: int = 60
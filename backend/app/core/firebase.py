@@ -7,6 +7,8 @@ _db = None
 
 def init_firebase():
     global _db
+    if _db is not None:
+        return
 
     # Reuse existing default app if already initialized (survives uvicorn hot-reload)
     try:
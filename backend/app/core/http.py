@@ -0,0 +1,96 @@
+"""Application-scoped async HTTP client for outbound calls (Firebase REST APIs…).
+
+One ``httpx.AsyncClient`` is opened at startup and shared by every request,
+so TLS connections are kept alive and reused (HTTP/2 when ``h2`` is
+installed).  Endpoints receive it through the :func:`get_http_client`
+dependency; tests can swap it with ``app.dependency_overrides`` and an
+``httpx.MockTransport``.
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+
+import httpx
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+try:
+    import h2  # noqa: F401
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+# Upstream statuses worth retrying (transient overload / gateway errors)
+RETRY_STATUSES = {429, 502, 503, 504}
+
+_client: httpx.AsyncClient | None = None
+
+
+def create_http_client() -> httpx.AsyncClient:
+    transport = httpx.AsyncHTTPTransport(
+        http2=HTTP2_AVAILABLE,
+        retries=settings.HTTP_CONNECT_RETRIES,  # connection failures only
+        limits=httpx.Limits(
+            max_connections=settings.HTTP_MAX_CONNECTIONS,
+            max_keepalive_connections=settings.HTTP_MAX_CONNECTIONS,
+            keepalive_expiry=60,
+        ),
+    )
+    return httpx.AsyncClient(
+        transport=transport,
+        timeout=httpx.Timeout(settings.HTTP_TIMEOUT_SECONDS, connect=5.0),
+    )
+
+
+async def start_http_client() -> None:
+    global _client
+    if _client is None:
+        _client = create_http_client()
+
+
+async def close_http_client() -> None:
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """FastAPI dependency returning the shared client (created lazily if needed)."""
+    global _client
+    if _client is None:
+        _client = create_http_client()
+    return _client
+
+
+async def post_json(
+    client: httpx.AsyncClient,
+    url: str,
+    payload: dict,
+    retries: int | None = None,
+) -> httpx.Response:
+    """POST *payload* as JSON, retrying timeouts and transient 429/5xx responses.
+
+    Backs off exponentially (0.2 s, 0.4 s, …).  The last response or
+    exception is returned/raised unchanged.
+
+    A timeout or 5xx does not mean the upstream did nothing: pass
+    ``retries=0`` for calls with side effects (sending an email…).  Failed
+    connects are still retried by the transport, as the request never left.
+    """
+    retries = settings.HTTP_MAX_RETRIES if retries is None else retries
+    for attempt in range(retries + 1):
+        try:
+            resp = await client.post(url, json=payload)
+        except httpx.TransportError as exc:
+            if attempt == retries:
+                raise
+            logger.warning("POST %s failed (%s), retrying", url.split("?")[0], exc)
+        else:
+            if resp.status_code not in RETRY_STATUSES or attempt == retries:
+                return resp
+        await asyncio.sleep(0.2 * 2 ** attempt)
+    raise RuntimeError("unreachable")
@@ -0,0 +1,86 @@
+"""Subscription plans: prices, marketing features and monthly usage limits."""
+
+# ---------------------------------------------------------------------------
+# Plan feature definitions
+# ---------------------------------------------------------------------------
+
+PLAN_FEATURES = {
+    "free": {
+        "price": 0,
+        "features": [
+            "1 CV",
+            "Basic ATS analysis",
+            "3 AI improvements/month",
+            "1 cover letter/month",
+            "Basic templates",
+        ],
+        "limits": {
+            "cvs": 1,
+            "ai_improvements": 3,
+            "cover_letters": 1,
+            "interview_sessions": 2,
+            "ats_analyses": 3,
+            "market_insights": 5,
+            "imports": 10,
+        },
+    },
+    "starter": {
+        "price": 9.99,
+        "features": [
+            "5 CVs",
+            "Full ATS analysis",
+            "25 AI improvements/month",
+            "10 cover letters/month",
+            "All templates",
+            "Interview practice",
+            "Job tracker",
+        ],
+        "limits": {
+            "cvs": 5,
+            "ai_improvements": 25,
+            "cover_letters": 10,
+            "interview_sessions": 10,
+            "ats_analyses": 20,
+            "market_insights": 50,
+            "imports": 50,
+        },
+    },
+    "pro": {
+        "price": 19.99,
+        "features": [
+            "Unlimited CVs",
+            "Full ATS analysis",
+            "Unlimited AI improvements",
+            "Unlimited cover letters",
+            "All templates",
+            "Interview practice",
+            "Job tracker",
+            "Market intelligence",
+            "LinkedIn optimizer",
+            "Priority support",
+        ],
+        "limits": {
+            "cvs": -1,  # unlimited
+            "ai_improvements": -1,
+            "cover_letters": -1,
+            "interview_sessions": -1,
+            "ats_analyses": -1,
+            "market_insights": -1,
+            "imports": -1,
+        },
+    },
+}
+
+# Usage keys metered per calendar month (``cvs`` is a count of owned CVs).
+# ``imports`` covers every Gemini parse of outside content: CV PDFs, job
+# postings and LinkedIn profiles.
+METERED_FEATURES = (
+    "ai_improvements", "cover_letters", "interview_sessions", "ats_analyses",
+    "market_insights", "imports",
+)
+
+
+def plan_limit(plan: str, feature: str) -> int:
+    """Return the limit of *feature* for *plan* (-1 means unlimited)."""
+    limits = PLAN_FEATURES.get(plan, PLAN_FEATURES["free"])["limits"]
+    return limits.get(feature, 0)
@@ -1,26 +1,209 @@
-from fastapi import Depends, HTTPException, status
+import asyncio
+import hashlib
+import hmac
+import logging
+import secrets
+import threading
+import time
+from typing import Any, Callable, Optional
+from urllib.parse import urlencode
+
+from fastapi import Depends, HTTPException, Request, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from app.core.firebase import get_auth, init_firebase
+from app.core.cache import TTLCache
+from app.core.config import settings
+from app.core.firebase import get_auth
+
+logger = logging.getLogger(__name__)
 
 security = HTTPBearer()
+optional_security = HTTPBearer(auto_error=False)
+
+# Decoded ID tokens keyed by SHA-256 of the raw token, each kept until its
+# ``exp`` minus this many seconds.
+TOKEN_EXPIRY_SKEW = 30
+_token_cache = TTLCache(maxsize=settings.AUTH_TOKEN_CACHE_SIZE, ttl=3600)
+
+_cert_refresher = None
+_cert_refresher_stop = threading.Event()
+
+_url_secret = (settings.URL_SIGNING_SECRET or secrets.token_hex(32)).encode()
+
+
+def _token_key(token: str) -> str:
+    return hashlib.sha256(token.encode()).hexdigest()
+
+
+def _verify_token(token: str, key: str) -> dict:
+    """Verify *token* with Firebase and cache the resulting user until it expires."""
+    decoded_token = get_auth().verify_id_token(token)
+    user = {
+        "uid": decoded_token["uid"],
+        "email": decoded_token.get("email", ""),
+        "name": decoded_token.get("name", ""),
+    }
+    ttl = decoded_token.get("exp", 0) - time.time() - TOKEN_EXPIRY_SKEW
+    if ttl > 0:
+        _token_cache.set(key, user, ttl=ttl)
+    return user
 
 
 async def get_current_user(
     credentials: HTTPAuthorizationCredentials = Depends(security),
 ) -> dict:
-    """Verify Firebase ID token and return user info."""
+    """Verify Firebase ID token and return user info.
+
+    Tokens already verified in this process are served from memory; only
+    the first request with a given token pays for signature verification,
+    which then runs off the event loop.
+    """
     token = credentials.credentials
+    key = _token_key(token)
+    user = _token_cache.get(key)
+    if user is not None:
+        return dict(user)
     try:
-        init_firebase()
-        decoded_token = get_auth().verify_id_token(token)
-        return {
-            "uid": decoded_token["uid"],
-            "email": decoded_token.get("email", ""),
-            "name": decoded_token.get("name", ""),
-        }
+        return dict(await asyncio.to_thread(_verify_token, token, key))
     except Exception:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid or expired authentication token",
             headers={"WWW-Authenticate": "Bearer"},
         )
+
+
+# ---------------------------------------------------------------------------
+# Signed URLs  (resources loaded by <img>, which cannot send a Bearer token)
+# ---------------------------------------------------------------------------
+
+def _url_signature(path: str, uid: str, expires: int) -> str:
+    message = f"{path}\n{uid}\n{expires}".encode()
+    return hmac.new(_url_secret, message, hashlib.sha256).hexdigest()
+
+
+def sign_url(path: str, uid: str) -> str:
+    """Return *path* with a signature granting *uid*'s access to it.
+
+    The expiry is rounded up to a ``SIGNED_URL_TTL`` boundary so the URL
+    stays the same (and browser-cacheable) for a while; it is valid for
+    between one and two TTLs.
+    """
+    ttl = settings.SIGNED_URL_TTL
+    expires = (int(time.time()) // ttl + 2) * ttl
+    query = urlencode({"uid": uid, "expires": expires, "signature": _url_signature(path, uid, expires)})
+    return f"{path}?{query}"
+
+
+async def get_user_or_signed_url(
+    request: Request,
+    credentials: Optional[HTTPAuthorizationCredentials] = Depends(optional_security),
+) -> dict:
+    """Like :func:`get_current_user`, but also accepts a URL from :func:`sign_url`."""
+    signature = request.query_params.get("signature")
+    if signature is None:
+        if credentials is None:
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="Not authenticated",
+                headers={"WWW-Authenticate": "Bearer"},
+            )
+        return await get_current_user(credentials)
+
+    uid = request.query_params.get("uid", "")
+    try:
+        expires = int(request.query_params.get("expires", ""))
+    except ValueError:
+        expires = 0
+    expected = _url_signature(request.url.path, uid, expires)
+    if not uid or expires < time.time() or not hmac.compare_digest(signature, expected):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid or expired signed URL",
+        )
+    return {"uid": uid, "email": "", "name": ""}
+
+
+def _cert_warmer() -> Optional[Callable[[], Any]]:
+    """Return a callable fetching the ID-token signing certs through the
+    verifier's HTTP cache, or None if it cannot be reached.
+
+    The verifier caches the certificates per their Cache-Control headers;
+    hitting it periodically means a refresh happens here instead of inside
+    a user request.  firebase_admin exposes no public handle on that cache,
+    so the private attributes are looked up once: if an upgrade renames
+    them, warming is disabled (verification itself is unaffected).
+    """
+    import firebase_admin
+    from firebase_admin import auth
+
+    try:
+        verifier = auth._get_client(firebase_admin.get_app())._token_verifier
+        request, cert_url = verifier.request, verifier.id_token_verifier.cert_url
+    except AttributeError as exc:
+        logger.warning("ID-token certificate warming disabled, firebase_admin internals changed: %s", exc)
+        return None
+    return lambda: request(cert_url)
+
+
+def start_cert_refresher() -> None:
+    """Warm the signing certs now and every ``AUTH_CERT_REFRESH_SECONDS``."""
+    global _cert_refresher
+    if _cert_refresher is not None and _cert_refresher.is_alive():
+        return
+
+    def _run() -> None:
+        try:
+            warm = _cert_warmer()
+        except Exception as exc:
+            logger.warning("Could not set up ID-token certificate warming: %s", exc)
+            return
+        if warm is None:
+            return
+        while True:
+            try:
+                warm()
+            except Exception as exc:
+                logger.warning("Could not refresh ID-token certificates: %s", exc)
+            if _cert_refresher_stop.wait(settings.AUTH_CERT_REFRESH_SECONDS):
+                return
+
+    _cert_refresher_stop.clear()
+    _cert_refresher = threading.Thread(target=_run, name="auth-cert-refresher", daemon=True)
+    _cert_refresher.start()
+
+
+def stop_cert_refresher() -> None:
+    _cert_refresher_stop.set()
+
+
+def require_quota(feature: str):
+    """Dependency factory: authenticate and consume one use of *feature*.
+
+    Rejects the request with 402 before the endpoint runs (and before any
+    Gemini call) when the user's plan limit for this month is reached.  The
+    use is given back if the endpoint raises.
+    """
+    async def _dependency(user: dict = Depends(get_current_user)):
+        from app.services.firebase.usage_service import refund, try_consume
+        from app.services.firebase.user_service import get_plan
+
+        try:
+            allowed = try_consume(user["uid"], get_plan(user["uid"]), feature)
+        except Exception as exc:
+            # Metering must not take the AI features down with it
+            logger.warning("Usage check failed for %s/%s: %s", user["uid"], feature, exc)
+            yield user
+            return
+
+        if not allowed:
+            raise HTTPException(
+                status_code=status.HTTP_402_PAYMENT_REQUIRED,
+                detail=f"Monthly limit reached for {feature.replace('_', ' ')}. Upgrade your plan to continue.",
+            )
+        try:
+            yield user
+        except Exception:
+            refund(user["uid"], feature)
+            raise
+
+    return _dependency
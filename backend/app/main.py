@@ -1,8 +1,15 @@
+import asyncio
+import logging
+import os
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
 from app.core.config import settings
 from app.core.firebase import init_firebase
+from app.core.http import close_http_client, start_http_client
+from app.core.security import start_cert_refresher, stop_cert_refresher
+from app.services.pdf.render_pool import start_render_pool, stop_render_pool
 from app.api.v1.router import api_router
 
 app = FastAPI(
@@ -23,9 +30,57 @@ app.add_middleware(
 )
 
 
+logger = logging.getLogger(__name__)
+
+# Strong references to fire-and-forget startup tasks
+_background_tasks: set[asyncio.Task] = set()
+
+
 @app.on_event("startup")
 async def startup_event():
     init_firebase()
+    if settings.AUTOSAVE_DEBOUNCE_SECONDS > 0 and int(os.environ.get("WEB_CONCURRENCY", "1")) > 1:
+        logger.warning(
+            "Auto-save buffering is per process and WEB_CONCURRENCY > 1: "
+            "set AUTOSAVE_DEBOUNCE_SECONDS=0 to avoid stale CV reads"
+        )
+    start_cert_refresher()
+    await start_http_client()
+    await start_render_pool()
+    # Gallery thumbnails render in the background; cached ones are skipped
+    from app.services.pdf.thumbnails import prerender_template_thumbnails
+
+    task = asyncio.create_task(prerender_template_thumbnails())
+    _background_tasks.add(task)
+    task.add_done_callback(_background_tasks.discard)
+    if settings.USER_CACHE_LISTEN:
+        from app.services.firebase.user_service import start_invalidation_listener
+
+        start_invalidation_listener()
+
+    # Webhook events whose background processing was cut short (restart,
+    # crash) are still in the ledger; replay them without delaying startup.
+    from app.services.stripe.stripe_service import replay_unprocessed_events
+
+    asyncio.get_running_loop().run_in_executor(None, replay_unprocessed_events)
+
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    from app.services.firebase.cv_service import autosave_buffer
+    from app.services.firebase.usage_service import stop_flusher
+    from app.services.firebase.user_service import stop_invalidation_listener
+    from app.services.stripe.stripe_service import close_client
+
+    stop_cert_refresher()
+    autosave_buffer.stop()
+    stop_flusher()
+    stop_invalidation_listener()
+    await close_client()
+    await close_http_client()
+    for task in _background_tasks:
+        task.cancel()
+    await stop_render_pool()
 
 
 @app.get("/health")
@@ -1,5 +1,5 @@
 from pydantic import BaseModel, field_validator
-from typing import List, Optional
+from typing import List, Literal, Optional
 
 
 class ATSAnalyzeRequest(BaseModel):
@@ -77,6 +77,7 @@ class ATSDownloadRequest(BaseModel):
     diff_changes: List[DiffChange]      # full list from the analysis result
     accepted_changes: List[int]         # indices of changes accepted by the user
     added_keywords: List[str]           # keywords the user clicked to add
+    output: Optional[Literal["standard", "compact", "web"]] = None  # None = server default
 
 
 class JobPostingData(BaseModel):
@@ -1,5 +1,5 @@
 from pydantic import BaseModel
-from typing import List, Optional
+from typing import List, Literal, Optional
 
 
 class CoverLetterGenerateRequest(BaseModel):
@@ -24,6 +24,10 @@ class CoverLetterVersion(BaseModel):
     created_at: str
 
 
+class CoverLetterVersionDetail(CoverLetterVersion):
+    paragraphs: List[str]
+
+
 class CoverLetterContent(BaseModel):
     id: Optional[str] = None
     cv_id: str
@@ -40,3 +44,4 @@ class CoverLetterDownloadRequest(BaseModel):
     format: str = "pdf"  # pdf, docx
     tone: str = "professional"
     letter_format: str = "us"
+    output: Optional[Literal["standard", "compact", "web"]] = None  # PDF output mode
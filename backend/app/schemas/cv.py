@@ -1,5 +1,6 @@
-from pydantic import BaseModel
-from typing import Optional, List
+from functools import lru_cache
+from pydantic import BaseModel, ConfigDict, Field, TypeAdapter, model_validator
+from typing import Any, Dict, Literal, Optional, List
 
 
 class ContactInfo(BaseModel):
@@ -55,8 +56,63 @@ class CVUpdate(BaseModel):
 
 
 class CVSectionUpdate(BaseModel):
+    section: Optional[str] = None  # defaults to the section in the URL
+    data: Any  # dict for contact_info, str for summary, list for the rest
+
+
+class CVSectionResponse(BaseModel):
     section: str
-    data: dict
+    data: Any
+    updated_at: str
+
+
+CV_SECTIONS = tuple(CVContent.model_fields)
+
+
+@lru_cache(maxsize=None)
+def _section_adapter(section: str) -> TypeAdapter:
+    return TypeAdapter(CVContent.model_fields[section].annotation)
+
+
+def validate_section(section: str, data: Any) -> Any:
+    """Validate *data* against a single CVContent field and return it serialised.
+
+    Raises KeyError for unknown sections and pydantic.ValidationError for
+    invalid data.
+    """
+    if section not in CV_SECTIONS:
+        raise KeyError(section)
+    adapter = _section_adapter(section)
+    return adapter.dump_python(adapter.validate_python(data))
+
+
+class JsonPatchOperation(BaseModel):
+    model_config = ConfigDict(populate_by_name=True)
+
+    op: Literal["add", "remove", "replace", "move", "copy", "test"]
+    path: str  # JSON Pointer into CVContent, e.g. /experience/0/bullets/1
+    value: Any = None
+    from_: Optional[str] = Field(None, alias="from")
+
+    @model_validator(mode="after")
+    def _check_members(self):
+        # RFC 6902 §4: a missing member makes the operation invalid (an
+        # explicit "value": null is fine)
+        if self.op in ("add", "replace", "test") and "value" not in self.model_fields_set:
+            raise ValueError(f"'{self.op}' operation requires a 'value' member")
+        if self.op in ("move", "copy") and self.from_ is None:
+            raise ValueError(f"'{self.op}' operation requires a 'from' member")
+        return self
+
+
+class CVPatchRequest(BaseModel):
+    revision: int  # revision the operations were computed against
+    operations: List[JsonPatchOperation]
+
+
+class CVPatchResponse(BaseModel):
+    revision: int
+    updated_at: str
 
 
 class CVSummary(BaseModel):
@@ -67,6 +123,7 @@ class CVSummary(BaseModel):
     status: str = "draft"
     created_at: str
     updated_at: str
+    thumbnail_url: Optional[str] = None  # signed first-page image URL, usable as <img src>
 
 
 class CVDetail(BaseModel):
@@ -76,5 +133,47 @@ class CVDetail(BaseModel):
     content: CVContent
     ats_score: Optional[int] = None
     status: str = "draft"
+    revision: int = 0
+    section_revisions: Dict[str, int] = {}
     created_at: str
     updated_at: str
+
+
+class CVVersionCreate(BaseModel):
+    label: Optional[str] = None
+
+
+class CVVersion(BaseModel):
+    id: str
+    label: Optional[str] = None
+    created_at: str
+
+
+class CVVersionDetail(CVVersion):
+    title: str
+    template_id: str
+    content: CVContent
+
+
+class CVLayoutBox(BaseModel):
+    """Where one section lands on one page (points, origin top-left)."""
+    section: str
+    column: str
+    page: int
+    x: float
+    y: float
+    width: float
+    height: float
+    lines: int
+    line_y: List[float] = []  # top of each wrapped line, page coordinates
+
+
+class CVLayout(BaseModel):
+    template_id: str
+    page_count: int
+    page_width: float
+    page_height: float
+    max_pages: int
+    fits: bool
+    sections: List[CVLayoutBox]
+    warnings: List[str] = []
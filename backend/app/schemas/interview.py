@@ -1,4 +1,4 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from typing import List, Optional
 
 
@@ -8,7 +8,7 @@ class InterviewStartRequest(BaseModel):
     company: Optional[str] = None
     interview_type: str = "behavioral"  # behavioral, technical, case, cultural
     difficulty: int = 50  # 0-100
-    session_length: int = 10  # 5, 10, 15
+    session_length: int = Field(10, ge=1, le=15)  # 5, 10, 15; bounds the Gemini turns a session buys
     language: str = "en"
 
 
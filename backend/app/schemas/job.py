@@ -28,6 +28,13 @@ class JobStageUpdate(BaseModel):
     stage: str  # saved, applied, interview, offer, rejected
 
 
+class TimelineEvent(BaseModel):
+    id: str
+    event_type: str  # applied, interview_scheduled, email_sent, cv_tailored, saved
+    description: str
+    created_at: str
+
+
 class JobDetail(BaseModel):
     id: str
     company: str
@@ -43,6 +50,7 @@ class JobDetail(BaseModel):
     ats_match: Optional[int] = None
     days_waiting: Optional[int] = None
     notes: Optional[str] = None
+    recent_timeline: List[TimelineEvent] = []  # latest events, newest first
     created_at: str
     updated_at: str
 
@@ -61,13 +69,6 @@ class ImportJobUrlRequest(BaseModel):
     url: str
 
 
-class TimelineEvent(BaseModel):
-    id: str
-    event_type: str  # applied, interview_scheduled, email_sent, cv_tailored, saved
-    description: str
-    created_at: str
-
-
 class LogActivityRequest(BaseModel):
     event_type: str
     description: str
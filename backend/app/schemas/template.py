@@ -22,6 +22,7 @@ class Template(BaseModel):
     description: str = ""
     colors: List[str] = []
     preview: Optional[TemplatePreview] = None
+    thumbnail_url: Optional[str] = None
 
 
 class TemplateListResponse(BaseModel):
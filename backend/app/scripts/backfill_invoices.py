@@ -0,0 +1,25 @@
+"""Backfill the local invoice ledger from Stripe.
+
+Usage (from backend/)::
+
+    python -m app.scripts.backfill_invoices
+"""
+import asyncio
+import logging
+
+from app.core.firebase import init_firebase
+from app.services.stripe.stripe_service import backfill_invoices, close_client
+
+
+async def main() -> None:
+    init_firebase()
+    try:
+        written = await backfill_invoices()
+    finally:
+        await close_client()
+    print(f"Backfilled {written} invoices")
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(main())
@@ -0,0 +1,61 @@
+"""
+Structuring of extracted CV text (PDF uploads, onboarding) with Gemini.
+"""
+
+from __future__ import annotations
+
+from app.services.ai import gemini_client
+
+
+async def parse_cv_text(raw_text: str) -> dict:
+    """Turn the plain text of an uploaded CV into ``CVContent``-shaped JSON.
+
+    Only the first 8000 characters are sent.  The result also carries an
+    inferred ``title`` for the new CV document.
+    """
+    prompt = f"""Extract the following CV/resume text into a structured JSON object.
+
+CV TEXT:
+{raw_text[:8000]}
+
+Return ONLY a JSON object with this exact structure (omit fields that are not present):
+{{
+  "title": "Inferred CV title like 'John Doe — Software Engineer'",
+  "contact_info": {{
+    "name": "Full name",
+    "email": "email@example.com",
+    "phone": "+1234567890",
+    "location": "City, Country",
+    "linkedin": "linkedin URL if present",
+    "website": "personal website if present"
+  }},
+  "summary": "Professional summary paragraph if present",
+  "experience": [
+    {{
+      "job_title": "Job Title",
+      "company": "Company Name",
+      "location": "City, Country",
+      "start_date": "Month Year",
+      "end_date": "Month Year",
+      "current": false,
+      "bullets": ["Achievement or responsibility 1", "Achievement 2"]
+    }}
+  ],
+  "education": [
+    {{
+      "school": "University Name",
+      "degree": "Bachelor / Master / PhD",
+      "field": "Computer Science",
+      "graduation_date": "2020",
+      "gpa": "3.8"
+    }}
+  ],
+  "skills": ["Python", "React", "SQL"],
+  "languages": ["English", "French"],
+  "certifications": ["AWS Certified", "PMP"],
+  "projects": [
+    {{"name": "Project Name", "description": "Short description", "url": ""}}
+  ]
+}}"""
+
+    return await gemini_client.generate_json(prompt)
@@ -0,0 +1,190 @@
+from __future__ import annotations
+from datetime import datetime
+
+from firebase_admin import firestore
+from google.api_core.exceptions import AlreadyExists
+
+from app.core.firebase import get_db
+
+
+# ---------------------------------------------------------------------------
+# Helpers
+# ---------------------------------------------------------------------------
+
+def _events_col():
+    return get_db().collection("stripe_events")
+
+
+def _customers_col():
+    return get_db().collection("stripe_customers")
+
+
+# ---------------------------------------------------------------------------
+# Webhook idempotency ledger  (stripe_events/{event_id})
+# ---------------------------------------------------------------------------
+
+def record_event(event_id: str, event_type: str, payload: str) -> bool:
+    """Persist a verified webhook event before it is acknowledged.
+
+    *payload* is the raw JSON body, stored as-is (Stripe objects may nest
+    arrays, which Firestore maps cannot hold).  Returns False if the event
+    was already recorded, i.e. this delivery is a Stripe retry.
+    """
+    try:
+        _events_col().document(event_id).create({
+            "type": event_type,
+            "payload": payload,
+            "status": "pending",
+            "attempts": 0,
+            "received_at": datetime.utcnow().isoformat(),
+        })
+    except AlreadyExists:
+        return False
+    return True
+
+
+def get_event(event_id: str) -> dict | None:
+    """Return a ledger entry or None."""
+    doc = _events_col().document(event_id).get()
+    if not doc.exists:
+        return None
+    data = doc.to_dict()
+    data["id"] = doc.id
+    return data
+
+
+def mark_event(event_id: str, status: str, error: str | None = None) -> None:
+    """Record the outcome of processing an event ("processed" or "failed")."""
+    _events_col().document(event_id).update({
+        "status": status,
+        "error": error,
+        "attempts": firestore.Increment(1),
+        "processed_at": datetime.utcnow().isoformat(),
+    })
+
+
+def unprocessed_event_ids(limit: int = 100) -> list[str]:
+    """Return ids of events still pending or failed (for replay at startup)."""
+    docs = (
+        _events_col()
+        .where("status", "in", ["pending", "failed"])
+        .select([])
+        .limit(limit)
+        .stream()
+    )
+    return [doc.id for doc in docs]
+
+
+# ---------------------------------------------------------------------------
+# Customer index  (stripe_customers/{customer_id} -> uid)
+# ---------------------------------------------------------------------------
+
+def link_customer(customer_id: str, uid: str) -> None:
+    """Map a Stripe customer to a user for O(1) webhook lookups."""
+    _customers_col().document(customer_id).set({
+        "uid": uid,
+        "updated_at": datetime.utcnow().isoformat(),
+    })
+
+
+def unlink_customer(customer_id: str) -> None:
+    _customers_col().document(customer_id).delete()
+
+
+def uid_for_customer(customer_id: str) -> str | None:
+    """Return the uid owning *customer_id*, or None.
+
+    Customers linked before the index existed are found with a one-off
+    query on ``users.stripe_customer_id`` and backfilled into the index.
+    """
+    doc = _customers_col().document(customer_id).get()
+    if doc.exists:
+        return (doc.to_dict() or {}).get("uid")
+
+    users = (
+        get_db().collection("users")
+        .where("stripe_customer_id", "==", customer_id)
+        .limit(1)
+        .stream()
+    )
+    for user_doc in users:
+        link_customer(customer_id, user_doc.id)
+        return user_doc.id
+    return None
+
+
+# ---------------------------------------------------------------------------
+# Invoice ledger  (users/{uid}/invoices/{stripe_invoice_id})
+# ---------------------------------------------------------------------------
+
+def _invoices_col(uid: str):
+    return get_db().collection("users").document(uid).collection("invoices")
+
+
+def upsert_invoice(uid: str, invoice: dict, status: str) -> None:
+    """Write a Stripe invoice into the user's local ledger.
+
+    Keyed by the Stripe invoice id, so webhook retries and backfills are
+    idempotent.  A late ``payment_failed`` never overwrites a ``paid`` entry.
+    """
+    ref = _invoices_col(uid).document(invoice["id"])
+    if status != "paid":
+        existing = ref.get()
+        if existing.exists and (existing.to_dict() or {}).get("status") == "paid":
+            return
+
+    amount = invoice.get("amount_paid") if status == "paid" else invoice.get("amount_due")
+    ref.set({
+        "stripe_invoice_id": invoice["id"],
+        "number": invoice.get("number"),
+        "amount": (amount or 0) / 100,
+        "currency": invoice.get("currency", "usd"),
+        "status": status,
+        "date": invoice.get("created"),
+        "pdf_url": invoice.get("invoice_pdf"),
+        "hosted_url": invoice.get("hosted_invoice_url"),
+        "synced_at": datetime.utcnow().isoformat(),
+    })
+
+
+def list_invoices(uid: str, limit: int = 20, starting_after: str | None = None) -> list[dict]:
+    """Return a page of ledger invoices, newest first.
+
+    *starting_after* is the id of the last invoice of the previous page.
+    """
+    query = _invoices_col(uid).order_by("date", direction="DESCENDING")
+    if starting_after:
+        cursor = _invoices_col(uid).document(starting_after).get()
+        if cursor.exists:
+            query = query.start_after(cursor)
+    results = []
+    for doc in query.limit(limit).stream():
+        item = doc.to_dict()
+        item["id"] = doc.id
+        results.append(item)
+    return results
+
+
+def linked_customers() -> list[tuple[str, str]]:
+    """Return every ``(customer_id, uid)`` pair known to the index or users."""
+    pairs = {
+        doc.id: (doc.to_dict() or {}).get("uid")
+        for doc in _customers_col().stream()
+    }
+    users = get_db().collection("users").where("stripe_customer_id", ">", "").select(["stripe_customer_id"])
+    for doc in users.stream():
+        customer_id = (doc.to_dict() or {}).get("stripe_customer_id")
+        if customer_id and customer_id not in pairs:
+            pairs[customer_id] = doc.id
+    return [(customer_id, uid) for customer_id, uid in pairs.items() if uid]
+
+
+def drop_legacy_invoices(uid: str) -> int:
+    """Delete pre-ledger invoice docs (random ids) once their Stripe-keyed copy exists."""
+    removed = 0
+    for doc in _invoices_col(uid).stream():
+        invoice_id = (doc.to_dict() or {}).get("stripe_invoice_id")
+        if invoice_id and invoice_id != doc.id and _invoices_col(uid).document(invoice_id).get().exists:
+            doc.reference.delete()
+            removed += 1
+    return removed
@@ -0,0 +1,78 @@
+"""Recursive, batched Firestore deletion built on ``Client.recursive_delete``.
+
+Descendants are found with one all-descendants query per collection
+rather than a ``collections()`` call per document, so nested data
+(``cover_letters/*/versions``, ``jobs/*/timeline``, ``usage``,
+``invoices``…) is never left orphaned and discovery costs a single
+streamed query.  The deletes go through a ``BulkWriter`` in parallel mode,
+which batches them and applies Firestore's 500/50/5 ramp-up rule for us.
+"""
+from __future__ import annotations
+
+import logging
+import threading
+from typing import Callable, Optional
+
+from google.cloud.firestore_v1.bulk_writer import BulkWriterOptions, SendMode
+
+from app.core.firebase import get_db
+
+logger = logging.getLogger(__name__)
+
+# Documents fetched per page by the descendants query
+PAGE_SIZE = 500
+
+
+def _writer(on_delete: Callable[[], None]):
+    writer = get_db().bulk_writer(options=BulkWriterOptions(mode=SendMode.parallel))
+    writer.on_write_result(lambda *_: on_delete())
+    return writer
+
+
+def delete_tree(
+    ref,
+    include_self: bool = True,
+    on_progress: Optional[Callable[[int], None]] = None,
+    progress_every: int = PAGE_SIZE,
+) -> int:
+    """Delete *ref* and everything below it.  Returns the number of deletes queued.
+
+    *ref* may be a ``DocumentReference`` or a ``CollectionReference``.  With
+    ``include_self=False`` only the subcollections of a document are removed
+    (useful when the document itself is deleted in a caller's batch).
+    *on_progress* is called with the running count of completed deletes
+    every *progress_every* deletes and once at the end.
+    """
+    db = get_db()
+    lock = threading.Lock()
+    done = 0
+
+    def _on_delete() -> None:
+        nonlocal done
+        with lock:
+            done += 1
+            report = on_progress and done % progress_every == 0
+            count = done
+        if report:
+            on_progress(count)
+
+    # recursive_delete closes its writer, so each call gets a fresh one
+    if include_self or hasattr(ref, "list_documents"):
+        targets = [ref]
+    else:
+        targets = list(ref.collections())
+
+    deleted = 0
+    for target in targets:
+        deleted += db.recursive_delete(target, bulk_writer=_writer(_on_delete), chunk_size=PAGE_SIZE)
+
+    if on_progress:
+        on_progress(deleted)
+    return deleted
+
+
+def log_progress(label: str) -> Callable[[int], None]:
+    """Return an *on_progress* callback that logs under *label*."""
+    def _log(count: int) -> None:
+        logger.info("%s: %d documents deleted", label, count)
+    return _log
@@ -2,6 +2,7 @@ from __future__ import annotations
 from datetime import datetime
 
 from app.core.firebase import get_db
+from app.services.firebase import version_store
 
 
 # ---------------------------------------------------------------------------
@@ -16,10 +17,6 @@ def _cl_ref(uid: str, cl_id: str):
     return _cls_col(uid).document(cl_id)
 
 
-def _versions_col(uid: str, cl_id: str):
-    return _cl_ref(uid, cl_id).collection("versions")
-
-
 # ---------------------------------------------------------------------------
 # Cover Letter CRUD
 # ---------------------------------------------------------------------------
@@ -52,59 +49,55 @@ def get_cover_letter(uid: str, cl_id: str) -> dict | None:
 
 
 # ---------------------------------------------------------------------------
-# Versioning
+# Versioning  (snapshots + diffs, see version_store)
 # ---------------------------------------------------------------------------
 
-def save_version(uid: str, cl_id: str, data: dict) -> dict | None:
-    """Save a new version snapshot in the cover letter's versions subcollection.
+def _version_state(cl: dict) -> dict:
+    return {
+        "paragraphs": cl.get("paragraphs", []),
+        "tone": cl.get("tone", "professional"),
+    }
+
+
+def _version_item(version: dict) -> dict:
+    # Legacy full-copy versions kept the tone at the top level
+    tone = version["meta"].get("tone") or version.get("tone") or "professional"
+    return {"id": version["id"], "tone": tone, "created_at": version.get("created_at", "")}
 
-    The current content of the cover letter is stored as a version before
-    being overwritten.  Returns the version dict or None if the cover letter
-    does not exist.
+
+def save_version(uid: str, cl_id: str, meta: dict | None = None) -> dict | None:
+    """Save the current state of the cover letter as a new version.
+
+    Returns ``{"id", "tone", "created_at"}`` or None if the cover letter does
+    not exist.
     """
     cl = get_cover_letter(uid, cl_id)
     if cl is None:
         return None
-
-    now = datetime.utcnow().isoformat()
-    version_payload = {
-        **data,
-        "saved_at": now,
-    }
-    _, version_ref = _versions_col(uid, cl_id).add(version_payload)
-    version_payload["id"] = version_ref.id
-
-    # Also update the main cover letter document with the new content if
-    # the caller included "content" in data.
-    if "content" in data:
-        _cl_ref(uid, cl_id).update({
-            "content": data["content"],
-            "updated_at": now,
-        })
-
-    return version_payload
+    state = _version_state(cl)
+    version = version_store.save(_cl_ref(uid, cl_id), state, {"tone": state["tone"], **(meta or {})})
+    return None if version is None else _version_item(version)
 
 
 def list_versions(uid: str, cl_id: str) -> list[dict] | None:
-    """List all saved versions for a cover letter, newest first.
+    """List saved versions (metadata only), newest first.
 
     Returns None if the cover letter itself does not exist.
     """
-    cl_doc = _cl_ref(uid, cl_id).get()
-    if not cl_doc.exists:
+    ref = _cl_ref(uid, cl_id)
+    if not ref.get().exists:
         return None
+    return [_version_item(v) for v in version_store.list_versions(ref, extra_fields=["tone"])]
 
-    docs = (
-        _versions_col(uid, cl_id)
-        .order_by("saved_at", direction="DESCENDING")
-        .stream()
-    )
-    results = []
-    for doc in docs:
-        item = doc.to_dict()
-        item["id"] = doc.id
-        results.append(item)
-    return results
+
+def get_version(uid: str, cl_id: str, version_id: str) -> dict | None:
+    """Return a version with its paragraphs, or None if not found."""
+    version = version_store.get_version(_cl_ref(uid, cl_id), version_id)
+    if version is None:
+        return None
+    state = version["state"]
+    return {**_version_item(version), "tone": state.get("tone", "professional"),
+            "paragraphs": state.get("paragraphs", [])}
 
 
 def restore_version(uid: str, cl_id: str, version_id: str) -> dict | None:
@@ -118,24 +111,18 @@ def restore_version(uid: str, cl_id: str, version_id: str) -> dict | None:
     if cl is None:
         return None
 
-    version_doc = _versions_col(uid, cl_id).document(version_id).get()
-    if not version_doc.exists:
+    version = get_version(uid, cl_id, version_id)
+    if version is None:
         return None
 
-    version_data = version_doc.to_dict()
-    now = datetime.utcnow().isoformat()
-
     # Save current state as a version before overwriting
-    current_snapshot = {k: v for k, v in cl.items() if k not in ("id", "uid", "created_at")}
-    current_snapshot["restored_from"] = version_id
-    save_version(uid, cl_id, current_snapshot)
+    save_version(uid, cl_id, {"restored_from": version_id})
 
-    # Restore fields from the chosen version (exclude version metadata)
     restore_fields = {
-        k: v for k, v in version_data.items()
-        if k not in ("id", "saved_at", "restored_from")
+        "paragraphs": version["paragraphs"],
+        "tone": version["tone"],
+        "word_count": sum(len(p.split()) for p in version["paragraphs"]),
+        "updated_at": datetime.utcnow().isoformat(),
     }
-    restore_fields["updated_at"] = now
-
     _cl_ref(uid, cl_id).update(restore_fields)
     return {**cl, **restore_fields, "id": cl_id}
@@ -1,7 +1,19 @@
 from __future__ import annotations
+import logging
 from datetime import datetime
+from typing import Any, Callable
 
+from firebase_admin import firestore
+from google.api_core.exceptions import NotFound
+
+from app.core.config import settings
 from app.core.firebase import get_db
+from app.services.firebase import version_store
+from app.services.firebase.bulk_delete import delete_tree
+from app.services.firebase.write_behind import WriteBehindBuffer
+from app.utils.json_patch import apply_patch, touched_paths
+
+logger = logging.getLogger(__name__)
 
 
 # ---------------------------------------------------------------------------
@@ -16,12 +28,98 @@ def _cv_ref(uid: str, cv_id: str):
     return _cvs_col(uid).document(cv_id)
 
 
+def _changed_sections(old_content: dict | None, new_content: dict | None) -> list[str]:
+    """Top-level content sections whose value differs between the two."""
+    old_content = old_content or {}
+    return [s for s, value in (new_content or {}).items() if old_content.get(s) != value]
+
+
+def _section_increments(sections: list[str]) -> dict:
+    """Dotted ``section_revisions.<section>`` increments for a ``update()``."""
+    return {
+        firestore.FieldPath("section_revisions", section).to_api_repr(): firestore.Increment(1)
+        for section in sections
+    }
+
+
+# ---------------------------------------------------------------------------
+# Auto-save write-behind buffer
+# ---------------------------------------------------------------------------
+
+def _write_autosave(key: tuple[str, str], value: dict) -> None:
+    uid, cv_id = key
+    ref = _cv_ref(uid, cv_id)
+
+    @firestore.transactional
+    def _write(transaction):
+        snapshot = ref.get(transaction=transaction)
+        if not snapshot.exists:
+            logger.info("Auto-save dropped: CV %s/%s no longer exists", uid, cv_id)
+            return
+        stored = snapshot.to_dict()
+        current = stored.get("revision", 0)
+        # Land on the revision promised to the client unless another write
+        # got in first; the client then gets a 409 and re-fetches.
+        revision = value["revision"] if current == value["revision"] - 1 else current + 1
+        transaction.update(ref, {
+            "content": value["content"],
+            "revision": revision,
+            "updated_at": value["updated_at"],
+            **_section_increments(_changed_sections(stored.get("content"), value["content"])),
+        })
+
+    _write(get_db().transaction())
+
+
+autosave_buffer = WriteBehindBuffer(
+    _write_autosave,
+    debounce=settings.AUTOSAVE_DEBOUNCE_SECONDS,
+    max_delay=settings.AUTOSAVE_MAX_DELAY_SECONDS,
+    name="cv-autosave",
+)
+
+
+def buffer_autosave(uid: str, cv_id: str, content: dict) -> dict | None:
+    """Buffer auto-saved *content* for a CV and acknowledge immediately.
+
+    Only the latest content is kept and written after the debounce window
+    (or the max-delay deadline).  With ``AUTOSAVE_DEBOUNCE_SECONDS=0``
+    (several workers) the content is written before returning.  Returns
+    ``{"revision", "updated_at"}`` as the flush will store them (a burst of
+    auto-saves is one revision), or None if the CV does not exist.
+    """
+    key = (uid, cv_id)
+    pending = autosave_buffer.peek(key)
+    if pending is not None:
+        revision = pending["revision"]
+    else:
+        doc = _cv_ref(uid, cv_id).get()
+        if not doc.exists:
+            return None
+        revision = doc.to_dict().get("revision", 0) + 1
+    updated_at = datetime.utcnow().isoformat()
+    value = {"content": content, "revision": revision, "updated_at": updated_at}
+    if settings.AUTOSAVE_DEBOUNCE_SECONDS <= 0:
+        _write_autosave(key, value)
+    else:
+        autosave_buffer.put(key, value)
+    return {"revision": revision, "updated_at": updated_at}
+
+
+def flush_autosave(uid: str, cv_id: str) -> None:
+    """Write any buffered auto-save for the CV now."""
+    autosave_buffer.flush((uid, cv_id))
+
+
 # ---------------------------------------------------------------------------
 # CRUD
 # ---------------------------------------------------------------------------
 
 def list_cvs(uid: str) -> list[dict]:
     """Return every CV document for the given user, ordered by update time."""
+    for key in autosave_buffer.pending_keys():
+        if key[0] == uid:
+            flush_autosave(*key)
     docs = (
         _cvs_col(uid)
         .order_by("updated_at", direction="DESCENDING")
@@ -35,8 +133,15 @@ def list_cvs(uid: str) -> list[dict]:
     return results
 
 
+def count_cvs(uid: str) -> int:
+    """Return the number of CVs the user owns (server-side count aggregation)."""
+    result = _cvs_col(uid).count().get()
+    return int(result[0][0].value)
+
+
 def get_cv(uid: str, cv_id: str) -> dict | None:
     """Return a single CV document or None."""
+    flush_autosave(uid, cv_id)
     doc = _cv_ref(uid, cv_id).get()
     if not doc.exists:
         return None
@@ -60,24 +165,68 @@ def create_cv(uid: str, data: dict) -> dict:
 
 
 def update_cv(uid: str, cv_id: str, data: dict) -> dict | None:
-    """Update a CV document.  Returns merged data or None if not found."""
+    """Update a CV document.  Returns merged data or None if not found.
+
+    Runs in a transaction so a content write bumps ``revision`` from the
+    value stored at write time.
+    """
+    flush_autosave(uid, cv_id)
     ref = _cv_ref(uid, cv_id)
-    doc = ref.get()
-    if not doc.exists:
-        return None
     data["updated_at"] = datetime.utcnow().isoformat()
-    ref.update(data)
-    merged = {**doc.to_dict(), **data, "id": doc.id}
-    return merged
+
+    @firestore.transactional
+    def _update(transaction):
+        doc = ref.get(transaction=transaction)
+        if not doc.exists:
+            return None
+        current = doc.to_dict()
+        section_revisions = dict(current.get("section_revisions") or {})
+        written = dict(data)
+        update = dict(data)
+        if "content" in data:
+            # Full-content writes invalidate any delta based on the old revision
+            written["revision"] = update["revision"] = current.get("revision", 0) + 1
+            changed = _changed_sections(current.get("content"), data["content"])
+            update.update(_section_increments(changed))
+            for section in changed:
+                section_revisions[section] = section_revisions.get(section, 0) + 1
+        transaction.update(ref, update)
+        return {**current, **written, "section_revisions": section_revisions, "id": doc.id}
+
+    return _update(get_db().transaction())
+
+
+def update_cv_section(uid: str, cv_id: str, section: str, value: Any) -> str | None:
+    """Overwrite a single ``content.<section>`` field without touching the rest.
+
+    Bumps ``section_revisions.<section>`` (so caches keyed on a section can be
+    invalidated selectively) and the CV ``revision``.  Returns the new
+    ``updated_at`` or None if the CV does not exist.
+    """
+    # Land any buffered full-content auto-save first so it cannot overwrite
+    # this section afterwards.
+    flush_autosave(uid, cv_id)
+    now = datetime.utcnow().isoformat()
+    try:
+        _cv_ref(uid, cv_id).update({
+            firestore.FieldPath("content", section).to_api_repr(): value,
+            firestore.FieldPath("section_revisions", section).to_api_repr(): firestore.Increment(1),
+            "revision": firestore.Increment(1),
+            "updated_at": now,
+        })
+    except NotFound:
+        return None
+    return now
 
 
 def delete_cv(uid: str, cv_id: str) -> bool:
-    """Delete a CV document.  Returns True if it existed."""
+    """Delete a CV document and its version history.  Returns True if it existed."""
+    autosave_buffer.discard((uid, cv_id))
     ref = _cv_ref(uid, cv_id)
     doc = ref.get()
     if not doc.exists:
         return False
-    ref.delete()
+    delete_tree(ref)
     return True
 
 
@@ -91,7 +240,147 @@ def duplicate_cv(uid: str, cv_id: str) -> dict | None:
         return None
 
     # Remove identifiers that belong to the original
-    copy_data = {k: v for k, v in source.items() if k not in ("id", "created_at", "updated_at")}
+    copy_data = {
+        k: v for k, v in source.items()
+        if k not in ("id", "created_at", "updated_at", "revision", "section_revisions", "version_head")
+    }
     copy_data["duplicated_from"] = cv_id
 
     return create_cv(uid, copy_data)
+
+
+# ---------------------------------------------------------------------------
+# Versioning  (snapshots + diffs, see version_store)
+# ---------------------------------------------------------------------------
+
+def _version_item(version: dict) -> dict:
+    return {
+        "id": version["id"],
+        "label": version["meta"].get("label"),
+        "created_at": version.get("created_at", ""),
+    }
+
+
+def save_cv_version(uid: str, cv_id: str, label: str | None = None, meta: dict | None = None) -> dict | None:
+    """Save the current title, template and content as a new version.
+
+    Returns ``{"id", "label", "created_at"}`` or None if the CV does not exist.
+    """
+    cv = get_cv(uid, cv_id)
+    if cv is None:
+        return None
+    state = {
+        "title": cv.get("title", ""),
+        "template_id": cv.get("template_id", "olive"),
+        "content": cv.get("content") or {},
+    }
+    version = version_store.save(_cv_ref(uid, cv_id), state, {"label": label, **(meta or {})})
+    return None if version is None else _version_item(version)
+
+
+def list_cv_versions(uid: str, cv_id: str) -> list[dict] | None:
+    """List saved versions (metadata only), newest first, or None if the CV does not exist."""
+    ref = _cv_ref(uid, cv_id)
+    if not ref.get().exists:
+        return None
+    return [_version_item(v) for v in version_store.list_versions(ref)]
+
+
+def get_cv_version(uid: str, cv_id: str, version_id: str) -> dict | None:
+    """Return a version with its title, template_id and content, or None."""
+    version = version_store.get_version(_cv_ref(uid, cv_id), version_id)
+    if version is None:
+        return None
+    return {**_version_item(version), **version["state"]}
+
+
+def restore_cv_version(uid: str, cv_id: str, version_id: str) -> dict | None:
+    """Restore a CV to a saved version, saving the current state first.
+
+    Returns the updated CV dict or None if the CV or the version does not exist.
+    """
+    version = get_cv_version(uid, cv_id, version_id)
+    if version is None:
+        return None
+    if save_cv_version(uid, cv_id, meta={"restored_from": version_id}) is None:
+        return None
+    return update_cv(uid, cv_id, {
+        "title": version["title"],
+        "template_id": version["template_id"],
+        "content": version["content"],
+    })
+
+
+# ---------------------------------------------------------------------------
+# Delta updates  (RFC 6902 JSON Patch against a per-CV revision)
+# ---------------------------------------------------------------------------
+
+class RevisionConflict(Exception):
+    """Raised when a delta targets a stale CV revision."""
+
+    def __init__(self, current: int):
+        super().__init__(f"CV is at revision {current}")
+        self.current = current
+
+
+_MISSING = object()
+
+
+def _lookup(data: Any, path: list[str]) -> Any:
+    for key in path:
+        if not isinstance(data, dict) or key not in data:
+            return _MISSING
+        data = data[key]
+    return data
+
+
+def patch_cv_content(
+    uid: str,
+    cv_id: str,
+    revision: int,
+    operations: list[dict],
+    validate: Callable[[dict], dict],
+) -> dict | None:
+    """Apply JSON Patch *operations* to a CV's content, if *revision* is current.
+
+    The stored content is patched in a transaction, normalised with
+    *validate*, and only the touched field paths are written (dotted
+    ``content.<field>`` updates; arrays are rewritten whole).  Returns
+    ``{"revision", "updated_at"}``, None if the CV does not exist, and raises
+    :class:`RevisionConflict` on a stale revision or
+    :class:`~app.utils.json_patch.JsonPatchError` on an invalid patch.
+    """
+    flush_autosave(uid, cv_id)
+    ref = _cv_ref(uid, cv_id)
+
+    @firestore.transactional
+    def _apply(transaction):
+        snapshot = ref.get(transaction=transaction)
+        if not snapshot.exists:
+            return None
+        data = snapshot.to_dict()
+        current = data.get("revision", 0)
+        if current != revision:
+            raise RevisionConflict(current)
+
+        content = data.get("content") or {}
+        patched = validate(apply_patch(content, operations))
+
+        update: dict = {}
+        paths = touched_paths(content, operations)
+        for path in paths:
+            value = _lookup(patched, path)
+            field = firestore.FieldPath("content", *path).to_api_repr()
+            update[field] = firestore.DELETE_FIELD if value is _MISSING else value
+
+        for section in {path[0] for path in paths}:
+            field = firestore.FieldPath("section_revisions", section).to_api_repr()
+            update[field] = firestore.Increment(1)
+
+        now = datetime.utcnow().isoformat()
+        update["revision"] = current + 1
+        update["updated_at"] = now
+        transaction.update(ref, update)
+        return {"revision": current + 1, "updated_at": now}
+
+    return _apply(get_db().transaction())
@@ -1,6 +1,8 @@
 from __future__ import annotations
 from datetime import datetime
 
+from firebase_admin import firestore
+
 from app.core.firebase import get_db
 
 
@@ -16,27 +18,53 @@ def _interview_ref(uid: str, session_id: str):
     return _interviews_col(uid).document(session_id)
 
 
+def _messages_col(uid: str, session_id: str):
+    return _interview_ref(uid, session_id).collection("messages")
+
+
+def _message_doc_id(msg_id: int) -> str:
+    # Zero-padded so document ids sort in message order
+    return f"{msg_id:06d}"
+
+
+# Number of answered turns kept in the session's rolling ``recent_turns``
+# summary (used to give the AI context without reading the transcript).
+RECENT_TURNS_SIZE = 5
+
+
 # ---------------------------------------------------------------------------
 # Session CRUD
 # ---------------------------------------------------------------------------
 
-def create_session(uid: str, data: dict) -> dict:
+def create_session(uid: str, data: dict, messages: list[dict] | None = None) -> dict:
     """Create a new interview practice session.
 
+    *messages* (e.g. the system message and first question) are written to
+    the ``messages`` subcollection in the same batch as the session.
     Returns the stored data including the generated session id.
     """
+    messages = messages or []
     now = datetime.utcnow().isoformat()
     payload = {
-        **data,
-        "uid": uid,
         "status": "in_progress",
-        "messages": [],
         "score": None,
         "report": None,
+        **data,
+        "uid": uid,
+        "message_count": len(messages),
+        "answered_questions": 0,
+        "score_sum": 0,
+        "score_count": 0,
+        "recent_turns": [],
         "created_at": now,
         "updated_at": now,
     }
-    _, ref = _interviews_col(uid).add(payload)
+    ref = _interviews_col(uid).document()
+    batch = get_db().batch()
+    batch.set(ref, payload)
+    for msg in messages:
+        batch.set(ref.collection("messages").document(_message_doc_id(msg["id"])), msg)
+    batch.commit()
     payload["id"] = ref.id
     return payload
 
@@ -52,7 +80,7 @@ def get_session(uid: str, session_id: str) -> dict | None:
 
 
 def update_session(uid: str, session_id: str, data: dict) -> dict | None:
-    """Update session fields (e.g. append messages).
+    """Update session fields.
 
     Returns merged data or None if the session does not exist.
     """
@@ -65,6 +93,138 @@ def update_session(uid: str, session_id: str, data: dict) -> dict | None:
     return {**doc.to_dict(), **data, "id": doc.id}
 
 
+def _legacy_aggregates(legacy: list[dict]) -> dict:
+    """Counters of a session whose transcript is still an in-document array."""
+    session = {"messages": legacy}
+    scores = []
+    for msg in legacy:
+        if msg.get("role") == "ai-feedback" and msg.get("scores"):
+            score_vals = msg["scores"].values()
+            if score_vals:
+                scores.append(sum(score_vals) / len(score_vals))
+    return {
+        "message_count": len(legacy),
+        "answered_questions": answered_count(session),
+        "score_sum": sum(scores),
+        "score_count": len(scores),
+    }
+
+
+def append_turn(
+    uid: str,
+    session_id: str,
+    session: dict,
+    messages: list[dict],
+    data: dict,
+    turn: dict | None = None,
+) -> list[dict]:
+    """Append *messages* to the transcript and apply *data* to the session.
+
+    Runs in a transaction that allocates the message ids from the stored
+    ``message_count``, so concurrent answers never reuse an id; the ids in
+    *messages* are overwritten.  A legacy session (transcript in the
+    document's ``messages`` array) is migrated to the subcollection in the
+    same transaction, its counters seeded from the array.  When *turn*
+    (``question_number``, ``question``, ``answer``, ``score``) is given it
+    is folded into the running score aggregates and the rolling
+    ``recent_turns`` summary.  Returns the stored messages.
+    """
+    ref = _interview_ref(uid, session_id)
+    col = _messages_col(uid, session_id)
+
+    @firestore.transactional
+    def _append(transaction):
+        current = ref.get(transaction=transaction).to_dict() or session
+        update = {**data, "updated_at": datetime.utcnow().isoformat()}
+
+        legacy = current.get("messages")
+        if legacy is not None:
+            for msg in legacy:
+                transaction.set(col.document(_message_doc_id(msg["id"])), msg)
+            counters = _legacy_aggregates(legacy)
+            update["messages"] = firestore.DELETE_FIELD
+        else:
+            counters = {
+                key: current.get(key, 0)
+                for key in ("message_count", "answered_questions", "score_sum", "score_count")
+            }
+
+        stored = []
+        for offset, msg in enumerate(messages, start=1):
+            msg = {**msg, "id": counters["message_count"] + offset}
+            transaction.set(col.document(_message_doc_id(msg["id"])), msg)
+            stored.append(msg)
+        counters["message_count"] += len(messages)
+
+        if turn is not None:
+            counters["answered_questions"] += 1
+            if turn.get("score") is not None:
+                counters["score_sum"] += turn["score"]
+                counters["score_count"] += 1
+            compact = {
+                "question_number": turn.get("question_number"),
+                "question": (turn.get("question") or "")[:200],
+                "answer": (turn.get("answer") or "")[:300],
+                "score": turn.get("score"),
+            }
+            recent = [*(current.get("recent_turns") or []), compact]
+            update["recent_turns"] = recent[-RECENT_TURNS_SIZE:]
+
+        update.update(counters)
+        transaction.update(ref, update)
+        return stored
+
+    return _append(get_db().transaction())
+
+
+def list_messages(
+    uid: str,
+    session_id: str,
+    session: dict | None = None,
+    last: int | None = None,
+) -> list[dict]:
+    """Return the transcript in order, or only its *last* messages.
+
+    Sessions created before the ``messages`` subcollection existed keep the
+    transcript in the session document; pass *session* to read those.
+    """
+    legacy = (session or {}).get("messages")
+    if legacy:
+        return legacy[-last:] if last else legacy
+
+    query = _messages_col(uid, session_id).order_by(
+        "id", direction="DESCENDING" if last else "ASCENDING"
+    )
+    if last:
+        query = query.limit(last)
+    messages = [doc.to_dict() for doc in query.stream()]
+    return messages[::-1] if last else messages
+
+
+def message_count(session: dict) -> int:
+    """Return the number of transcript messages of a session."""
+    if "message_count" in session:
+        return session["message_count"]
+    return len(session.get("messages") or [])
+
+
+def answered_count(session: dict) -> int:
+    """Return the number of answered questions of a session."""
+    if "answered_questions" in session:
+        return session["answered_questions"]
+    return sum(1 for m in session.get("messages") or [] if m.get("role") == "user")
+
+
+def average_score(session: dict) -> float | None:
+    """Return the mean per-answer score of a session, or None if unscored."""
+    if session.get("score_count"):
+        return session["score_sum"] / session["score_count"]
+
+    # Legacy sessions: derive from the in-document transcript
+    legacy = _legacy_aggregates(session.get("messages") or [])
+    return legacy["score_sum"] / legacy["score_count"] if legacy["score_count"] else None
+
+
 def end_session(uid: str, session_id: str, score: float, report: dict) -> dict | None:
     """Mark an interview session as ended with a final score and report.
 
@@ -1,7 +1,10 @@
 from __future__ import annotations
 from datetime import datetime
 
+from firebase_admin import firestore
+
 from app.core.firebase import get_db
+from app.services.firebase.bulk_delete import delete_tree
 
 
 # ---------------------------------------------------------------------------
@@ -16,6 +19,54 @@ def _job_ref(uid: str, job_id: str):
     return _jobs_col(uid).document(job_id)
 
 
+def _stats_ref(uid: str):
+    return get_db().collection("users").document(uid).collection("stats").document("jobs")
+
+
+def _timeline_col(uid: str, job_id: str):
+    return _job_ref(uid, job_id).collection("timeline")
+
+
+# Stage of jobs stored without one (the jobs endpoint default)
+DEFAULT_STAGE = "saved"
+
+# Number of most recent timeline events denormalised onto the job document
+# (``recent_timeline``) so list views never have to read the subcollection.
+RECENT_TIMELINE_SIZE = 5
+
+
+def _queue_event(
+    batch,
+    uid: str,
+    job_id: str,
+    current: dict,
+    event_type: str,
+    description: str,
+    now: str,
+) -> tuple[dict, dict]:
+    """Queue an append-only timeline event on *batch* (or a transaction).
+
+    Returns ``(event, job_fields)`` where *job_fields* holds the parent
+    document update (``recent_timeline`` + ``updated_at``) the caller must
+    write in the same batch.
+    """
+    event_ref = _timeline_col(uid, job_id).document()
+    event = {
+        "event_type": event_type,
+        "description": description,
+        "created_at": now,
+    }
+    batch.set(event_ref, event)
+    event = {**event, "id": event_ref.id}
+
+    recent = [event, *(current.get("recent_timeline") or [])][:RECENT_TIMELINE_SIZE]
+    job_fields = {"recent_timeline": recent, "updated_at": now}
+    if "timeline" in current:
+        # Drop the legacy unbounded in-document array
+        job_fields["timeline"] = firestore.DELETE_FIELD
+    return event, job_fields
+
+
 # ---------------------------------------------------------------------------
 # CRUD
 # ---------------------------------------------------------------------------
@@ -45,45 +96,85 @@ def get_job(uid: str, job_id: str) -> dict | None:
     return data
 
 
-def create_job(uid: str, data: dict) -> dict:
-    """Create a new job document.  Returns the stored data with its id."""
+def create_job(
+    uid: str,
+    data: dict,
+    event_type: str = "created",
+    description: str = "Job added to tracker",
+) -> dict:
+    """Create a new job document with its initial timeline event.
+
+    The job, the event and the stats increment are written in one batch.
+    Returns the stored data with its id.
+    """
     now = datetime.utcnow().isoformat()
     payload = {
         **data,
         "uid": uid,
         "stage": data.get("stage", "wishlist"),
-        "timeline": [],
-        "notes": "",
+        "notes": data.get("notes") or "",
         "created_at": now,
         "updated_at": now,
     }
-    _, ref = _jobs_col(uid).add(payload)
+    ref = _jobs_col(uid).document()
+    batch = get_db().batch()
+    _, job_fields = _queue_event(batch, uid, ref.id, {}, event_type, description, now)
+    payload.update(job_fields)
+    batch.set(ref, payload)
+    add_stats_delta(batch, uid, new_stage=payload["stage"])
+    batch.commit()
     payload["id"] = ref.id
-
-    # Log the initial creation event
-    log_activity(uid, ref.id, "created", "Job added to tracker")
     return payload
 
 
 def update_job(uid: str, job_id: str, data: dict) -> dict | None:
-    """Update a job document.  Returns merged data or None."""
+    """Update a job document.  Returns merged data or None.
+
+    Runs in a transaction so a ``stage`` in *data* moves the stats counters
+    from the stage actually stored at write time.
+    """
     ref = _job_ref(uid, job_id)
-    doc = ref.get()
-    if not doc.exists:
-        return None
     data["updated_at"] = datetime.utcnow().isoformat()
-    ref.update(data)
-    return {**doc.to_dict(), **data, "id": doc.id}
+
+    @firestore.transactional
+    def _update(transaction):
+        doc = ref.get(transaction=transaction)
+        if not doc.exists:
+            return None
+        current = doc.to_dict()
+        transaction.update(ref, data)
+        if "stage" in data:
+            add_stats_delta(
+                transaction, uid,
+                old_stage=current.get("stage", DEFAULT_STAGE), new_stage=data["stage"],
+            )
+        return {**current, **data, "id": doc.id}
+
+    return _update(get_db().transaction())
 
 
 def delete_job(uid: str, job_id: str) -> bool:
-    """Delete a job document.  Returns True if it existed."""
+    """Delete a job document and its timeline.  Returns True if it existed."""
     ref = _job_ref(uid, job_id)
-    doc = ref.get()
-    if not doc.exists:
+    if not ref.get().exists:
         return False
-    ref.delete()
-    return True
+
+    # Timeline (and any other subcollection) first, so a failure never
+    # leaves orphaned events behind a deleted job.
+    delete_tree(ref, include_self=False)
+
+    # The stage is re-read in the transaction: a concurrent stage change or
+    # delete must not decrement the counters twice.
+    @firestore.transactional
+    def _delete(transaction):
+        doc = ref.get(transaction=transaction)
+        if not doc.exists:
+            return False
+        transaction.delete(ref)
+        add_stats_delta(transaction, uid, old_stage=doc.to_dict().get("stage", DEFAULT_STAGE))
+        return True
+
+    return _delete(get_db().transaction())
 
 
 # ---------------------------------------------------------------------------
@@ -93,32 +184,34 @@ def delete_job(uid: str, job_id: str) -> bool:
 def update_stage(uid: str, job_id: str, stage: str) -> dict | None:
     """Update the job stage and record a timeline event.
 
-    Returns the updated job dict or None if the job does not exist.
+    The stage change, the timeline event and the stats delta are committed
+    in a single transaction, so the old stage is the one stored at write
+    time.  Returns the updated job dict or None if the job does not exist.
     """
     ref = _job_ref(uid, job_id)
-    doc = ref.get()
-    if not doc.exists:
-        return None
 
-    now = datetime.utcnow().isoformat()
-    current = doc.to_dict()
-    old_stage = current.get("stage", "unknown")
-
-    # Append timeline event
-    timeline: list = current.get("timeline", [])
-    timeline.append({
-        "event_type": "stage_change",
-        "description": f"Stage changed from '{old_stage}' to '{stage}'",
-        "timestamp": now,
-    })
-
-    update_data = {
-        "stage": stage,
-        "timeline": timeline,
-        "updated_at": now,
-    }
-    ref.update(update_data)
-    return {**current, **update_data, "id": doc.id}
+    @firestore.transactional
+    def _update(transaction):
+        doc = ref.get(transaction=transaction)
+        if not doc.exists:
+            return None
+
+        now = datetime.utcnow().isoformat()
+        current = doc.to_dict()
+        old_stage = current.get("stage", DEFAULT_STAGE)
+
+        _, update_data = _queue_event(
+            transaction, uid, job_id, current, stage, f"Stage updated to: {stage}", now
+        )
+        update_data["stage"] = stage
+        transaction.update(ref, update_data)
+        add_stats_delta(transaction, uid, old_stage=old_stage, new_stage=stage)
+
+        merged = {**current, **update_data, "id": doc.id}
+        merged.pop("timeline", None)
+        return merged
+
+    return _update(get_db().transaction())
 
 
 # ---------------------------------------------------------------------------
@@ -139,21 +232,32 @@ def update_notes(uid: str, job_id: str, notes: str) -> dict | None:
 
 
 # ---------------------------------------------------------------------------
-# Timeline
+# Timeline  (append-only users/{uid}/jobs/{job_id}/timeline subcollection)
 # ---------------------------------------------------------------------------
 
-def get_timeline(uid: str, job_id: str) -> list[dict] | None:
-    """Return the timeline events for a job, or None if not found."""
-    job = get_job(uid, job_id)
-    if job is None:
+def get_timeline(uid: str, job_id: str, limit: int | None = None) -> list[dict] | None:
+    """Return the timeline events for a job, newest first, or None if not found."""
+    if not _job_ref(uid, job_id).get().exists:
         return None
-    return job.get("timeline", [])
+
+    query = _timeline_col(uid, job_id).order_by("created_at", direction="DESCENDING")
+    if limit:
+        query = query.limit(limit)
+
+    results = []
+    for doc in query.stream():
+        item = doc.to_dict()
+        item["id"] = doc.id
+        results.append(item)
+    return results
 
 
 def log_activity(uid: str, job_id: str, event_type: str, description: str) -> dict | None:
     """Append a timeline event to the job.
 
-    Returns the updated job dict or None if the job does not exist.
+    The event and the parent ``updated_at``/``recent_timeline`` bump are
+    written in a single batch.  Returns the event dict (with its id) or None
+    if the job does not exist.
     """
     ref = _job_ref(uid, job_id)
     doc = ref.get()
@@ -161,59 +265,121 @@ def log_activity(uid: str, job_id: str, event_type: str, description: str) -> di
         return None
 
     now = datetime.utcnow().isoformat()
-    current = doc.to_dict()
-    timeline: list = current.get("timeline", [])
-    timeline.append({
-        "event_type": event_type,
-        "description": description,
-        "timestamp": now,
-    })
-
-    update_data = {
-        "timeline": timeline,
-        "updated_at": now,
-    }
-    ref.update(update_data)
-    return {**current, **update_data, "id": doc.id}
+    batch = get_db().batch()
+    event, job_fields = _queue_event(batch, uid, job_id, doc.to_dict(), event_type, description, now)
+    batch.update(ref, job_fields)
+    batch.commit()
+    return event
 
 
 # ---------------------------------------------------------------------------
-# Stats
+# Stats  (materialised in users/{uid}/stats/jobs)
 # ---------------------------------------------------------------------------
 
+# Stages considered as having received a response
+_RESPONSE_STAGES = {"interview", "offer", "rejected", "hired"}
+
+
+def add_stats_delta(
+    batch,
+    uid: str,
+    old_stage: str | None = None,
+    new_stage: str | None = None,
+) -> None:
+    """Queue an incremental update of the stats document on *batch*.
+
+    Pass only ``new_stage`` for a created job, only ``old_stage`` for a
+    deleted job and both for a stage change.  The caller commits the batch
+    (or transaction) together with the job write so counters never drift
+    from the jobs.  A delta never sets ``initialised``: on a document that
+    was not built by :func:`rebuild_stats` the counters are partial, and
+    :func:`get_stage_counts` rebuilds them.
+    """
+    if old_stage == new_stage:
+        return
+
+    by_stage: dict = {}
+    delta: dict = {"updated_at": datetime.utcnow().isoformat()}
+    if old_stage is not None:
+        by_stage[old_stage] = firestore.Increment(-1)
+    if new_stage is not None:
+        by_stage[new_stage] = firestore.Increment(1)
+    if old_stage is None:
+        delta["total"] = firestore.Increment(1)
+    elif new_stage is None:
+        delta["total"] = firestore.Increment(-1)
+    delta["by_stage"] = by_stage
+
+    batch.set(_stats_ref(uid), delta, merge=True)
+
+
+def rebuild_stats(uid: str) -> dict:
+    """Recompute the stats document from scratch and overwrite it.
+
+    Repair path for counters that drifted (e.g. jobs written outside this
+    module) and backfill for users whose jobs predate the stats document.
+    Only this function writes the ``initialised`` marker.
+
+    The jobs and the stats document are read in the same transaction as
+    the overwrite: every delta also writes the stats document, so one
+    committed in between makes the transaction retry instead of being lost.
+    """
+    stats_ref = _stats_ref(uid)
+
+    @firestore.transactional
+    def _rebuild(transaction):
+        stats_ref.get(transaction=transaction)
+        by_stage: dict[str, int] = {}
+        total = 0
+        for doc in transaction.get(_jobs_col(uid).select(["stage"])):
+            stage = (doc.to_dict() or {}).get("stage", DEFAULT_STAGE)
+            by_stage[stage] = by_stage.get(stage, 0) + 1
+            total += 1
+
+        payload = {
+            "total": total,
+            "by_stage": by_stage,
+            "initialised": True,
+            "updated_at": datetime.utcnow().isoformat(),
+        }
+        transaction.set(stats_ref, payload)
+        return payload
+
+    return _rebuild(get_db().transaction())
+
+
+def get_stage_counts(uid: str) -> dict:
+    """Return ``{"total": int, "by_stage": dict[str, int]}`` with a single read.
+
+    Falls back to :func:`rebuild_stats` when the document is missing or was
+    only ever written by deltas (no ``initialised`` marker): jobs created
+    before stats existed would otherwise never be counted.
+    """
+    doc = _stats_ref(uid).get()
+    data = doc.to_dict() if doc.exists else None
+    if not data or not data.get("initialised"):
+        data = rebuild_stats(uid)
+    by_stage = {k: v for k, v in (data.get("by_stage") or {}).items() if v > 0}
+    return {"total": max(data.get("total", 0), 0), "by_stage": by_stage}
+
+
 def get_stats(uid: str) -> dict:
-    """Compute aggregate job statistics for the user.
+    """Return aggregate job statistics for the user.
 
     Returns a dict with:
         - total: int
         - by_stage: dict[str, int]
         - response_rate: float  (fraction of jobs past 'applied' stage)
     """
-    docs = _jobs_col(uid).stream()
-
-    total = 0
-    by_stage: dict[str, int] = {}
-    applied_or_later = 0
-    responded = 0
-
-    # Stages considered as having received a response
-    response_stages = {"interview", "offer", "rejected", "hired"}
-
-    for doc in docs:
-        total += 1
-        data = doc.to_dict()
-        stage = data.get("stage", "unknown")
-        by_stage[stage] = by_stage.get(stage, 0) + 1
-
-        if stage != "wishlist":
-            applied_or_later += 1
-        if stage in response_stages:
-            responded += 1
+    counts = get_stage_counts(uid)
+    by_stage = counts["by_stage"]
 
+    applied_or_later = counts["total"] - by_stage.get("wishlist", 0)
+    responded = sum(n for stage, n in by_stage.items() if stage in _RESPONSE_STAGES)
     response_rate = (responded / applied_or_later) if applied_or_later > 0 else 0.0
 
     return {
-        "total": total,
+        "total": counts["total"],
         "by_stage": by_stage,
         "response_rate": round(response_rate, 4),
     }
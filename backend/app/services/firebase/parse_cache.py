@@ -0,0 +1,121 @@
+"""Cache of parsed CV uploads, keyed by the SHA-256 of the uploaded file.
+
+Re-uploading the same PDF (onboarding, then ``/cv/upload-pdf``, then again
+after a failed attempt) should not pay for extraction and a Gemini call
+every time.
+
+Per user, ``users/{uid}/parse_cache/{sha256}`` holds::
+
+    text_z       extracted text, zlib-compressed
+    parsed       {kind: structured result}, one entry per parser; the CV
+                 upload and onboarding endpoints share kind "cv"
+    expires_at   read as a miss once past; also usable as a Firestore TTL field
+
+with an in-process ``TTLCache`` in front.  Structured results stay per
+user.  With ``PARSE_CACHE_GLOBAL_TEXT`` the extracted text is also shared
+across users through the host's ``render_cache`` (same bytes, same text),
+so only extraction is skipped for another user.
+
+Cache failures are logged and treated as misses: uploads never fail
+because of the cache.  Functions block; call them through
+``asyncio.to_thread``.
+"""
+from __future__ import annotations
+
+import hashlib
+import logging
+import zlib
+from datetime import datetime, timedelta, timezone
+
+from app.core.cache import TTLCache
+from app.core.config import settings
+from app.core.firebase import get_db
+
+logger = logging.getLogger(__name__)
+
+# Firestore documents are capped at 1 MiB
+_MAX_TEXT_BYTES = 900_000
+
+_memory = TTLCache(maxsize=1000, ttl=3600)
+
+
+def file_hash(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def _ref(uid: str, digest: str):
+    return get_db().collection("users").document(uid).collection("parse_cache").document(digest)
+
+
+def _expires_at() -> datetime:
+    return datetime.now(timezone.utc) + timedelta(days=settings.PARSE_CACHE_TTL_DAYS)
+
+
+def _global_text(digest: str) -> str | None:
+    if not settings.PARSE_CACHE_GLOBAL_TEXT:
+        return None
+    from app.services.pdf import render_cache
+
+    data = render_cache.get(digest, "txt")
+    return data.decode() if data is not None else None
+
+
+# ---------------------------------------------------------------------------
+# Public API
+# ---------------------------------------------------------------------------
+
+def lookup(uid: str, digest: str) -> dict:
+    """Return ``{"text": str | None, "parsed": {kind: dict}}`` for an upload."""
+    entry = _memory.get((uid, digest))
+    if entry is not None:
+        return entry
+
+    entry = {"text": None, "parsed": {}}
+    try:
+        doc = _ref(uid, digest).get()
+        data = doc.to_dict() if doc.exists else None
+        if data and data.get("expires_at") and data["expires_at"] > datetime.now(timezone.utc):
+            if data.get("text_z"):
+                entry["text"] = zlib.decompress(bytes(data["text_z"])).decode()
+            entry["parsed"] = data.get("parsed") or {}
+        if entry["text"] is None:
+            entry["text"] = _global_text(digest)
+    except Exception as exc:
+        logger.warning("Parse cache lookup failed: %s", exc)
+    _memory.set((uid, digest), entry)
+    return entry
+
+
+def store_text(uid: str, digest: str, text: str) -> None:
+    """Remember the extracted text of an upload (per user, and globally if enabled)."""
+    entry = lookup(uid, digest)
+    entry["text"] = text
+    raw = text.encode()
+    try:
+        if settings.PARSE_CACHE_GLOBAL_TEXT:
+            from app.services.pdf import render_cache
+
+            render_cache.put(digest, raw, "txt")
+        text_z = zlib.compress(raw, 6)
+        if len(text_z) <= _MAX_TEXT_BYTES:
+            _ref(uid, digest).set(
+                {"text_z": text_z, "expires_at": _expires_at()},
+                merge=["text_z", "expires_at"],
+            )
+    except Exception as exc:
+        logger.warning("Parse cache write failed: %s", exc)
+
+
+def store_parsed(uid: str, digest: str, kind: str, parsed: dict) -> None:
+    """Remember the structured result of parser *kind* for an upload."""
+    entry = lookup(uid, digest)
+    entry["parsed"][kind] = parsed
+    try:
+        # Replace the entry whole: a deep merge would keep keys the new
+        # result no longer has
+        _ref(uid, digest).set(
+            {"parsed": {kind: parsed}, "expires_at": _expires_at()},
+            merge=[f"parsed.{kind}", "expires_at"],
+        )
+    except Exception as exc:
+        logger.warning("Parse cache write failed: %s", exc)
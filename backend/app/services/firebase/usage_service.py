@@ -0,0 +1,201 @@
+"""Monthly usage metering with sharded counters and in-memory quota checks.
+
+Usage lives in period-keyed documents, so a new month simply starts from an
+empty document and nothing has to be reset::
+
+    users/{uid}/usage/{YYYY-MM}/shards/{0..USAGE_COUNTER_SHARDS-1}
+
+Each shard holds ``firestore.Increment`` counters per feature; the total is
+the sum of the shards.  Usage is first accumulated in process and flushed
+every ``USAGE_FLUSH_SECONDS`` to a random shard, so a hot user costs at most
+one write per flush interval instead of one per request.
+
+Quota checks are served from memory: persisted totals are read once per
+``USAGE_CACHE_TTL`` seconds and the not-yet-flushed local deltas are added
+on top.  With several workers a user can overshoot by what the other
+workers accumulated since the last refresh, which is acceptable for
+protecting the AI budget.
+"""
+from __future__ import annotations
+
+import logging
+import random
+import threading
+from collections import defaultdict
+from datetime import datetime
+
+from firebase_admin import firestore
+
+from app.core.cache import TTLCache
+from app.core.config import settings
+from app.core.firebase import get_db
+from app.core.plans import plan_limit
+
+logger = logging.getLogger(__name__)
+
+
+# ---------------------------------------------------------------------------
+# Helpers
+# ---------------------------------------------------------------------------
+
+def current_period(now: datetime | None = None) -> str:
+    """Return the usage period key ("YYYY-MM", UTC) for *now*."""
+    return (now or datetime.utcnow()).strftime("%Y-%m")
+
+
+def next_reset(now: datetime | None = None) -> str:
+    """Return the ISO date on which the current period's usage resets."""
+    now = now or datetime.utcnow()
+    year, month = (now.year + 1, 1) if now.month == 12 else (now.year, now.month + 1)
+    return datetime(year, month, 1).date().isoformat()
+
+
+def _shards_col(uid: str, period: str):
+    return (
+        get_db().collection("users").document(uid)
+        .collection("usage").document(period)
+        .collection("shards")
+    )
+
+
+# ---------------------------------------------------------------------------
+# In-process state
+# ---------------------------------------------------------------------------
+
+_lock = threading.Lock()
+# (uid, period) -> feature -> count not yet written to Firestore
+_pending: dict[tuple[str, str], dict[str, int]] = defaultdict(lambda: defaultdict(int))
+# (uid, period) -> feature -> persisted total as last read (+ our own flushes)
+_totals = TTLCache(maxsize=settings.USER_CACHE_SIZE, ttl=settings.USAGE_CACHE_TTL)
+
+_flusher: threading.Thread | None = None
+_stop = threading.Event()
+
+
+def _read_totals(uid: str, period: str) -> dict[str, int]:
+    totals: dict[str, int] = defaultdict(int)
+    for doc in _shards_col(uid, period).stream():
+        for feature, value in (doc.to_dict() or {}).items():
+            if isinstance(value, int):
+                totals[feature] += value
+    return dict(totals)
+
+
+def _persisted(uid: str, period: str) -> dict[str, int]:
+    key = (uid, period)
+    totals = _totals.get(key)
+    if totals is None:
+        totals = _read_totals(uid, period)
+        _totals.set(key, totals)
+    return totals
+
+
+def _apply_to_totals(key: tuple[str, str], counts: dict[str, int], sign: int) -> None:
+    # Caller holds _lock
+    totals = _totals.get(key)
+    if totals is not None:
+        for feature, n in counts.items():
+            totals[feature] = totals.get(feature, 0) + sign * n
+
+
+def flush() -> None:
+    """Write all accumulated usage to Firestore (one shard write per user).
+
+    Flushed counts move from the pending map to the cached totals under the
+    same lock, so quota checks never see them twice or not at all.
+    """
+    with _lock:
+        batch_items = []
+        for key, counts in _pending.items():
+            counts = {feature: n for feature, n in counts.items() if n}
+            if counts:
+                batch_items.append((key, counts))
+                _apply_to_totals(key, counts, 1)
+        _pending.clear()
+
+    for (uid, period), counts in batch_items:
+        shard = str(random.randrange(settings.USAGE_COUNTER_SHARDS))
+        try:
+            _shards_col(uid, period).document(shard).set(
+                {feature: firestore.Increment(n) for feature, n in counts.items()},
+                merge=True,
+            )
+        except Exception:
+            logger.exception("Usage flush failed for %s/%s", uid, period)
+            with _lock:
+                _apply_to_totals((uid, period), counts, -1)
+                for feature, n in counts.items():
+                    _pending[(uid, period)][feature] += n
+
+
+def _run() -> None:
+    while not _stop.wait(settings.USAGE_FLUSH_SECONDS):
+        flush()
+
+
+def start_flusher() -> None:
+    """Start the background flush thread (idempotent)."""
+    global _flusher
+    if _flusher is not None and _flusher.is_alive():
+        return
+    _stop.clear()
+    _flusher = threading.Thread(target=_run, name="usage-flusher", daemon=True)
+    _flusher.start()
+
+
+def stop_flusher() -> None:
+    """Stop the flush thread and write what is left (app shutdown)."""
+    _stop.set()
+    if _flusher is not None:
+        _flusher.join(timeout=10)
+    flush()
+
+
+# ---------------------------------------------------------------------------
+# Public API
+# ---------------------------------------------------------------------------
+
+def get_usage(uid: str) -> dict[str, int]:
+    """Return this period's usage per feature, including unflushed counts."""
+    period = current_period()
+    totals = _persisted(uid, period)
+    with _lock:
+        usage = dict(totals)
+        for feature, n in _pending.get((uid, period), {}).items():
+            usage[feature] = usage.get(feature, 0) + n
+    return usage
+
+
+def record_usage(uid: str, feature: str, amount: int = 1) -> None:
+    """Add *amount* to this period's *feature* counter (flushed later)."""
+    with _lock:
+        _pending[(uid, current_period())][feature] += amount
+    start_flusher()
+
+
+def try_consume(uid: str, plan: str, feature: str) -> bool:
+    """Record one use of *feature* if *plan* allows it this period.
+
+    Returns False, without recording anything, when the limit is reached.
+    The check and the increment happen under one lock so parallel requests
+    cannot all slip through the last remaining slot.
+    """
+    limit = plan_limit(plan, feature)
+    if limit == -1:
+        record_usage(uid, feature)
+        return True
+
+    period = current_period()
+    totals = _persisted(uid, period)
+    with _lock:
+        pending = _pending[(uid, period)]
+        if totals.get(feature, 0) + pending[feature] >= limit:
+            return False
+        pending[feature] += 1
+    start_flusher()
+    return True
+
+
+def refund(uid: str, feature: str) -> None:
+    """Give back a use taken by :func:`try_consume` (the request failed)."""
+    record_usage(uid, feature, -1)
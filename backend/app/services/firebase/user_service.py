@@ -1,7 +1,112 @@
 from __future__ import annotations
-from datetime import datetime
+import copy
+import logging
+from datetime import datetime, timedelta, timezone
 
+from app.core.cache import TTLCache
+from app.core.config import settings
 from app.core.firebase import get_db
+from app.services.firebase.billing_service import unlink_customer
+from app.services.firebase.bulk_delete import delete_tree, log_progress
+
+logger = logging.getLogger(__name__)
+
+
+# ---------------------------------------------------------------------------
+# Read-through caches  (profile + preferences, keyed by uid)
+# ---------------------------------------------------------------------------
+
+_profile_cache = TTLCache(maxsize=settings.USER_CACHE_SIZE, ttl=settings.USER_CACHE_TTL)
+_prefs_cache = TTLCache(maxsize=settings.USER_CACHE_SIZE, ttl=settings.USER_CACHE_TTL)
+
+# Invalidation messages only matter to listeners that are already running.
+# ``expires_at`` lets a Firestore TTL policy delete them:
+#   gcloud firestore fields ttls update expires_at \
+#       --collection-group=cache_invalidations --enable-ttl
+# and expired ones are also pruned when a listener starts.
+_INVALIDATIONS_COLLECTION = "cache_invalidations"
+_INVALIDATION_TTL = timedelta(hours=1)
+_listener = None
+
+
+def _evict(uid: str) -> None:
+    _profile_cache.pop(uid)
+    _prefs_cache.pop(uid)
+
+
+def invalidate_user(uid: str) -> None:
+    """Drop cached profile/preferences for *uid*.
+
+    Must be called after any write to the user document that bypasses this
+    module (e.g. Stripe webhooks).  When ``USER_CACHE_LISTEN`` is enabled the
+    invalidation is also published to the other workers.
+    """
+    _evict(uid)
+    if settings.USER_CACHE_LISTEN:
+        try:
+            get_db().collection(_INVALIDATIONS_COLLECTION).add({
+                "uid": uid,
+                "at": datetime.utcnow().isoformat(),
+                "expires_at": datetime.now(timezone.utc) + _INVALIDATION_TTL,
+            })
+        except Exception as exc:
+            logger.warning("Could not publish cache invalidation for %s: %s", uid, exc)
+
+
+def _prune_invalidations() -> int:
+    """Delete expired invalidation messages (up to 500).  Returns the count."""
+    db = get_db()
+    batch = db.batch()
+    pruned = 0
+    expired = (
+        db.collection(_INVALIDATIONS_COLLECTION)
+        .where("expires_at", "<", datetime.now(timezone.utc))
+        .limit(500)
+    )
+    for doc in expired.stream():
+        batch.delete(doc.reference)
+        pruned += 1
+    if pruned:
+        batch.commit()
+    return pruned
+
+
+def start_invalidation_listener() -> None:
+    """Evict entries invalidated by other workers (Firestore snapshot listener).
+
+    Optional: only needed when several worker processes serve traffic and
+    the cache TTL is too long to tolerate stale plans.
+    """
+    global _listener
+    if _listener is not None:
+        return
+
+    try:
+        _prune_invalidations()
+    except Exception as exc:
+        logger.warning("Could not prune cache invalidations: %s", exc)
+
+    def _on_snapshot(_docs, changes, _read_time):
+        for change in changes:
+            if change.type.name == "ADDED":
+                uid = (change.document.to_dict() or {}).get("uid")
+                if uid:
+                    _evict(uid)
+
+    since = datetime.utcnow().isoformat()
+    _listener = (
+        get_db()
+        .collection(_INVALIDATIONS_COLLECTION)
+        .where("at", ">", since)
+        .on_snapshot(_on_snapshot)
+    )
+
+
+def stop_invalidation_listener() -> None:
+    global _listener
+    if _listener is not None:
+        _listener.unsubscribe()
+        _listener = None
 
 
 # ---------------------------------------------------------------------------
@@ -21,15 +126,32 @@ def _user_ref(uid: str):
 # ---------------------------------------------------------------------------
 
 def get_user(uid: str) -> dict | None:
-    """Return the user document as a dict, or None if it does not exist."""
+    """Return the user document as a dict, or None if it does not exist.
+
+    Served from the in-process cache when possible.
+    """
+    cached = _profile_cache.get(uid)
+    if cached is not None:
+        return copy.deepcopy(cached)
+
     doc = _user_ref(uid).get()
     if not doc.exists:
         return None
     data = doc.to_dict()
     data["uid"] = doc.id
+    _profile_cache.set(uid, copy.deepcopy(data))
     return data
 
 
+def get_plan(uid: str) -> str:
+    """Return the user's plan name ("free" when unknown)."""
+    cached = _profile_cache.get(uid)
+    if cached is not None:
+        return cached.get("plan") or "free"
+    profile = get_user(uid)
+    return (profile or {}).get("plan") or "free"
+
+
 def create_user(uid: str, data: dict) -> dict:
     """Create a new user document.  Returns the stored data."""
     now = datetime.utcnow().isoformat()
@@ -40,6 +162,7 @@ def create_user(uid: str, data: dict) -> dict:
         "updated_at": now,
     }
     _user_ref(uid).set(payload)
+    invalidate_user(uid)
     return payload
 
 
@@ -51,25 +174,31 @@ def update_user(uid: str, data: dict) -> dict | None:
         return None
     data["updated_at"] = datetime.utcnow().isoformat()
     ref.update(data)
+    invalidate_user(uid)
     return {**doc.to_dict(), **data}
 
 
+def user_exists(uid: str) -> bool:
+    """Return True if the user document exists."""
+    return get_user(uid) is not None
+
+
 def delete_user(uid: str) -> bool:
-    """Delete a user document and all known subcollections.
+    """Delete a user document and every nested subcollection.
 
-    Returns True if the user existed, False otherwise.
+    Subcollections are discovered at runtime and removed with a parallel
+    ``BulkWriter``.  Returns True if the user existed, False otherwise.
     """
     ref = _user_ref(uid)
     doc = ref.get()
     if not doc.exists:
         return False
 
-    # Delete known subcollections
-    subcollections = ["preferences", "cvs", "jobs", "interviews", "cover_letters"]
-    for sub_name in subcollections:
-        _delete_collection(ref.collection(sub_name))
-
-    ref.delete()
+    delete_tree(ref, on_progress=log_progress(f"delete_user {uid}"))
+    customer_id = (doc.to_dict() or {}).get("stripe_customer_id")
+    if customer_id:
+        unlink_customer(customer_id)
+    invalidate_user(uid)
     return True
 
 
@@ -82,30 +211,22 @@ def _prefs_ref(uid: str):
 
 
 def get_preferences(uid: str) -> dict | None:
-    """Return user preferences or None."""
+    """Return user preferences or None (cached)."""
+    cached = _prefs_cache.get(uid)
+    if cached is not None:
+        return copy.deepcopy(cached)
+
     doc = _prefs_ref(uid).get()
     if not doc.exists:
         return None
-    return doc.to_dict()
+    data = doc.to_dict()
+    _prefs_cache.set(uid, copy.deepcopy(data))
+    return data
 
 
 def update_preferences(uid: str, data: dict) -> dict:
     """Create or merge user preferences. Returns the stored data."""
     data["updated_at"] = datetime.utcnow().isoformat()
     _prefs_ref(uid).set(data, merge=True)
+    invalidate_user(uid)
     return data
-
-
-# ---------------------------------------------------------------------------
-# Internal helpers
-# ---------------------------------------------------------------------------
-
-def _delete_collection(col_ref, batch_size: int = 100):
-    """Recursively delete all documents in a collection."""
-    docs = col_ref.limit(batch_size).stream()
-    deleted = 0
-    for doc in docs:
-        doc.reference.delete()
-        deleted += 1
-    if deleted >= batch_size:
-        _delete_collection(col_ref, batch_size)
@@ -0,0 +1,195 @@
+"""Version history stored as periodic snapshots plus JSON Patch diffs.
+
+Versions of a document live in its ``versions`` subcollection, one document
+per version with a zero-padded sequence number as id::
+
+    seq, created_at, meta        small metadata, the only fields list() reads
+    kind                         "snapshot" (full state) or "diff"
+    base_seq                     seq of the snapshot this version chains from
+    encoding, payload, size      canonical JSON, zlib-compressed when large
+
+A diff holds the operations from version ``seq - 1`` to ``seq``.  A fresh
+snapshot is written every ``SNAPSHOT_EVERY`` versions, or earlier when a
+diff would not be smaller than a snapshot, so rebuilding any version reads
+at most ``SNAPSHOT_EVERY`` documents in a single round-trip.  The parent
+document keeps a ``version_head`` pointer ``{seq, snapshot_seq}``.
+
+Documents written before this store (full copies with random ids) are still
+listed and restored as plain snapshots.
+"""
+from __future__ import annotations
+
+import json
+import zlib
+from datetime import datetime
+from typing import Any
+
+from firebase_admin import firestore
+
+from app.core.cache import TTLCache
+from app.core.firebase import get_db
+from app.utils.json_patch import apply_patch, make_patch
+
+# Maximum length of a diff chain before a new full snapshot is written
+SNAPSHOT_EVERY = 10
+
+# Payloads smaller than this are stored as plain JSON bytes
+COMPRESS_MIN_BYTES = 512
+
+# Latest reconstructed state per parent, so saving a version does not have
+# to replay the chain to diff against the previous one.
+_head_cache = TTLCache(maxsize=1000, ttl=600)
+
+_META_FIELDS = ["seq", "kind", "created_at", "meta", "size"]
+
+
+# ---------------------------------------------------------------------------
+# Encoding
+# ---------------------------------------------------------------------------
+
+def _canonical(value: Any) -> bytes:
+    return json.dumps(value, sort_keys=True, separators=(",", ":"), ensure_ascii=False).encode()
+
+
+def _encode(value: Any) -> dict:
+    raw = _canonical(value)
+    if len(raw) >= COMPRESS_MIN_BYTES:
+        return {"encoding": "zlib", "payload": zlib.compress(raw, 6), "size": len(raw)}
+    return {"encoding": "json", "payload": raw, "size": len(raw)}
+
+
+def _decode(doc: dict) -> Any:
+    payload = bytes(doc["payload"])
+    if doc.get("encoding") == "zlib":
+        payload = zlib.decompress(payload)
+    return json.loads(payload)
+
+
+def _version_id(seq: int) -> str:
+    return f"{seq:010d}"
+
+
+def _versions_col(parent_ref):
+    return parent_ref.collection("versions")
+
+
+def _metadata(doc_id: str, data: dict) -> dict:
+    item = {k: v for k, v in data.items() if k not in ("payload", "encoding", "base_seq")}
+    item["id"] = doc_id
+    item.setdefault("meta", {})
+    if "created_at" not in item and "saved_at" in item:
+        # Legacy cover-letter copies were stamped ``saved_at``
+        item["created_at"] = item["saved_at"]
+    return item
+
+
+# ---------------------------------------------------------------------------
+# Reconstruction
+# ---------------------------------------------------------------------------
+
+def _rebuild(parent_ref, version: dict) -> Any:
+    """Rebuild the state of a version document (already fetched)."""
+    if version.get("kind") == "snapshot":
+        return _decode(version)
+
+    base_seq, seq = version["base_seq"], version["seq"]
+    col = _versions_col(parent_ref)
+    refs = [col.document(_version_id(s)) for s in range(base_seq, seq)]
+    chain = {snap.id: snap.to_dict() for snap in get_db().get_all(refs) if snap.exists}
+
+    base = chain.get(_version_id(base_seq))
+    if base is None:
+        raise LookupError(f"Snapshot {base_seq} missing from version history")
+    state = _decode(base)
+    for s in range(base_seq + 1, seq):
+        state = apply_patch(state, _decode(chain[_version_id(s)]))
+    return apply_patch(state, _decode(version))
+
+
+def _head_state(parent_ref, head: dict) -> Any:
+    key = parent_ref.path
+    cached = _head_cache.get(key)
+    if cached is not None and cached[0] == head["seq"]:
+        return cached[1]
+    doc = _versions_col(parent_ref).document(_version_id(head["seq"])).get()
+    state = _rebuild(parent_ref, doc.to_dict())
+    _head_cache.set(key, (head["seq"], state))
+    return state
+
+
+# ---------------------------------------------------------------------------
+# Public API
+# ---------------------------------------------------------------------------
+
+def save(parent_ref, state: dict, meta: dict | None = None) -> dict | None:
+    """Append *state* as the next version of *parent_ref*.
+
+    *meta* is small, uncompressed metadata returned by :func:`list_versions`
+    (tone, label…).  Returns the version metadata or None if the parent
+    document does not exist.
+    """
+    col = _versions_col(parent_ref)
+
+    @firestore.transactional
+    def _append(transaction):
+        parent = parent_ref.get(transaction=transaction)
+        if not parent.exists:
+            return None
+        head = (parent.to_dict() or {}).get("version_head")
+        now = datetime.utcnow().isoformat()
+
+        seq = 1 if head is None else head["seq"] + 1
+        version: dict = {"seq": seq, "created_at": now, "meta": meta or {}}
+        snapshot = _encode(state)
+
+        if head is not None and seq - head["snapshot_seq"] < SNAPSHOT_EVERY:
+            diff = _encode(make_patch(_head_state(parent_ref, head), state))
+            if len(diff["payload"]) < len(snapshot["payload"]):
+                version.update(diff, kind="diff", base_seq=head["snapshot_seq"])
+
+        if "kind" not in version:
+            version.update(snapshot, kind="snapshot", base_seq=seq)
+
+        transaction.create(col.document(_version_id(seq)), version)
+        transaction.update(parent_ref, {
+            "version_head": {"seq": seq, "snapshot_seq": version["base_seq"]},
+        })
+        return version
+
+    version = _append(get_db().transaction())
+    if version is None:
+        return None
+    _head_cache.set(parent_ref.path, (version["seq"], state))
+    return _metadata(_version_id(version["seq"]), version)
+
+
+def list_versions(parent_ref, extra_fields: list[str] | None = None) -> list[dict]:
+    """Return version metadata, newest first, without reading any payload.
+
+    *extra_fields* are additional top-level fields to project, for legacy
+    full-copy documents that kept their metadata outside ``meta``.  Legacy
+    documents stamped only with ``saved_at`` are invisible to an
+    ``order_by("created_at")`` query, so they are read by a second one and
+    merged in.
+    """
+    fields = _META_FIELDS + ["saved_at"] + list(extra_fields or [])
+    col = _versions_col(parent_ref).select(fields)
+    versions: dict[str, dict] = {}
+    for order_field in ("created_at", "saved_at"):
+        for doc in col.order_by(order_field, direction="DESCENDING").stream():
+            versions.setdefault(doc.id, _metadata(doc.id, doc.to_dict()))
+    return sorted(versions.values(), key=lambda v: v.get("created_at") or "", reverse=True)
+
+
+def get_version(parent_ref, version_id: str) -> dict | None:
+    """Return ``{**metadata, "state": ...}`` for a version, or None."""
+    doc = _versions_col(parent_ref).document(version_id).get()
+    if not doc.exists:
+        return None
+    data = doc.to_dict()
+    if "kind" in data:
+        state = _rebuild(parent_ref, data)
+    else:
+        # Legacy full copy: the document itself is the state
+        state = {k: v for k, v in data.items() if k not in ("created_at", "saved_at", "restored_from")}
+    return {**_metadata(doc.id, data), "state": state}
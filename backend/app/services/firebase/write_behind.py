@@ -0,0 +1,156 @@
+"""Write-behind buffer that coalesces bursts of writes to the same document.
+
+Only the latest value per key is kept.  A key is flushed once it has been
+quiet for *debounce* seconds, or at the latest *max_delay* seconds after its
+first buffered write, by a single background thread.  Callers can force a
+flush (before reading the document, on explicit save, at shutdown).
+
+The buffer lives in the memory of one process.  Reads served by another
+worker process (``uvicorn --workers N``, ``WEB_CONCURRENCY``, several
+containers) cannot flush it and see the stored, possibly stale, value
+until the debounce window has passed.  Only buffer writes when a single
+worker serves the API; the CV auto-save buffer is bypassed with
+``AUTOSAVE_DEBOUNCE_SECONDS=0``.
+"""
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, Hashable
+
+logger = logging.getLogger(__name__)
+
+# Flushes of the same key are serialised on one of these locks so an older
+# value can never land after a newer one.
+_LOCK_STRIPES = 64
+
+
+@dataclass
+class _Pending:
+    value: Any
+    first_at: float
+    last_at: float
+
+
+class WriteBehindBuffer:
+    def __init__(
+        self,
+        write: Callable[[Hashable, Any], None],
+        debounce: float = 5.0,
+        max_delay: float = 30.0,
+        name: str = "write-behind",
+    ):
+        self._write = write
+        self.debounce = debounce
+        self.max_delay = max_delay
+        self.name = name
+        self._pending: dict[Hashable, _Pending] = {}
+        self._cond = threading.Condition()
+        self._stripes = [threading.Lock() for _ in range(_LOCK_STRIPES)]
+        self._thread: threading.Thread | None = None
+        self._stopping = False
+
+    # ── Public API ──────────────────────────────────────────────────────────
+
+    def put(self, key: Hashable, value: Any) -> None:
+        """Buffer *value* as the latest state for *key* and return immediately."""
+        now = time.monotonic()
+        with self._cond:
+            entry = self._pending.get(key)
+            if entry is None:
+                self._pending[key] = _Pending(value, now, now)
+            else:
+                entry.value = value
+                entry.last_at = now
+            self._ensure_thread()
+            self._cond.notify()
+
+    def has_pending(self, key: Hashable) -> bool:
+        with self._cond:
+            return key in self._pending
+
+    def peek(self, key: Hashable) -> Any:
+        """Return the buffered value for *key*, or None."""
+        with self._cond:
+            entry = self._pending.get(key)
+            return None if entry is None else entry.value
+
+    def pending_keys(self) -> list[Hashable]:
+        with self._cond:
+            return list(self._pending)
+
+    def discard(self, key: Hashable) -> None:
+        """Drop any buffered value for *key* without writing it."""
+        with self._stripe(key):
+            with self._cond:
+                self._pending.pop(key, None)
+
+    def flush(self, key: Hashable) -> None:
+        """Synchronously write the buffered value for *key*, if any."""
+        with self._stripe(key):
+            with self._cond:
+                entry = self._pending.pop(key, None)
+            if entry is None:
+                return
+            try:
+                self._write(key, entry.value)
+            except Exception:
+                logger.exception("%s: flush failed for %r", self.name, key)
+                entry.first_at = entry.last_at = time.monotonic()
+                with self._cond:
+                    # Keep the value for a retry unless a newer one arrived
+                    self._pending.setdefault(key, entry)
+                raise
+
+    def flush_all(self) -> None:
+        with self._cond:
+            keys = list(self._pending)
+        for key in keys:
+            try:
+                self.flush(key)
+            except Exception:
+                pass  # already logged
+
+    def stop(self) -> None:
+        """Flush everything and stop the background thread (app shutdown)."""
+        with self._cond:
+            self._stopping = True
+            self._cond.notify()
+        if self._thread is not None:
+            self._thread.join(timeout=10)
+        self.flush_all()
+
+    # ── Internals ───────────────────────────────────────────────────────────
+
+    def _stripe(self, key: Hashable) -> threading.Lock:
+        return self._stripes[hash(key) % _LOCK_STRIPES]
+
+    def _due_at(self, entry: _Pending) -> float:
+        return min(entry.last_at + self.debounce, entry.first_at + self.max_delay)
+
+    def _ensure_thread(self) -> None:
+        # Caller holds self._cond
+        if self._thread is None or not self._thread.is_alive():
+            self._stopping = False
+            self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+            self._thread.start()
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                if self._stopping:
+                    return
+                now = time.monotonic()
+                due = [k for k, e in self._pending.items() if self._due_at(e) <= now]
+                if not due:
+                    next_due = min((self._due_at(e) for e in self._pending.values()), default=None)
+                    timeout = None if next_due is None else max(next_due - now, 0.05)
+                    self._cond.wait(timeout)
+                    continue
+            for key in due:
+                try:
+                    self.flush(key)
+                except Exception:
+                    pass  # already logged, value kept for the next round
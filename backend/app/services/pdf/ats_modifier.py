@@ -2,79 +2,277 @@
 ATS PDF modifier — applies diff_changes and keywords to an original PDF using PyMuPDF.
 
 Strategy:
-  1. For each accepted DiffChange: search for the 'before' text in the PDF,
-     redact (white-fill) it, then insert the 'after' text at the same position.
-  2. For added keywords: find the skills/compétences section heading and inject
+  1. Build a text index of the document once: every word of every page, as
+     a normalised token with its rectangle, line and font size.
+  2. Match all accepted DiffChanges against the index in one pass: exact
+     token sequences first, then a fuzzy alignment anchored on the rarest
+     tokens of the 'before' text (copes with Gemini paraphrasing, reflowed
+     whitespace and hyphenated line breaks).
+  3. Per page, add all redactions, apply them once, then insert the 'after'
+     texts at the matched positions.
+  4. For added keywords: find the skills/compétences heading line and inject
      the keywords right below it, or fall back to the bottom of the last page.
-  3. Falls back gracefully (logs a warning) when a text block cannot be located.
+  5. Changes that cannot be located are skipped (logged).
+
+Step 1 is the expensive part and depends only on the original PDF, so
+``prepare_document`` keeps the bytes and their index in a short-lived
+cache: re-downloading with a different set of accepted changes only runs
+steps 2-4 on a fresh in-memory copy.
 """
 from __future__ import annotations
 
 import logging
-from typing import Any
+import re
+import string
+import unicodedata
+from dataclasses import dataclass, field
+from difflib import SequenceMatcher
+from typing import NamedTuple
 
 import fitz  # PyMuPDF  (pip install pymupdf)
 
+from app.core.cache import TTLCache
+from app.core.config import settings
+from app.services.pdf.output import save_document
+
 logger = logging.getLogger(__name__)
 
+# Minimum share of 'before' tokens a fuzzy match must contain
+FUZZY_MIN_RATIO = 0.75
+
+# Rarest 'before' tokens used as anchors for fuzzy candidates
+_ANCHOR_TOKENS = 6
+
 
 # ---------------------------------------------------------------------------
-# Helpers
+# Text index
 # ---------------------------------------------------------------------------
 
-def _get_fontsize_at(page: fitz.Page, rect: fitz.Rect) -> float:
-    """Return the font size of the first text span inside *rect* (default 10)."""
-    try:
-        data = page.get_text("dict", clip=rect)
-        for block in data.get("blocks", []):
-            for line in block.get("lines", []):
-                for span in line.get("spans", []):
-                    size = span.get("size")
-                    if size and size > 0:
-                        return float(size)
-    except Exception:
-        pass
-    return 10.0
-
-
-def _search_text(page: fitz.Page, text: str) -> list[fitz.Rect]:
-    """
-    Search for *text* on *page*.
-    Falls back to progressively shorter prefixes (60 chars, then 30 chars)
-    to cope with Gemini paraphrasing the original CV content.
+_CHAR_MAP = str.maketrans({
+    "\u2018": "'", "\u2019": "'", "\u201c": '"', "\u201d": '"',
+    "\u2010": "-", "\u2011": "-", "\u2013": "-", "\u2014": "-",
+    "\u00a0": " ", "\u00ad": "",
+})
+_EDGE_PUNCT = string.punctuation + "\u2022\u00b7\u2026\u25cf\u25aa\u2023"
+_COMPOUND_SEP = re.compile(r"[-/]")
+
+
+def normalize_token(word: str) -> str:
+    """Case-fold and strip a word so extraction quirks do not break matches
+    (ligatures, typographic quotes/dashes, surrounding punctuation)."""
+    word = unicodedata.normalize("NFKC", word).translate(_CHAR_MAP).lower()
+    return word.strip(_EDGE_PUNCT + " ")
+
+
+def _pieces(word: str) -> list[str]:
+    """Normalised tokens of one extracted word; compounds ("multi-region",
+    "CI/CD") give one token per part so spacing variants still line up."""
+    word = normalize_token(word)
+    return [p for p in (normalize_token(p) for p in _COMPOUND_SEP.split(word)) if p] if word else []
+
+
+def tokenize(text: str) -> list[str]:
+    return [p for word in text.split() for p in _pieces(word)]
+
+
+Rect = tuple[float, float, float, float]
+LineKey = tuple[int, int, int]  # (page, block, line)
+
+
+class Token(NamedTuple):
+    text: str
+    page: int
+    parts: tuple[tuple[Rect, LineKey], ...]  # one part, two for a hyphenated word
+    size: float
+
+
+@dataclass
+class TextIndex:
+    """Word-level index of a PDF, independent of the open document (so it
+    can be cached and reused with a fresh copy of the same bytes)."""
+    tokens: list[Token] = field(default_factory=list)
+    texts: list[str] = field(default_factory=list)
+    positions: dict[str, list[int]] = field(default_factory=dict)
+    # page -> [(rect, normalised line text)] in reading order
+    lines: dict[int, list[tuple[Rect, str]]] = field(default_factory=dict)
+
+
+def _span_sizes(page_dict: dict) -> dict[tuple[int, int], list[tuple[float, float, float]]]:
+    """(block, line) -> [(x0, x1, font size)] of its spans."""
+    sizes: dict[tuple[int, int], list[tuple[float, float, float]]] = {}
+    for b, block in enumerate(page_dict.get("blocks", [])):
+        for ln, line in enumerate(block.get("lines", [])):
+            sizes[(b, ln)] = [
+                (span["bbox"][0], span["bbox"][2], float(span.get("size") or 10.0))
+                for span in line.get("spans", [])
+            ]
+    return sizes
+
+
+def _size_at(spans: list[tuple[float, float, float]], x: float) -> float:
+    for x0, x1, size in spans:
+        if x0 - 0.5 <= x <= x1 + 0.5:
+            return size
+    return spans[0][2] if spans else 10.0
+
+
+def build_index(doc: fitz.Document) -> TextIndex:
+    """Extract every page once and index its words."""
+    index = TextIndex()
+    for pno, page in enumerate(doc):
+        textpage = page.get_textpage()
+        sizes = _span_sizes(page.get_text("dict", textpage=textpage))
+        # Content-stream order keeps the columns of a two-column CV apart
+        words = page.get_text("words", textpage=textpage)
+
+        line_words: dict[LineKey, list] = {}
+        for x0, y0, x1, y1, word, block, line, _ in words:
+            line_words.setdefault((pno, block, line), []).append((x0, y0, x1, y1, word))
+
+        pending: tuple[str, Rect, LineKey, float] | None = None
+        for key, items in line_words.items():
+            rect = (
+                min(w[0] for w in items), min(w[1] for w in items),
+                max(w[2] for w in items), max(w[3] for w in items),
+            )
+            index.lines.setdefault(pno, []).append(
+                (rect, " ".join(filter(None, (normalize_token(w[4]) for w in items))))
+            )
+            spans = sizes.get(key[1:], [])
+            for i, (x0, y0, x1, y1, word) in enumerate(items):
+                part = ((x0, y0, x1, y1), key)
+                if pending is not None:
+                    # Second half of a word hyphenated across lines
+                    text, prev_rect, prev_key, size = pending
+                    pending = None
+                    for piece in _pieces(text + word):
+                        index.tokens.append(Token(piece, pno, ((prev_rect, prev_key), part), size))
+                    continue
+                size = _size_at(spans, (x0 + x1) / 2)
+                if word.endswith("-") and len(word) > 1 and i == len(items) - 1:
+                    pending = (word[:-1], (x0, y0, x1, y1), key, size)
+                    continue
+                for piece in _pieces(word):
+                    index.tokens.append(Token(piece, pno, (part,), size))
+        if pending is not None:
+            text, rect, key, size = pending
+            for piece in _pieces(text):
+                index.tokens.append(Token(piece, pno, ((rect, key),), size))
+
+    index.texts = [token.text for token in index.tokens]
+    for i, text in enumerate(index.texts):
+        index.positions.setdefault(text, []).append(i)
+    return index
+
+
+# ---------------------------------------------------------------------------
+# Prepared documents
+# ---------------------------------------------------------------------------
+
+@dataclass(frozen=True)
+class PreparedPDF:
+    pdf_bytes: bytes
+    index: TextIndex
+
+
+# (uid, cv_id, blob generation) or ("render", content hash) -> PreparedPDF
+_prepared = TTLCache(maxsize=settings.ATS_DOCUMENT_CACHE_SIZE, ttl=settings.ATS_DOCUMENT_CACHE_TTL)
+
+
+def cached_document(key: tuple) -> PreparedPDF | None:
+    return _prepared.get(key)
+
+
+def prepare_document(key: tuple, pdf_bytes: bytes) -> PreparedPDF:
+    """Return the prepared document for *key*, indexing *pdf_bytes* on a miss.
+
+    *key* must change whenever the bytes do (blob generation, content hash).
     """
-    if not text:
-        return []
+    prepared = _prepared.get(key)
+    if prepared is None:
+        with fitz.open(stream=pdf_bytes, filetype="pdf") as doc:
+            prepared = PreparedPDF(pdf_bytes, build_index(doc))
+        _prepared.set(key, prepared)
+    return prepared
+
+
+# ---------------------------------------------------------------------------
+# Matching
+# ---------------------------------------------------------------------------
+
+def _free(used: list[bool], start: int, end: int) -> bool:
+    return not any(used[start:end])
+
 
-    hits = page.search_for(text)
-    if hits:
-        return hits
+def _one_page(tokens: list[Token], start: int, end: int) -> bool:
+    return tokens[start].page == tokens[end - 1].page
 
-    if len(text) > 60:
-        hits = page.search_for(text[:60].strip())
-        if hits:
-            return hits
 
-    if len(text) > 30:
-        hits = page.search_for(text[:30].strip())
-        if hits:
-            return hits
+def find_match(index: TextIndex, needle: list[str], used: list[bool]) -> tuple[int, int] | None:
+    """Return the token range ``[start, end)`` best matching *needle*, or None.
+
+    Exact sequences win; otherwise windows around occurrences of the rarest
+    needle tokens are aligned with ``SequenceMatcher`` and the best one
+    containing at least ``FUZZY_MIN_RATIO`` of the needle is taken.
+    Ranges already *used* by another change and ranges spanning pages are
+    skipped.
+    """
+    n = len(needle)
+    texts = index.texts
+    for start in index.positions.get(needle[0], ()):
+        end = start + n
+        if texts[start:end] == needle and _one_page(index.tokens, start, end) and _free(used, start, end):
+            return start, end
+
+    anchors = sorted(
+        {(len(index.positions[tok]), offset, tok) for offset, tok in enumerate(needle) if tok in index.positions}
+    )[:_ANCHOR_TOKENS]
+    candidates = {max(pos - offset, 0) for _, offset, tok in anchors for pos in index.positions[tok]}
+
+    slack = max(2, n // 5)
+    best: tuple[float, int, int] | None = None
+    for cand in sorted(candidates):
+        lo = max(cand - slack, 0)
+        window = texts[lo:cand + n + slack]
+        blocks = [b for b in SequenceMatcher(None, needle, window, autojunk=False).get_matching_blocks() if b.size]
+        if not blocks:
+            continue
+        ratio = sum(b.size for b in blocks) / n
+        if ratio < FUZZY_MIN_RATIO:
+            continue
+        start, end = lo + blocks[0].b, lo + blocks[-1].b + blocks[-1].size
+        if not _one_page(index.tokens, start, end) or not _free(used, start, end):
+            continue
+        if best is None or ratio > best[0]:
+            best = (ratio, start, end)
+    return None if best is None else (best[1], best[2])
+
 
-    return []
+def _line_rects(tokens: list[Token]) -> list[fitz.Rect]:
+    """Union of the matched words on each line, in reading order."""
+    by_line: dict[LineKey, fitz.Rect] = {}
+    for token in tokens:
+        for rect, key in token.parts:
+            if key in by_line:
+                by_line[key] |= fitz.Rect(rect)
+            else:
+                by_line[key] = fitz.Rect(rect)
+    return [by_line[key] for key in sorted(by_line, key=lambda k: (by_line[k].y0, by_line[k].x0))]
 
 
-def _expand_rect(rect: fitz.Rect, page: fitz.Page) -> fitz.Rect:
+def _insert_rect(rects: list[fitz.Rect], page: fitz.Page) -> fitz.Rect:
     """
-    Return a larger rect suitable for inserting replacement text:
-    - extends to the right up to the page margin
+    Return a rect for the replacement text:
+    - starts at the first matched line and covers all matched lines
+    - keeps to the width of the matched lines (their column), widening to
+      the page margin only for a short single fragment
     - adds a few points of height so longer replacements fit
     """
-    return fitz.Rect(
-        rect.x0,
-        rect.y0,
-        min(rect.x0 + 450, page.rect.width - 30),
-        rect.y1 + 8,
-    )
+    first = rects[0]
+    right = max(r.x1 for r in rects)
+    if right - first.x0 < 150:
+        right = min(first.x0 + 450, page.rect.width - 30)
+    return fitz.Rect(first.x0, first.y0, right, max(r.y1 for r in rects) + 8)
 
 
 # ---------------------------------------------------------------------------
@@ -85,6 +283,8 @@ def apply_ats_to_pdf(
     pdf_bytes: bytes,
     diff_changes: list[dict[str, str]],
     added_keywords: list[str],
+    index: TextIndex | None = None,
+    output: str = "standard",
 ) -> bytes:
     """
     Apply ATS optimizations to *pdf_bytes* and return the modified PDF bytes.
@@ -95,67 +295,70 @@ def apply_ats_to_pdf(
     diff_changes    : list of {"section": ..., "before": ..., "after": ...}
                       (already filtered to accepted changes only)
     added_keywords  : keyword strings to inject near the skills section
+    index           : index of *pdf_bytes* from ``prepare_document``; built
+                      here when omitted
+    output          : output mode (see ``output.OUTPUT_MODES``); ``compact``
+                      also drops the objects orphaned by the redactions
     """
     doc = fitz.open(stream=pdf_bytes, filetype="pdf")
-    applied_count = 0
+    if index is None:
+        index = build_index(doc)
 
-    # ── 1. Apply diff_changes ────────────────────────────────────────────────
+    # ── 1. Match every change against the index ─────────────────────────────
+    used = [False] * len(index.tokens)
+    plans: dict[int, list[tuple[list[fitz.Rect], str, float]]] = {}
     for change in diff_changes:
         before = (change.get("before") or "").strip()
         after  = (change.get("after")  or "").strip()
-        if not before or not after:
+        needle = tokenize(before)
+        if not needle or not after:
             continue
-
-        found = False
-        for page in doc:
-            hits = _search_text(page, before)
-            if not hits:
-                continue
-
-            # Collect font sizes BEFORE redacting (text still present)
-            font_sizes = [_get_fontsize_at(page, rect) for rect in hits]
-
-            # Redact every matching rect on this page
-            for rect in hits:
+        match = find_match(index, needle, used)
+        if match is None:
+            logger.debug("DiffChange 'before' not found in PDF: %r…", before[:50])
+            continue
+        start, end = match
+        used[start:end] = [True] * (end - start)
+        matched = index.tokens[start:end]
+        plans.setdefault(matched[0].page, []).append((_line_rects(matched), after, matched[0].size))
+
+    # ── 2. Redact once per page, then write the replacements ────────────────
+    for pno, page_plans in plans.items():
+        page = doc[pno]
+        for rects, _, _ in page_plans:
+            for rect in rects:
                 page.add_redact_annot(rect, fill=(1, 1, 1), text="")
-            page.apply_redactions(images=fitz.PDF_REDACT_IMAGE_NONE)
+        page.apply_redactions(images=fitz.PDF_REDACT_IMAGE_NONE)
 
-            # Re-insert replacement text in the same (expanded) area
-            for rect, fs in zip(hits, font_sizes):
-                insert_rect = _expand_rect(rect, page)
-                rc = page.insert_textbox(
+        for rects, after, fs in page_plans:
+            insert_rect = _insert_rect(rects, page)
+            rc = page.insert_textbox(
+                insert_rect,
+                after,
+                fontsize=fs,
+                color=(0, 0, 0),
+                align=fitz.TEXT_ALIGN_LEFT,
+            )
+            if rc < 0:
+                # Text didn't fit — retry with a slightly smaller font
+                page.insert_textbox(
                     insert_rect,
                     after,
-                    fontsize=fs,
+                    fontsize=max(fs - 1.5, 7),
                     color=(0, 0, 0),
                     align=fitz.TEXT_ALIGN_LEFT,
                 )
-                if rc < 0:
-                    # Text didn't fit — retry with a slightly smaller font
-                    page.insert_textbox(
-                        insert_rect,
-                        after,
-                        fontsize=max(fs - 1.5, 7),
-                        color=(0, 0, 0),
-                        align=fitz.TEXT_ALIGN_LEFT,
-                    )
-
-            applied_count += 1
-            found = True
-            break  # only apply each change once (first page where found)
-
-        if not found:
-            logger.debug("DiffChange 'before' not found in PDF: %r…", before[:50])
 
+    applied_count = sum(len(p) for p in plans.values())
     logger.info(
         "ATS PDF: %d/%d diff_changes applied in-place", applied_count, len(diff_changes)
     )
 
-    # ── 2. Inject added keywords ─────────────────────────────────────────────
+    # ── 3. Inject added keywords ─────────────────────────────────────────────
     if added_keywords:
-        _inject_keywords(doc, "  ·  ".join(added_keywords))
+        _inject_keywords(doc, index, "  ·  ".join(added_keywords))
 
-    return doc.tobytes()
+    return save_document(doc, output, "ats", len(pdf_bytes))
 
 
 # ---------------------------------------------------------------------------
@@ -177,25 +380,17 @@ _SKILLS_HEADINGS = [
 ]
 
 
-def _inject_keywords(doc: fitz.Document, keywords_str: str) -> None:
+def _inject_keywords(doc: fitz.Document, index: TextIndex, keywords_str: str) -> None:
     """
-    Find the first skills-like heading in the document and insert *keywords_str*
-    right below it.  Falls back to the bottom of the last page.
+    Find the first skills-like heading line in the document and insert
+    *keywords_str* right below it.  Falls back to the bottom of the last page.
     """
-    for page in doc:
-        text_lower = page.get_text().lower()
-        for heading in _SKILLS_HEADINGS:
-            idx = text_lower.find(heading)
-            if idx < 0:
-                continue
-
-            # Locate the heading rect
-            snippet = text_lower[idx: idx + len(heading)]
-            hits = page.search_for(snippet)
-            if not hits:
+    for pno in sorted(index.lines):
+        for rect, text in index.lines[pno]:
+            if len(text.split()) > 4 or not any(text.startswith(h) for h in _SKILLS_HEADINGS):
                 continue
-
-            heading_rect = hits[0]
+            page = doc[pno]
+            heading_rect = fitz.Rect(rect)
             insert_rect = fitz.Rect(
                 heading_rect.x0,
                 heading_rect.y1 + 4,
@@ -209,7 +404,7 @@ def _inject_keywords(doc: fitz.Document, keywords_str: str) -> None:
                 color=(0.18, 0.42, 0.12),  # dark green — visually distinct
                 align=fitz.TEXT_ALIGN_LEFT,
             )
-            logger.info("Keywords injected after '%s' heading", heading)
+            logger.info("Keywords injected after '%s' heading", text)
             return  # done
 
     # Fallback: bottom of the last page
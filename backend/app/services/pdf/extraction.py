@@ -0,0 +1,128 @@
+"""Text extraction from uploaded PDFs with PyMuPDF.
+
+Returns the plain text (for the AI parsers) together with layout-aware
+blocks: position, dominant font size and boldness, which is enough to tell
+headings from body text.  Blocks follow the content-stream order, which
+keeps the columns of a two-column CV apart.
+
+``extract_pdf`` is synchronous.  ``extract_pdf_async`` keeps the work off
+the event loop: short documents are read in a thread, long ones are split
+into page ranges extracted in parallel by the render pool.
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+import math
+from dataclasses import dataclass, field
+from typing import NamedTuple
+
+import fitz  # PyMuPDF
+
+from app.services.pdf import render_pool
+
+logger = logging.getLogger(__name__)
+
+# Documents longer than this are extracted in parallel, in chunks of at
+# least this many pages
+PARALLEL_MIN_PAGES = 4
+
+_BOLD = 1 << 4  # span flag
+
+
+class TextBlock(NamedTuple):
+    page: int
+    bbox: tuple[float, float, float, float]
+    text: str
+    size: float   # dominant font size (by character count)
+    bold: bool    # most characters are bold
+
+
+@dataclass
+class Extraction:
+    pages: list[str] = field(default_factory=list)
+    blocks: list[TextBlock] = field(default_factory=list)
+
+    @property
+    def page_count(self) -> int:
+        return len(self.pages)
+
+    @property
+    def text(self) -> str:
+        return "\n\n".join(p for p in self.pages if p).strip()
+
+
+def _page_blocks(page: fitz.Page, pno: int) -> list[TextBlock]:
+    blocks = []
+    for block in page.get_text("dict", flags=fitz.TEXTFLAGS_TEXT)["blocks"]:
+        lines, sizes, bold_chars, chars = [], {}, 0, 0
+        for line in block.get("lines", []):
+            parts = []
+            for span in line["spans"]:
+                text = span["text"]
+                n = len(text.strip())
+                if n:
+                    size = round(span["size"], 1)
+                    sizes[size] = sizes.get(size, 0) + n
+                    chars += n
+                    if span["flags"] & _BOLD:
+                        bold_chars += n
+                parts.append(text)
+            line_text = "".join(parts).strip()
+            if line_text:
+                lines.append(line_text)
+        if lines:
+            blocks.append(TextBlock(
+                page=pno,
+                bbox=tuple(round(v, 1) for v in block["bbox"]),
+                text="\n".join(lines),
+                size=max(sizes, key=sizes.get),
+                bold=bold_chars * 2 > chars,
+            ))
+    return blocks
+
+
+def extract_pages(pdf_bytes: bytes, start: int = 0, stop: int | None = None) -> Extraction:
+    """Extract pages ``[start, stop)`` (runs in a thread or a render worker)."""
+    result = Extraction()
+    with fitz.open(stream=pdf_bytes, filetype="pdf") as doc:
+        for pno in range(start, doc.page_count if stop is None else min(stop, doc.page_count)):
+            blocks = _page_blocks(doc[pno], pno)
+            result.blocks.extend(blocks)
+            result.pages.append("\n".join(b.text for b in blocks))
+    return result
+
+
+def extract_pdf(pdf_bytes: bytes) -> Extraction:
+    """Extract every page of *pdf_bytes* in the calling thread."""
+    return extract_pages(pdf_bytes)
+
+
+def _page_count(pdf_bytes: bytes) -> int:
+    with fitz.open(stream=pdf_bytes, filetype="pdf") as doc:
+        return doc.page_count
+
+
+async def extract_pdf_async(pdf_bytes: bytes) -> Extraction:
+    """Extract *pdf_bytes* without blocking the event loop.
+
+    Raises whatever PyMuPDF raises for unreadable files.
+    """
+    pages = await asyncio.to_thread(_page_count, pdf_bytes)
+    if pages <= PARALLEL_MIN_PAGES or render_pool.pool_size() < 2:
+        return await asyncio.to_thread(extract_pdf, pdf_bytes)
+
+    chunk = max(PARALLEL_MIN_PAGES, math.ceil(pages / render_pool.pool_size()))
+    try:
+        parts = await asyncio.gather(*(
+            render_pool.run(extract_pages, pdf_bytes, start, start + chunk)
+            for start in range(0, pages, chunk)
+        ))
+    except render_pool.RenderQueueFull:
+        logger.info("Render pool busy, extracting %d pages in a thread", pages)
+        return await asyncio.to_thread(extract_pdf, pdf_bytes)
+    result = Extraction()
+    for part in parts:
+        result.pages.extend(part.pages)
+        result.blocks.extend(part.blocks)
+    return result
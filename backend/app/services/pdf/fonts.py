@@ -0,0 +1,41 @@
+"""
+Font registration for the ReportLab renderers.
+Registered once per process at import time; prefers Arial (Unicode TTF)
+over the built-in Helvetica (latin-1 only).
+"""
+from __future__ import annotations
+
+import os
+
+from reportlab.pdfbase import pdfmetrics
+from reportlab.pdfbase.ttfonts import TTFont
+
+FONT_REG = "Helvetica"
+FONT_BOLD = "Helvetica-Bold"
+
+_win_fonts = os.path.join(os.environ.get("SystemRoot", "C:\\Windows"), "Fonts")
+try:
+    _f_reg = os.path.join(_win_fonts, "arial.ttf")
+    _f_bold = os.path.join(_win_fonts, "arialbd.ttf")
+    if os.path.exists(_f_reg):
+        pdfmetrics.registerFont(TTFont("ArialUni", _f_reg))
+        FONT_REG = "ArialUni"
+    if os.path.exists(_f_bold):
+        pdfmetrics.registerFont(TTFont("ArialUni-Bold", _f_bold))
+        FONT_BOLD = "ArialUni-Bold"
+except Exception:
+    pass  # Fall back to Helvetica silently
+
+# True when a TTF Unicode font is loaded — no latin-1 restriction applies
+USE_UNICODE = FONT_REG != "Helvetica"
+
+
+def font_pair(serif: bool = False) -> tuple[str, str]:
+    """Return ``(regular, bold)`` font names for a template.
+
+    Serif templates use Times, which is latin-1 only like Helvetica, so they
+    keep the Unicode TTF when one is loaded rather than lose characters.
+    """
+    if serif and not USE_UNICODE:
+        return "Times-Roman", "Times-Bold"
+    return FONT_REG, FONT_BOLD
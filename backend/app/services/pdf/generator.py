@@ -1,22 +1,25 @@
 """
-PDF CV Generator — Olive template.
-Renders an orange header bar (full page width) + two-column body layout that
-matches the live preview shown in the CV editor.
+PDF CV Generator.
+Renders a CV with any template of the registry in ``templates.py`` (Olive:
+orange header bar + two-column body, matching the editor's live preview).
+Section renderers below turn one CV section into flowables; templates pick
+which of them fill each column.
 """
 from __future__ import annotations
 
+import asyncio
+import copy
+import hashlib
 import html
 import io
-import os
-from typing import Any
+import json
+from functools import lru_cache
+from typing import Any, Callable
 
 from reportlab.lib import colors
-from reportlab.lib.enums import TA_LEFT, TA_RIGHT
 from reportlab.lib.pagesizes import A4
 from reportlab.lib.styles import ParagraphStyle, getSampleStyleSheet
 from reportlab.lib.units import mm
-from reportlab.pdfbase import pdfmetrics
-from reportlab.pdfbase.ttfonts import TTFont
 from reportlab.platypus import (
     BaseDocTemplate,
     Frame,
@@ -28,54 +31,15 @@ from reportlab.platypus import (
     TableStyle,
 )
 
-# ---------------------------------------------------------------------------
-# Font registration — prefer Arial (Unicode TTF) over Helvetica (latin-1)
-# ---------------------------------------------------------------------------
-_FONT_REG = "Helvetica"
-_FONT_BOLD = "Helvetica-Bold"
-
-_win_fonts = os.path.join(os.environ.get("SystemRoot", "C:\\Windows"), "Fonts")
-try:
-    _f_reg = os.path.join(_win_fonts, "arial.ttf")
-    _f_bold = os.path.join(_win_fonts, "arialbd.ttf")
-    if os.path.exists(_f_reg):
-        pdfmetrics.registerFont(TTFont("ArialUni", _f_reg))
-        _FONT_REG = "ArialUni"
-    if os.path.exists(_f_bold):
-        pdfmetrics.registerFont(TTFont("ArialUni-Bold", _f_bold))
-        _FONT_BOLD = "ArialUni-Bold"
-except Exception:
-    pass  # Fall back to Helvetica silently
-
-# True when a TTF Unicode font is loaded — no latin-1 restriction applies
-_USE_UNICODE = _FONT_REG != "Helvetica"
-
-# ---------------------------------------------------------------------------
-# Colour palette  (mirrors preview-panel.tsx Olive template)
-# ---------------------------------------------------------------------------
-ORANGE = colors.HexColor("#dda15e")       # header bar / accent
-DARK_GREEN = colors.HexColor("#283618")   # name, headings, section titles
-MED_GREEN = colors.HexColor("#606c38")    # secondary text
-WHITE = colors.white
-BLACK = colors.HexColor("#1a1a1a")
-DIVIDER_C = colors.HexColor("#c8d5b9")   # thin divider lines
+from app.core.cache import TTLCache
+from app.services.pdf import render_cache, render_pool
+from app.services.pdf.fonts import FONT_REG as _FONT_REG, USE_UNICODE as _USE_UNICODE
+from app.services.pdf.output import optimize_pdf, resolve_output
+from app.services.pdf.templates import DEFAULT_TEMPLATE, TEMPLATES, CompiledTemplate, compile_template
 
-# ---------------------------------------------------------------------------
-# Page geometry
-# ---------------------------------------------------------------------------
-PAGE_W, PAGE_H = A4               # 595 × 842 pt
-MARGIN_H: float = 18 * mm         # left/right margin
-MARGIN_BOT: float = 14 * mm       # bottom margin
-HEADER_H: float = 62              # orange bar height (pt)
-HEADER_GAP: float = 10            # gap between header bar and content
-
-# Body frame dimensions
-CONTENT_W: float = PAGE_W - 2 * MARGIN_H
-CONTENT_H: float = PAGE_H - HEADER_H - HEADER_GAP - MARGIN_BOT
-
-SIDEBAR_W: float = 128            # right sidebar width (pt ≈ 45 mm)
-SIDEBAR_GAP: float = 10           # gap between main and sidebar
-MAIN_W: float = CONTENT_W - SIDEBAR_W - SIDEBAR_GAP
+# Bump whenever a change to this module alters the rendered output, so
+# cached PDFs from the previous renderer are not served.
+RENDERER_VERSION = "2"
 
 
 # ---------------------------------------------------------------------------
@@ -117,98 +81,62 @@ def _safe(val: Any, fallback: str = "") -> str:
     return html.escape(text)
 
 
-def _styles() -> dict[str, ParagraphStyle]:
-    base = getSampleStyleSheet()
-    return {
-        # Main column section titles (e.g. "WORK EXPERIENCE")
-        "section_title": ParagraphStyle(
-            "section_title",
-            parent=base["Normal"],
-            fontSize=8,
-            leading=11,
-            textColor=DARK_GREEN,
-            fontName=_FONT_BOLD,
-            spaceBefore=8,
-            spaceAfter=1,
-        ),
-        # Normal body text
-        "body": ParagraphStyle(
-            "body",
-            parent=base["Normal"],
-            fontSize=8.5,
-            leading=12.5,
-            textColor=BLACK,
-        ),
-        # Right-aligned muted date / meta text
-        "small_right": ParagraphStyle(
-            "small_right",
-            parent=base["Normal"],
-            fontSize=7.5,
-            leading=11,
-            textColor=MED_GREEN,
-            alignment=TA_RIGHT,
-        ),
-        # Bullet lines (indented)
-        "bullet": ParagraphStyle(
-            "bullet",
-            parent=base["Normal"],
-            fontSize=8,
-            leading=11.5,
-            textColor=BLACK,
-            leftIndent=10,
-            spaceAfter=1,
-        ),
-        # Sidebar section title
-        "sidebar_section": ParagraphStyle(
-            "sidebar_section",
-            parent=base["Normal"],
-            fontSize=7.5,
-            leading=10,
-            textColor=DARK_GREEN,
-            fontName=_FONT_BOLD,
-            spaceBefore=8,
-            spaceAfter=1,
-        ),
-        # Sidebar body text
-        "sidebar_body": ParagraphStyle(
-            "sidebar_body",
-            parent=base["Normal"],
-            fontSize=7.5,
-            leading=11,
-            textColor=BLACK,
-        ),
-        # Sidebar skill dots
-        "sidebar_skill": ParagraphStyle(
-            "sidebar_skill",
-            parent=base["Normal"],
-            fontSize=7.5,
-            leading=10,
-            textColor=DARK_GREEN,
-            leftIndent=6,
-        ),
-    }
+def _clean(obj: Any) -> Any:
+    """Recursively sanitize all strings in a nested structure.
+    When ArialUni TTF is active, strings are left as-is (full Unicode support).
+    Otherwise, maps common Unicode chars to ASCII equivalents and strips the rest.
+    Non-string values (datetime, int, bool, None…) are always left untouched.
+    """
+    if isinstance(obj, str):
+        if not _USE_UNICODE:
+            obj = obj.translate(_UNICODE_MAP)
+            return obj.encode("latin-1", errors="ignore").decode("latin-1")
+        return obj
+    if isinstance(obj, dict):
+        return {k: _clean(v) for k, v in obj.items()}
+    if isinstance(obj, list):
+        return [_clean(item) for item in obj]
+    return obj
+
 
+class _Para(Paragraph):
+    """Paragraph that remembers its line breaks per wrap width.
 
-def _hr() -> HRFlowable:
-    return HRFlowable(width="100%", thickness=0.4, color=DIVIDER_C, spaceAfter=3)
+    The memo dict is shared by shallow copies (see ``_render_column``), so
+    a section reused from the memo is not parsed or re-broken again.
+    """
 
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._wrap_memo: dict = {}
+
+    def wrap(self, availWidth, availHeight):
+        memo = self._wrap_memo.get(availWidth)
+        if memo is not None:
+            self.width, self._wrapWidths, self.blPara, self.height = memo
+            return self.width, self.height
+        width, height = super().wrap(availWidth, availHeight)
+        self._wrap_memo[availWidth] = (self.width, self._wrapWidths, self.blPara, self.height)
+        return width, height
 
-def _section(items: list, title: str, s: dict) -> None:
-    """Append a section header + divider to items list."""
-    items.append(Paragraph(title.upper(), s["section_title"]))
-    items.append(_hr())
 
+def _hr(ct: CompiledTemplate) -> HRFlowable:
+    return HRFlowable(width="100%", thickness=0.4, color=ct.colors["divider"], spaceAfter=3)
 
-def _sidebar_section(items: list, title: str, s: dict) -> None:
-    items.append(Paragraph(title.upper(), s["sidebar_section"]))
-    items.append(_hr())
+
+def _heading(items: list, title: str, ct: CompiledTemplate, column: str) -> None:
+    """Append a section header + divider to items list."""
+    items.append(_Para(ct.heading(title), ct.styles[column]["title"]))
+    items.append(_hr(ct))
 
 
-def _exp_row(left: str, right: str, s: dict) -> Table:
+def _exp_row(left: str, right: str, ct: CompiledTemplate, column: str) -> Table:
     """Job title / school line with right-aligned date."""
+    s = ct.styles[column]
+    width = ct.width(column)
     t = Table(
-        [[Paragraph(f"<b>{left}</b>", s["body"]), Paragraph(right, s["small_right"])]],
-        colWidths=[MAIN_W * 0.68, MAIN_W * 0.32],
+        [[_Para(f"<b>{left}</b>", s["body"]), _Para(right, s["meta"])]],
+        colWidths=[width * 0.68, width * 0.32],
     )
     t.setStyle(TableStyle([
         ("VALIGN", (0, 0), (-1, -1), "TOP"),
@@ -221,256 +149,495 @@ def _exp_row(left: str, right: str, s: dict) -> Table:
 
 
 # ---------------------------------------------------------------------------
-# Main generator
+# Section renderers: (section data, compiled template, column) -> flowables
 # ---------------------------------------------------------------------------
 
-def _clean(obj: Any) -> Any:
-    """Recursively sanitize all strings in a nested structure.
-    When ArialUni TTF is active, strings are left as-is (full Unicode support).
-    Otherwise, maps common Unicode chars to ASCII equivalents and strips the rest.
-    Non-string values (datetime, int, bool, None…) are always left untouched.
+def _summary(summary: Any, ct: CompiledTemplate, column: str) -> list:
+    items: list = []
+    text = _safe(summary)
+    if text:
+        _heading(items, "Professional Summary", ct, column)
+        items.append(_Para(text, ct.styles[column]["body"]))
+        items.append(Spacer(1, 4))
+    return items
+
+
+def _experience(experience: Any, ct: CompiledTemplate, column: str) -> list:
+    items: list = []
+    experience = experience or []
+    if not experience:
+        return items
+    s = ct.styles[column]
+    _heading(items, "Work Experience", ct, column)
+    for i, job in enumerate(experience):
+        jt = _safe(job.get("job_title"))
+        co = _safe(job.get("company"))
+        loc = _safe(job.get("location"))
+        start = _safe(job.get("start_date"))
+        end = "Present" if job.get("current") else _safe(job.get("end_date"))
+        date_range = " - ".join(filter(None, [start, end]))
+        left_text = " | ".join(filter(None, [jt, co, loc]))
+
+        if date_range:
+            items.append(_exp_row(left_text, date_range, ct, column))
+        else:
+            items.append(_Para(f"<b>{left_text}</b>", s["body"]))
+
+        for bullet in (job.get("bullets") or []):
+            items.append(_Para(f"• {_safe(bullet)}", s["bullet"]))
+
+        if i < len(experience) - 1:
+            items.append(Spacer(1, 5))
+    items.append(Spacer(1, 2))
+    return items
+
+
+def _education(education: Any, ct: CompiledTemplate, column: str) -> list:
+    items: list = []
+    education = education or []
+    if not education:
+        return items
+    s = ct.styles[column]
+    _heading(items, "Education", ct, column)
+    for i, edu in enumerate(education):
+        school = _safe(edu.get("school"))
+        degree = _safe(edu.get("degree"))
+        field = _safe(edu.get("field"))
+        grad = _safe(edu.get("graduation_date"))
+        gpa = _safe(edu.get("gpa"))
+
+        degree_line = " in ".join(filter(None, [degree, field]))
+        left = " | ".join(filter(None, [school, degree_line]))
+        right = " | ".join(filter(None, [grad, f"GPA {gpa}" if gpa else ""]))
+
+        if right:
+            items.append(_exp_row(left, right, ct, column))
+        else:
+            items.append(_Para(f"<b>{left}</b>", s["body"]))
+
+        if i < len(education) - 1:
+            items.append(Spacer(1, 4))
+    items.append(Spacer(1, 2))
+    return items
+
+
+def _certifications(certifications: Any, ct: CompiledTemplate, column: str) -> list:
+    items: list = []
+    if certifications:
+        _heading(items, "Certifications", ct, column)
+        for cert in certifications:
+            items.append(_Para(f"• {_safe(cert)}", ct.styles[column]["bullet"]))
+        items.append(Spacer(1, 2))
+    return items
+
+
+def _projects(projects: Any, ct: CompiledTemplate, column: str) -> list:
+    items: list = []
+    projects = projects or []
+    if not projects:
+        return items
+    s = ct.styles[column]
+    _heading(items, "Projects", ct, column)
+    for i, proj in enumerate(projects):
+        proj_name = _safe(proj.get("name") or proj.get("title", ""))
+        proj_desc = _safe(proj.get("description", ""))
+        proj_url = _safe(proj.get("url", ""))
+        if proj_name:
+            items.append(_Para(f"<b>{proj_name}</b>", s["body"]))
+        if proj_desc:
+            items.append(_Para(proj_desc, s["body"]))
+        if proj_url:
+            items.append(_Para(proj_url, s["bullet"]))
+        if i < len(projects) - 1:
+            items.append(Spacer(1, 4))
+    return items
+
+
+def _contact_values(contact: Any) -> list[str]:
+    contact = contact or {}
+    return list(filter(None, [
+        _safe(contact.get(key))
+        for key in ("email", "phone", "location", "linkedin", "website")
+    ]))
+
+
+def _contact(contact: Any, ct: CompiledTemplate, column: str) -> list:
+    items: list = []
+    _heading(items, "Contact", ct, column)
+    for val in _contact_values(contact):
+        items.append(_Para(val, ct.styles[column]["contact"]))
+        items.append(Spacer(1, 1.5))
+    return items
+
+
+def _contact_line(contact: Any, ct: CompiledTemplate, column: str) -> list:
+    values = _contact_values(contact)
+    if not values:
+        return []
+    return [_Para(" | ".join(values), ct.styles[column]["contact"]), Spacer(1, 2)]
+
+
+def _list_section(title: str) -> Callable[[Any, CompiledTemplate, str], list]:
+    """One paragraph per entry (sidebar skills/languages)."""
+    def render(values: Any, ct: CompiledTemplate, column: str) -> list:
+        items: list = []
+        if values:
+            _heading(items, title, ct, column)
+            bullet = title == "Skills"
+            style = ct.styles[column]["bullet" if bullet else "body"]
+            for value in values:
+                items.append(_Para(f"• {_safe(value)}" if bullet else _safe(value), style))
+                items.append(Spacer(1, 1 if bullet else 1.5))
+        return items
+    return render
+
+
+def _inline_section(title: str) -> Callable[[Any, CompiledTemplate, str], list]:
+    """All entries in one wrapped paragraph (single-column skills/languages)."""
+    def render(values: Any, ct: CompiledTemplate, column: str) -> list:
+        items: list = []
+        values = [v for v in (_safe(value) for value in values or []) if v]
+        if values:
+            _heading(items, title, ct, column)
+            items.append(_Para(", ".join(values), ct.styles[column]["body"]))
+            items.append(Spacer(1, 2))
+        return items
+    return render
+
+
+# name -> (CV content key, renderer)
+SECTION_RENDERERS: dict[str, tuple[str, Callable[[Any, CompiledTemplate, str], list]]] = {
+    "summary": ("summary", _summary),
+    "experience": ("experience", _experience),
+    "education": ("education", _education),
+    "certifications": ("certifications", _certifications),
+    "projects": ("projects", _projects),
+    "contact": ("contact_info", _contact),
+    "contact_line": ("contact_info", _contact_line),
+    "skills": ("skills", _list_section("Skills")),
+    "skills_inline": ("skills", _inline_section("Skills")),
+    "languages": ("languages", _list_section("Languages")),
+    "languages_inline": ("languages", _inline_section("Languages")),
+}
+
+
+# (template, page size, column, section, content digest) -> flowables.
+# Editing one bullet only invalidates the section that contains it; the
+# other sections reuse their parsed and already line-broken paragraphs.
+_section_memo = TTLCache(maxsize=256, ttl=3600)
+
+
+def _digest(data: Any) -> str:
+    raw = json.dumps(data, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.blake2b(raw.encode(), digest_size=16).hexdigest()
+
+
+def _column_sections(
+    sections: tuple[str, ...], content: dict, ct: CompiledTemplate, column: str,
+) -> list[tuple[str, list]]:
+    """``(section name, flowables)`` of one column, reusing memoised sections
+    whose data is unchanged.
+
+    The memo keeps pristine flowables and every build gets shallow copies:
+    platypus leaves per-build state on flowables (``_postponed``, table
+    split state…) that must not leak into the next document.  Copies still
+    share the parsed text and line breaks, so callers hold ``ct.lock``.
     """
-    if isinstance(obj, str):
-        if not _USE_UNICODE:
-            obj = obj.translate(_UNICODE_MAP)
-            return obj.encode("latin-1", errors="ignore").decode("latin-1")
-        return obj
-    if isinstance(obj, dict):
-        return {k: _clean(v) for k, v in obj.items()}
-    if isinstance(obj, list):
-        return [_clean(item) for item in obj]
-    return obj
+    result = []
+    for name in sections:
+        key, render = SECTION_RENDERERS[name]
+        data = content.get(key)
+        memo_key = (ct.id, ct.page_size, column, name, _digest(data))
+        flowables = _section_memo.get(memo_key)
+        if flowables is None:
+            flowables = render(data, ct, column)
+            _section_memo.set(memo_key, flowables)
+        result.append((name, [copy.copy(f) for f in flowables]))
+    return result
+
+
+def _render_column(sections: tuple[str, ...], content: dict, ct: CompiledTemplate, column: str) -> list:
+    return [f for _, flowables in _column_sections(sections, content, ct, column) for f in flowables]
+
+
+def _body(ct: CompiledTemplate, main: list, sidebar: list) -> list:
+    """Lay out the columns: a single flow, or a two-column table whose row
+    may split across pages."""
+    if not ct.two_column:
+        return main
+
+    g = ct.template.geometry
+    if g.sidebar_left:
+        cells, widths = [sidebar, main], [ct.sidebar_w, ct.main_w]
+        side, body = 0, 1
+        padding = [
+            ("LEFTPADDING", (side, 0), (side, 0), 0),
+            ("RIGHTPADDING", (side, 0), (side, 0), g.sidebar_gap),
+            ("LEFTPADDING", (body, 0), (body, 0), 4),
+            ("RIGHTPADDING", (body, 0), (body, 0), 0),
+            ("LINEAFTER", (side, 0), (side, -1), 0.4, ct.colors["divider"]),
+        ]
+    else:
+        cells, widths = [main, sidebar], [ct.main_w, ct.sidebar_w]
+        padding = [
+            ("LEFTPADDING", (0, 0), (0, 0), 0),
+            ("RIGHTPADDING", (0, 0), (0, 0), 4),
+            ("LEFTPADDING", (1, 0), (1, 0), g.sidebar_gap),
+            ("RIGHTPADDING", (1, 0), (1, 0), 0),
+            # Thin vertical divider between columns
+            ("LINEBEFORE", (1, 0), (1, -1), 0.4, ct.colors["divider"]),
+        ]
+
+    table = Table([cells], colWidths=widths, splitInRow=1)
+    table.setStyle(TableStyle([
+        ("VALIGN", (0, 0), (-1, -1), "TOP"),
+        ("TOPPADDING", (0, 0), (-1, -1), 0),
+        ("BOTTOMPADDING", (0, 0), (-1, -1), 0),
+        *padding,
+    ]))
+    return [table]
+
 
+# ---------------------------------------------------------------------------
+# Main generator
+# ---------------------------------------------------------------------------
+
+def cv_render_key(cv: dict, output: str = "standard") -> str:
+    """Hash of everything the rendered PDF depends on (also its ETag)."""
+    material = json.dumps(
+        {
+            "renderer": RENDERER_VERSION,
+            "output": output,
+            "title": cv.get("title"),
+            "template_id": cv.get("template_id") or DEFAULT_TEMPLATE,
+            "content": cv.get("content") or {},
+        },
+        sort_keys=True,
+        separators=(",", ":"),
+        default=str,
+    )
+    return hashlib.sha256(material.encode()).hexdigest()
 
-async def generate_cv_pdf(cv: dict) -> bytes:
+
+async def generate_cv_pdf(cv: dict, output: str | None = None) -> bytes:
     """
     Build a styled PDF from a CV Firestore document and return raw bytes.
-    Visual style: Olive template (orange header bar, two-column body).
+    Served from ``render_cache`` when this exact content was rendered
+    before; otherwise rendered in the process pool (see ``render_pool``).
+    *output* is a mode of ``output.OUTPUT_MODES`` (default: settings).
+    """
+    output = resolve_output(output)
+    key = cv_render_key(cv, output)
+    cached = await asyncio.to_thread(render_cache.get, key)
+    if cached is not None:
+        return cached
+    payload = {
+        "title": cv.get("title"),
+        "template_id": cv.get("template_id") or DEFAULT_TEMPLATE,
+        "content": cv.get("content") or {},
+    }
+    pdf_bytes = await render_pool.run(render_cv_pdf, payload, "a4", output)
+    await asyncio.to_thread(render_cache.put, key, pdf_bytes)
+    return pdf_bytes
+
+
+def render_cv_pdf(cv: dict, page_size: str = "a4", output: str = "standard") -> bytes:
+    """
+    Synchronous CV renderer (runs inside a render worker).
+    Uses ``cv["template_id"]`` (unknown ids fall back to Olive).
     """
     # ── Sanitize ALL string values recursively ───────────────────────────────
     # Walks every dict/list in the CV, replaces non-latin-1 chars in strings.
     # Non-string types (Firestore Timestamps, ints…) are left untouched.
     cv = _clean(cv)
+    ct = compile_template(cv.get("template_id"), page_size)
 
     content: dict = cv.get("content") or {}
-    doc_title: str = _safe(cv.get("title"), "Curriculum Vitae")
+    doc_title = str(cv.get("title") or "Curriculum Vitae").strip()
 
-    # --- Header data --------------------------------------------------------
+    # Header text is drawn on the canvas, so it is not HTML-escaped
     contact: dict = content.get("contact_info") or {}
-    name = _safe(contact.get("name")) or doc_title
     first_exp = next(iter(content.get("experience") or []), {})
-    job_title_str = _safe(first_exp.get("job_title"))
-
-    # --- Canvas callback: draws orange header on every page -----------------
-    def _on_page(canvas, _doc):
-        canvas.saveState()
-        # Full-width orange bar
-        canvas.setFillColor(ORANGE)
-        canvas.rect(0, PAGE_H - HEADER_H, PAGE_W, HEADER_H, fill=1, stroke=0)
-        # Name — white bold
-        canvas.setFillColor(WHITE)
-        canvas.setFont(_FONT_BOLD, 18)
-        canvas.drawString(MARGIN_H, PAGE_H - 36, name[:65])
-        # Job title — dark text on orange
-        if job_title_str:
-            canvas.setFillColor(DARK_GREEN)
-            canvas.setFont(_FONT_REG, 9)
-            canvas.drawString(MARGIN_H, PAGE_H - 51, job_title_str[:90])
-        canvas.restoreState()
-
-    # --- Build doc ----------------------------------------------------------
+    header = {
+        "name": str(contact.get("name") or "").strip() or doc_title,
+        "subtitle": str(first_exp.get("job_title") or "").strip(),
+    }
+
     buf = io.BytesIO()
+    doc = BaseDocTemplate(buf, pagesize=ct.page_size, title=doc_title, author="CVFlow")
+    doc.cv_header = header  # read by the page template's header callback
+    doc.addPageTemplates([ct.page_template])
+    with ct.lock:
+        main = _render_column(ct.template.main, content, ct, "main")
+        sidebar = _render_column(ct.template.sidebar, content, ct, "sidebar")
+        # If main is empty (fresh CV), show a placeholder
+        if not main:
+            main.append(Spacer(1, 4))
+        doc.build(_body(ct, main, sidebar))
+    return optimize_pdf(buf.getvalue(), output, "cv")
 
-    body_frame = Frame(
-        MARGIN_H,
-        MARGIN_BOT,
-        CONTENT_W,
-        CONTENT_H,
-        leftPadding=0,
-        rightPadding=0,
-        topPadding=0,
-        bottomPadding=0,
-        id="body",
-    )
 
-    doc = BaseDocTemplate(
-        buf,
-        pagesize=A4,
-        title=doc_title,
-        author="CVFlow",
-    )
-    doc.addPageTemplates([
-        PageTemplate(id="main", frames=[body_frame], onPage=_on_page)
-    ])
-
-    s = _styles()
-
-    # ========================================================================
-    # MAIN COLUMN
-    # ========================================================================
-    main: list = []
-
-    # Summary ----------------------------------------------------------------
-    summary = _safe(content.get("summary"))
-    if summary:
-        _section(main, "Professional Summary", s)
-        main.append(Paragraph(summary, s["body"]))
-        main.append(Spacer(1, 4))
-
-    # Experience -------------------------------------------------------------
-    experience: list[dict] = content.get("experience") or []
-    if experience:
-        _section(main, "Work Experience", s)
-        for i, job in enumerate(experience):
-            jt = _safe(job.get("job_title"))
-            co = _safe(job.get("company"))
-            loc = _safe(job.get("location"))
-            start = _safe(job.get("start_date"))
-            end = "Present" if job.get("current") else _safe(job.get("end_date"))
-            date_range = " - ".join(filter(None, [start, end]))
-            left_text = " | ".join(filter(None, [jt, co, loc]))
-
-            if date_range:
-                main.append(_exp_row(left_text, date_range, s))
-            else:
-                main.append(Paragraph(f"<b>{left_text}</b>", s["body"]))
-
-            for bullet in (job.get("bullets") or []):
-                main.append(Paragraph(f"• {_safe(bullet)}", s["bullet"]))
-
-            if i < len(experience) - 1:
-                main.append(Spacer(1, 5))
-        main.append(Spacer(1, 2))
-
-    # Education --------------------------------------------------------------
-    education: list[dict] = content.get("education") or []
-    if education:
-        _section(main, "Education", s)
-        for i, edu in enumerate(education):
-            school = _safe(edu.get("school"))
-            degree = _safe(edu.get("degree"))
-            field = _safe(edu.get("field"))
-            grad = _safe(edu.get("graduation_date"))
-            gpa = _safe(edu.get("gpa"))
-
-            degree_line = " in ".join(filter(None, [degree, field]))
-            left = " | ".join(filter(None, [school, degree_line]))
-            right_parts = list(filter(None, [grad, f"GPA {gpa}" if gpa else ""]))
-            right = " | ".join(right_parts)
-
-            if right:
-                main.append(_exp_row(left, right, s))
-            else:
-                main.append(Paragraph(f"<b>{left}</b>", s["body"]))
-
-            if i < len(education) - 1:
-                main.append(Spacer(1, 4))
-        main.append(Spacer(1, 2))
-
-    # Certifications ---------------------------------------------------------
-    certifications: list[str] = content.get("certifications") or []
-    if certifications:
-        _section(main, "Certifications", s)
-        for cert in certifications:
-            main.append(Paragraph(f"• {_safe(cert)}", s["bullet"]))
-        main.append(Spacer(1, 2))
-
-    # Projects ---------------------------------------------------------------
-    projects: list[dict] = content.get("projects") or []
-    if projects:
-        _section(main, "Projects", s)
-        for i, proj in enumerate(projects):
-            proj_name = _safe(proj.get("name") or proj.get("title", ""))
-            proj_desc = _safe(proj.get("description", ""))
-            proj_url = _safe(proj.get("url", ""))
-            if proj_name:
-                main.append(Paragraph(f"<b>{proj_name}</b>", s["body"]))
-            if proj_desc:
-                main.append(Paragraph(proj_desc, s["body"]))
-            if proj_url:
-                main.append(Paragraph(proj_url, s["bullet"]))
-            if i < len(projects) - 1:
-                main.append(Spacer(1, 4))
-
-    # ========================================================================
-    # SIDEBAR
-    # ========================================================================
-    sidebar: list = []
-
-    # Contact ----------------------------------------------------------------
-    _sidebar_section(sidebar, "Contact", s)
-    for val in filter(None, [
-        _safe(contact.get("email")),
-        _safe(contact.get("phone")),
-        _safe(contact.get("location")),
-        _safe(contact.get("linkedin")),
-        _safe(contact.get("website")),
-    ]):
-        sidebar.append(Paragraph(val, s["sidebar_body"]))
-        sidebar.append(Spacer(1, 1.5))
-
-    # Skills -----------------------------------------------------------------
-    skills: list[str] = content.get("skills") or []
-    if skills:
-        _sidebar_section(sidebar, "Skills", s)
-        for skill in skills:
-            sidebar.append(Paragraph(f"• {_safe(skill)}", s["sidebar_skill"]))
-            sidebar.append(Spacer(1, 1))
-
-    # Languages --------------------------------------------------------------
-    languages: list[str] = content.get("languages") or []
-    if languages:
-        _sidebar_section(sidebar, "Languages", s)
-        for lang in languages:
-            sidebar.append(Paragraph(_safe(lang), s["sidebar_body"]))
-            sidebar.append(Spacer(1, 1.5))
-
-    # ========================================================================
-    # TWO-COLUMN BODY TABLE
-    # ========================================================================
-    # If main is empty (fresh CV), show a placeholder
-    if not main:
-        main.append(Spacer(1, 4))
-
-    body_table = Table(
-        [[main, sidebar]],
-        colWidths=[MAIN_W, SIDEBAR_W],
-    )
-    body_table.setStyle(TableStyle([
-        ("VALIGN", (0, 0), (-1, -1), "TOP"),
-        # Main column padding
-        ("LEFTPADDING", (0, 0), (0, 0), 0),
-        ("RIGHTPADDING", (0, 0), (0, 0), 4),
-        # Sidebar padding
-        ("LEFTPADDING", (1, 0), (1, 0), SIDEBAR_GAP),
-        ("RIGHTPADDING", (1, 0), (1, 0), 0),
-        # Remove default vertical padding
-        ("TOPPADDING", (0, 0), (-1, -1), 0),
-        ("BOTTOMPADDING", (0, 0), (-1, -1), 0),
-        # Thin vertical divider between columns
-        ("LINEBEFORE", (1, 0), (1, -1), 0.4, DIVIDER_C),
-    ]))
+# ---------------------------------------------------------------------------
+# Layout-only mode (no PDF output)
+# ---------------------------------------------------------------------------
 
-    doc.build([body_table])
-    buf.seek(0)
-    return buf.read()
+_FUZZ = 1e-6
+
+
+def _line_offsets(flowable) -> list[float]:
+    """Top of each wrapped line, relative to the top of *flowable*."""
+    bl_para = getattr(flowable, "blPara", None)
+    if bl_para is not None:
+        leading = flowable.style.leading
+        return [i * leading for i in range(len(bl_para.lines))]
+    return [0.0] if isinstance(flowable, Table) else []
+
+
+def _paginate(
+    sections: list[tuple[str, list]], width: float, height: float, in_frame: bool,
+) -> tuple[list[dict], list[str]]:
+    """Flow a column's sections through pages of *height*.
+
+    Wraps and splits the flowables exactly as a build would, but never draws
+    them.  Flowing straight through a Frame (*in_frame*) overlaps each
+    space-before with the previous space-after; table cells add both.
+    Returns one box per section and page (``y`` measured from the top of
+    the frame), with the top of every wrapped line in ``line_y``, plus
+    warnings.
+    """
+    boxes: dict[tuple[str, int], dict] = {}
+    warnings: list[str] = []
+    page, used, space_after = 1, 0.0, 0.0
+    queue = [(name, f) for name, flowables in sections for f in flowables]
+
+    while queue:
+        name, f = queue.pop(0)
+        space_before = f.getSpaceBefore() if used > 0 else 0
+        if in_frame:
+            space_before = max(space_before - space_after, 0)
+        avail = height - used - space_before
+        w, h = f.wrap(width, avail)
+        if w > width + 0.5:
+            warnings.append(f"'{name}' has content wider than the column")
+
+        if h > avail + _FUZZ:
+            parts = f.split(width, avail) if avail > 0 else []
+            if parts:
+                queue[:0] = [(name, part) for part in parts]
+                continue
+            if used > 0:
+                # Does not fit the rest of this page: start the next one
+                page, used, space_after = page + 1, 0.0, 0.0
+                queue.insert(0, (name, f))
+                continue
+            warnings.append(f"'{name}' has a block taller than a page")
+
+        top = used + space_before
+        box = boxes.setdefault((name, page), {
+            "section": name, "page": page, "y": top, "height": 0.0, "lines": 0, "line_y": [],
+        })
+        box["height"] = top + h - box["y"]
+        offsets = _line_offsets(f)
+        box["lines"] += len(offsets)
+        box["line_y"].extend(top + dy for dy in offsets)
+        space_after = f.getSpaceAfter()
+        used = top + h + space_after
+        if used >= height - _FUZZ and queue:
+            page, used, space_after = page + 1, 0.0, 0.0
+
+    pages_by_section: dict[str, list[int]] = {}
+    for name, p in boxes:
+        pages_by_section.setdefault(name, []).append(p)
+    for name, pages in pages_by_section.items():
+        if len(pages) > 1:
+            warnings.append(f"'{name}' is split across pages {pages[0]}-{pages[-1]}")
+    return list(boxes.values()), warnings
+
+
+def layout_cv(cv: dict, page_size: str = "a4") -> dict:
+    """
+    Run the layout pass of :func:`render_cv_pdf` without drawing or
+    serialising anything and describe the result: page count and, per
+    section, the page, bounding box (points, origin at the top-left of the
+    page), number of lines and the top of each line (``line_y``, same
+    coordinates), i.e. where the text breaks.
+    """
+    cv = _clean(cv)
+    ct = compile_template(cv.get("template_id"), page_size)
+    g = ct.template.geometry
+    content: dict = cv.get("content") or {}
+    top = g.header_h + g.header_gap
+
+    if not ct.two_column:
+        columns = {"main": g.margin_h}
+    elif g.sidebar_left:
+        columns = {"sidebar": g.margin_h, "main": g.margin_h + ct.sidebar_w + 4}
+    else:
+        columns = {"main": g.margin_h, "sidebar": g.margin_h + ct.main_w + g.sidebar_gap}
+
+    boxes: list[dict] = []
+    warnings: list[str] = []
+    with ct.lock:
+        for column, x in columns.items():
+            declared = ct.template.main if column == "main" else ct.template.sidebar
+            sections = _column_sections(declared, content, ct, column)
+            width = ct.width(column)
+            column_boxes, column_warnings = _paginate(
+                sections, width, ct.content_h, in_frame=not ct.two_column,
+            )
+            for box in column_boxes:
+                box.update(column=column, x=x, width=width, y=top + box["y"])
+                box["line_y"] = [round(top + y, 1) for y in box["line_y"]]
+            boxes.extend(column_boxes)
+            warnings.extend(column_warnings)
+
+    name = str((content.get("contact_info") or {}).get("name") or "")
+    if len(name) > 65:
+        warnings.append("Name is truncated in the header")
+
+    boxes = [box for box in boxes if box["height"] > 0]
+    for box in boxes:
+        for k in ("x", "y", "width", "height"):
+            box[k] = round(box[k], 1)
+    return {
+        "template_id": ct.id,
+        "page_count": max((box["page"] for box in boxes), default=1),
+        "page_width": round(ct.page_w, 1),
+        "page_height": round(ct.page_h, 1),
+        "sections": boxes,
+        "warnings": warnings,
+    }
+
+
+# Bumped when the layout payload changes, so cached descriptions are redone
+_LAYOUT_EXT = "layout-v2.json"
+
+
+async def generate_cv_layout(cv: dict) -> dict:
+    """Layout description of a CV (see :func:`layout_cv`), cached by content hash."""
+    key = cv_render_key(cv)
+    cached = await asyncio.to_thread(render_cache.get, key, _LAYOUT_EXT)
+    if cached is not None:
+        return json.loads(cached)
+    payload = {
+        "title": cv.get("title"),
+        "template_id": cv.get("template_id") or DEFAULT_TEMPLATE,
+        "content": cv.get("content") or {},
+    }
+    layout = await render_pool.run(layout_cv, payload)
+    await asyncio.to_thread(render_cache.put, key, json.dumps(layout).encode(), _LAYOUT_EXT)
+    return layout
 
 
 # ---------------------------------------------------------------------------
 # Cover Letter PDF generator
 # ---------------------------------------------------------------------------
 
-async def generate_cover_letter_pdf(
-    text: str,
-    tone: str = "professional",
-    letter_format: str = "us",
-) -> bytes:
-    """Render a cover letter as a clean, professional PDF and return bytes."""
-    base = getSampleStyleSheet()
-
-    CL_BODY = ParagraphStyle(
+@lru_cache(maxsize=None)
+def _cover_letter_style() -> ParagraphStyle:
+    return ParagraphStyle(
         "cl_body",
-        parent=base["Normal"],
+        parent=getSampleStyleSheet()["Normal"],
         fontName=_FONT_REG,
         fontSize=10.5,
         leading=16,
@@ -478,6 +645,28 @@ async def generate_cover_letter_pdf(
         spaceAfter=10,
     )
 
+
+async def generate_cover_letter_pdf(
+    text: str,
+    tone: str = "professional",
+    letter_format: str = "us",
+    output: str | None = None,
+) -> bytes:
+    """Render a cover letter as a clean, professional PDF and return bytes."""
+    return await render_pool.run(
+        render_cover_letter_pdf, text, tone, letter_format, resolve_output(output)
+    )
+
+
+def render_cover_letter_pdf(
+    text: str,
+    tone: str = "professional",
+    letter_format: str = "us",
+    output: str = "standard",
+) -> bytes:
+    """Synchronous cover letter PDF renderer (runs inside a render worker)."""
+    CL_BODY = _cover_letter_style()
+
     buf = io.BytesIO()
     doc = BaseDocTemplate(
         buf,
@@ -515,8 +704,7 @@ async def generate_cover_letter_pdf(
         story.append(Paragraph("(empty cover letter)", CL_BODY))
 
     doc.build(story)
-    buf.seek(0)
-    return buf.read()
+    return optimize_pdf(buf.getvalue(), output, "cover_letter")
 
 
 # ---------------------------------------------------------------------------
@@ -529,6 +717,15 @@ async def generate_cover_letter_docx(
     letter_format: str = "us",
 ) -> bytes:
     """Render a cover letter as a .docx file and return bytes."""
+    return await render_pool.run(render_cover_letter_docx, text, tone, letter_format)
+
+
+def render_cover_letter_docx(
+    text: str,
+    tone: str = "professional",
+    letter_format: str = "us",
+) -> bytes:
+    """Synchronous cover letter DOCX renderer (runs inside a render worker)."""
     from docx import Document
     from docx.shared import Pt, Cm
     from docx.enum.text import WD_ALIGN_PARAGRAPH
@@ -557,3 +754,30 @@ async def generate_cover_letter_docx(
     doc.save(buf)
     buf.seek(0)
     return buf.read()
+
+
+# ---------------------------------------------------------------------------
+# Worker warm-up
+# ---------------------------------------------------------------------------
+
+_WARM_UP_CV = {
+    "contact_info": {"name": "Warm Up", "email": "warm@up.example"},
+    "summary": "warm-up",
+    "experience": [{"job_title": "Role", "company": "Co", "start_date": "2020", "bullets": ["warm-up"]}],
+    "education": [{"school": "School", "degree": "BSc", "graduation_date": "2019"}],
+    "skills": ["warm-up"],
+    "languages": ["English"],
+}
+
+
+def warm() -> None:
+    """Compile every template and render throwaway documents so a render
+    worker's first real job does not pay for lazy imports and font setup."""
+    _cover_letter_style()
+    for template_id in TEMPLATES:
+        render_cv_pdf({"title": "warm-up", "template_id": template_id, "content": _WARM_UP_CV})
+    render_cover_letter_pdf("warm-up", output="compact")  # also warms PyMuPDF
+    try:
+        render_cover_letter_docx("warm-up")
+    except ImportError:
+        pass
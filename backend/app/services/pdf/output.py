@@ -0,0 +1,79 @@
+"""Final PDF output modes: trade a few milliseconds of CPU for smaller files.
+
+- ``standard``: the bytes as the renderer produced them
+- ``compact``:  fonts subset, unreferenced objects dropped (redactions leave
+                many behind), duplicate objects merged, every stream deflated
+- ``web``:      ``compact`` and linearised ("fast web view"), so a viewer
+                can show page 1 before the whole file has arrived
+
+MuPDF no longer writes linearised files; ``web`` uses pikepdf (qpdf) when
+it is installed and otherwise degrades to ``compact``.
+
+Every conversion is logged with sizes and duration (``pdf_output ...``).
+"""
+from __future__ import annotations
+
+import io
+import logging
+import time
+
+import fitz  # PyMuPDF
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+try:
+    import pikepdf
+    LINEARIZE_AVAILABLE = True
+except ImportError:
+    LINEARIZE_AVAILABLE = False
+
+OUTPUT_MODES = ("standard", "compact", "web")
+
+
+def resolve_output(mode: str | None) -> str:
+    """Return *mode* if known, else the configured ``PDF_OUTPUT_MODE``."""
+    if mode in OUTPUT_MODES:
+        return mode
+    return settings.PDF_OUTPUT_MODE if settings.PDF_OUTPUT_MODE in OUTPUT_MODES else "standard"
+
+
+def _linearize(pdf_bytes: bytes) -> bytes:
+    if not LINEARIZE_AVAILABLE:
+        return pdf_bytes
+    out = io.BytesIO()
+    with pikepdf.open(io.BytesIO(pdf_bytes)) as pdf:
+        pdf.save(out, linearize=True, compress_streams=True)
+    return out.getvalue()
+
+
+def save_document(doc: fitz.Document, mode: str, label: str = "pdf", size_in: int = 0) -> bytes:
+    """Serialise an open PyMuPDF document in output *mode*."""
+    started = time.perf_counter()
+    if mode == "standard":
+        data = doc.tobytes()
+    else:
+        try:
+            doc.subset_fonts()
+        except Exception as exc:  # fonts without a usable program, old MuPDF…
+            logger.debug("Font subsetting skipped: %s", exc)
+        data = doc.tobytes(garbage=3, deflate=True, deflate_images=True, deflate_fonts=True, clean=True)
+        if mode == "web":
+            data = _linearize(data)
+    logger.info(
+        "pdf_output label=%s mode=%s bytes_in=%d bytes_out=%d ms=%.1f",
+        label, mode, size_in, len(data), (time.perf_counter() - started) * 1000,
+    )
+    return data
+
+
+def optimize_pdf(pdf_bytes: bytes, mode: str, label: str = "pdf") -> bytes:
+    """Return *pdf_bytes* in output *mode* (never larger than the input)."""
+    if mode == "standard":
+        return pdf_bytes
+    with fitz.open(stream=pdf_bytes, filetype="pdf") as doc:
+        data = save_document(doc, mode, label, len(pdf_bytes))
+    if len(data) >= len(pdf_bytes) and mode == "compact":
+        return pdf_bytes
+    return data
@@ -0,0 +1,131 @@
+"""Two-tier cache for rendered documents, keyed by a content hash.
+
+Keys are hex digests of everything that affects the output (see
+``generator.cv_render_key``), so entries never go stale: an edit simply
+produces a new key and old entries age out.
+
+- memory: ``TTLCache`` LRU of the most recent renders in this process
+- disk:   ``RENDER_CACHE_DIR/<key>.<ext>``, shared by all workers on the
+          host and capped at ``RENDER_CACHE_DISK_MB``; the least recently
+          used files are pruned when the cap is exceeded
+
+The disk functions block; call them through ``asyncio.to_thread``.
+"""
+from __future__ import annotations
+
+import logging
+import os
+import tempfile
+import threading
+
+from app.core.cache import TTLCache
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+_memory = TTLCache(maxsize=settings.RENDER_CACHE_MEMORY_ITEMS, ttl=24 * 3600)
+
+_disk_lock = threading.Lock()
+_disk_bytes: int | None = None  # running estimate, rescanned on prune
+
+
+def _cache_dir() -> str:
+    path = settings.RENDER_CACHE_DIR or os.path.join(tempfile.gettempdir(), "cvflow-render-cache")
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def _path(key: str, ext: str) -> str:
+    return os.path.join(_cache_dir(), f"{key}.{ext}")
+
+
+def _scan() -> list[tuple[float, int, str]]:
+    entries = []
+    with os.scandir(_cache_dir()) as it:
+        for entry in it:
+            if entry.is_file() and not entry.name.endswith(".tmp"):
+                st = entry.stat()
+                entries.append((st.st_mtime, st.st_size, entry.path))
+    return entries
+
+
+def _prune(cap: int) -> None:
+    # Caller holds _disk_lock
+    global _disk_bytes
+    entries = sorted(_scan())
+    total = sum(size for _, size, _ in entries)
+    target = int(cap * 0.9)
+    for _, size, path in entries:
+        if total <= target:
+            break
+        try:
+            os.remove(path)
+            total -= size
+        except OSError:
+            pass
+    _disk_bytes = total
+
+
+# ---------------------------------------------------------------------------
+# Public API
+# ---------------------------------------------------------------------------
+
+def get(key: str, ext: str = "pdf") -> bytes | None:
+    """Return cached bytes for *key*, or None (memory first, then disk)."""
+    data = _memory.get((key, ext))
+    if data is not None:
+        return data
+    if settings.RENDER_CACHE_DISK_MB <= 0:
+        return None
+    path = _path(key, ext)
+    try:
+        with open(path, "rb") as fh:
+            data = fh.read()
+        os.utime(path)  # mtime doubles as last-used time for pruning
+    except OSError:
+        return None
+    _memory.set((key, ext), data)
+    return data
+
+
+def put(key: str, data: bytes, ext: str = "pdf") -> None:
+    """Store *data* under *key* in both tiers (disk errors are logged only)."""
+    global _disk_bytes
+    _memory.set((key, ext), data)
+    cap = settings.RENDER_CACHE_DISK_MB * 1024 * 1024
+    if cap <= 0:
+        return
+    path = _path(key, ext)
+    tmp = None
+    try:
+        # Unique per call: threads of one process may write the same key
+        with tempfile.NamedTemporaryFile(
+            dir=os.path.dirname(path), prefix=os.path.basename(path) + ".",
+            suffix=".tmp", delete=False,
+        ) as fh:
+            tmp = fh.name
+            fh.write(data)
+        os.replace(tmp, path)  # atomic: readers never see a partial file
+    except OSError as exc:
+        logger.warning("Render cache write failed: %s", exc)
+        if tmp is not None:
+            try:
+                os.unlink(tmp)
+            except OSError:
+                pass
+        return
+    with _disk_lock:
+        if _disk_bytes is None:
+            _disk_bytes = sum(size for _, size, _ in _scan())
+        else:
+            _disk_bytes += len(data)
+        if _disk_bytes > cap:
+            _prune(cap)
+
+
+def etag_matches(if_none_match: str | None, etag: str) -> bool:
+    """True if an ``If-None-Match`` header value matches the strong *etag*."""
+    if not if_none_match:
+        return False
+    candidates = [tag.strip() for tag in if_none_match.split(",")]
+    return "*" in candidates or etag in candidates
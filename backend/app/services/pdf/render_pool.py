@@ -0,0 +1,149 @@
+"""Process pool for CPU-bound document rendering (ReportLab, python-docx).
+
+ReportLab layout is pure Python and holds the GIL, so running it on the
+event loop — or in the default thread pool — stalls every other request
+while a CV is being built.  Jobs are instead sent to a pool of worker
+processes that are started and warmed (fonts registered, paragraph styles
+built) when the app starts, so the first request does not pay for it.
+
+Workers use the ``spawn`` start method: the parent already runs gRPC
+(Firestore) and background threads, neither of which survive ``fork``.
+
+Admission is bounded: at most ``workers + RENDER_QUEUE_SIZE`` jobs may be
+queued or running; beyond that :class:`RenderQueueFull` is raised at once
+so the endpoint can answer 503 instead of piling up work.  Each job gets
+``RENDER_TIMEOUT_SECONDS``; a job still queued at the deadline is
+cancelled, one already running keeps its slot until the worker is done.
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class RenderQueueFull(RuntimeError):
+    """Raised when the render queue is at capacity."""
+
+
+class RenderTimeout(TimeoutError):
+    """Raised when a render job does not finish within its timeout."""
+
+
+_executor: ProcessPoolExecutor | None = None
+_inflight = 0
+
+
+def pool_size() -> int:
+    """Number of worker processes (``RENDER_WORKERS``, or CPUs - 1)."""
+    if settings.RENDER_WORKERS > 0:
+        return settings.RENDER_WORKERS
+    return max(1, (os.cpu_count() or 2) - 1)
+
+
+def _capacity() -> int:
+    return pool_size() + settings.RENDER_QUEUE_SIZE
+
+
+def _init_worker() -> None:
+    # Runs once in every worker process
+    from app.services.pdf import generator
+
+    generator.warm()
+
+
+def _ping() -> int:
+    return os.getpid()
+
+
+def _create_executor() -> ProcessPoolExecutor:
+    return ProcessPoolExecutor(
+        max_workers=pool_size(),
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=_init_worker,
+    )
+
+
+# ---------------------------------------------------------------------------
+# Lifecycle
+# ---------------------------------------------------------------------------
+
+async def start_render_pool() -> None:
+    """Start the worker processes and wait until each one is warmed up."""
+    global _executor
+    if _executor is not None:
+        return
+    _executor = _create_executor()
+    loop = asyncio.get_running_loop()
+    # Workers are spawned on demand; one ping per worker forces all of them
+    # up front, and the initializer finishes before a worker takes a job.
+    try:
+        pids = await asyncio.gather(*(
+            loop.run_in_executor(_executor, _ping) for _ in range(pool_size())
+        ))
+        logger.info("Render pool ready: %d workers", len(set(pids)))
+    except Exception:
+        logger.exception("Render pool warm-up failed")
+
+
+async def stop_render_pool() -> None:
+    global _executor
+    if _executor is not None:
+        executor, _executor = _executor, None
+        await asyncio.to_thread(executor.shutdown, wait=True, cancel_futures=True)
+
+
+def _get_executor() -> ProcessPoolExecutor:
+    global _executor
+    if _executor is None:
+        _executor = _create_executor()
+    return _executor
+
+
+# ---------------------------------------------------------------------------
+# Public API
+# ---------------------------------------------------------------------------
+
+async def run(fn: Callable[..., Any], *args: Any, timeout: float | None = None) -> Any:
+    """Run ``fn(*args)`` in a worker process and return its result.
+
+    *fn* and *args* must be picklable (module-level function, plain data).
+    Raises :class:`RenderQueueFull` or :class:`RenderTimeout`; exceptions
+    raised by *fn* propagate unchanged.
+    """
+    global _inflight, _executor
+    if _inflight >= _capacity():
+        raise RenderQueueFull("Rendering is busy, please retry shortly")
+
+    loop = asyncio.get_running_loop()
+    executor = _get_executor()
+    try:
+        job = executor.submit(fn, *args)
+    except BrokenProcessPool:
+        # A worker died (OOM kill…): replace the pool and retry once
+        logger.warning("Render pool broken, restarting it")
+        if _executor is executor:
+            _executor = None
+        executor.shutdown(wait=False, cancel_futures=True)
+        job = _get_executor().submit(fn, *args)
+
+    def _release(_future) -> None:
+        global _inflight
+        _inflight -= 1
+
+    _inflight += 1
+    job.add_done_callback(lambda f: loop.call_soon_threadsafe(_release, f))
+
+    timeout = settings.RENDER_TIMEOUT_SECONDS if timeout is None else timeout
+    try:
+        return await asyncio.wait_for(asyncio.wrap_future(job), timeout)
+    except asyncio.TimeoutError:
+        raise RenderTimeout(f"Rendering took longer than {timeout:g}s") from None
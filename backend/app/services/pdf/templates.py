@@ -0,0 +1,329 @@
+"""
+CV template registry.
+
+Each template declares its page geometry, colour palette, header style and
+the section renderers that fill each column (names resolved by
+``generator.SECTION_RENDERERS``).  :func:`compile_template` turns a
+declaration into paragraph styles and a ``PageTemplate`` once per process
+and page size; the generator only assembles flowables.
+
+Ids match the public catalog in ``api/v1/endpoints/templates.py``.
+"""
+from __future__ import annotations
+
+import threading
+from dataclasses import dataclass, field
+from functools import lru_cache, partial
+
+from reportlab.lib import colors
+from reportlab.lib.enums import TA_CENTER, TA_LEFT, TA_RIGHT
+from reportlab.lib.pagesizes import A4, letter
+from reportlab.lib.styles import ParagraphStyle, getSampleStyleSheet
+from reportlab.lib.units import mm
+from reportlab.platypus import Frame, PageTemplate
+
+from app.services.pdf.fonts import font_pair
+
+DEFAULT_TEMPLATE = "olive"
+
+PAGE_SIZES = {"a4": A4, "letter": letter}
+
+
+# ---------------------------------------------------------------------------
+# Declarations
+# ---------------------------------------------------------------------------
+
+@dataclass(frozen=True)
+class Palette:
+    accent: str                     # header bar / rules
+    heading: str                    # name, section titles
+    text: str = "#1a1a1a"
+    muted: str = "#606c38"          # dates, secondary text
+    divider: str = "#c8d5b9"        # thin divider lines
+    header_text: str = "#ffffff"    # name on a filled header bar
+    header_sub: str = "#283618"     # job title on a filled header bar
+    sidebar_bg: str | None = None
+
+
+@dataclass(frozen=True)
+class Geometry:
+    margin_h: float = 18 * mm       # left/right margin
+    margin_bot: float = 14 * mm     # bottom margin
+    header_h: float = 62            # header area height, from the page top
+    header_gap: float = 10          # gap between header area and content
+    name_y: float = 36              # name baseline, from the page top
+    title_y: float = 51             # job title baseline, from the page top
+    name_size: float = 18
+    sidebar_w: float = 0            # 0 = single column
+    sidebar_gap: float = 10         # gap between main and sidebar
+    sidebar_left: bool = False
+
+
+@dataclass(frozen=True)
+class CVTemplate:
+    id: str
+    palette: Palette
+    geometry: Geometry = field(default_factory=Geometry)
+    header: str = "bar"             # "bar" | "rule" | "centered"
+    main: tuple[str, ...] = ()
+    sidebar: tuple[str, ...] = ()
+    serif: bool = False
+    body_size: float = 8.5
+    upper_headings: bool = True
+
+
+_SINGLE_COLUMN = (
+    "contact_line", "summary", "experience", "education", "projects",
+    "certifications", "skills_inline", "languages_inline",
+)
+_RULE_HEADER = Geometry(header_h=66, header_gap=12, name_y=38, title_y=54, name_size=20)
+_CENTERED_HEADER = Geometry(header_h=66, header_gap=8, name_y=38, title_y=54, name_size=20)
+
+TEMPLATES: dict[str, CVTemplate] = {t.id: t for t in [
+    CVTemplate(
+        id="olive",
+        palette=Palette(accent="#dda15e", heading="#283618"),
+        geometry=Geometry(sidebar_w=128),
+        main=("summary", "experience", "education", "certifications", "projects"),
+        sidebar=("contact", "skills", "languages"),
+    ),
+    CVTemplate(
+        id="slate",
+        palette=Palette(accent="#708090", heading="#2f3e4c", muted="#708090", divider="#d5dbe1"),
+        geometry=_RULE_HEADER,
+        header="rule",
+        main=_SINGLE_COLUMN,
+        body_size=9,
+    ),
+    CVTemplate(
+        id="azure",
+        palette=Palette(
+            accent="#007FFF", heading="#005bb5", muted="#5a6b7b", divider="#cfe3f7",
+            header_sub="#e6f2ff", sidebar_bg="#F5F5F5",
+        ),
+        geometry=Geometry(sidebar_w=140, sidebar_left=True),
+        main=("summary", "experience", "education", "projects"),
+        sidebar=("contact", "skills", "languages", "certifications"),
+    ),
+    CVTemplate(
+        id="bordeaux",
+        palette=Palette(accent="#722F37", heading="#722F37", muted="#7a5c60", divider="#e3cfd1"),
+        geometry=_CENTERED_HEADER,
+        header="centered",
+        main=_SINGLE_COLUMN,
+        serif=True,
+        body_size=9,
+    ),
+    CVTemplate(
+        id="tokyo",
+        palette=Palette(accent="#FF6B6B", heading="#2D3436", muted="#636e72", divider="#fab1a0"),
+        geometry=Geometry(sidebar_w=135),
+        main=("summary", "experience", "projects", "education"),
+        sidebar=("contact", "skills", "languages", "certifications"),
+    ),
+    CVTemplate(
+        id="cambridge",
+        palette=Palette(accent="#1B4F72", heading="#1B4F72", muted="#5d6d7e", divider="#d4e1ec"),
+        geometry=_CENTERED_HEADER,
+        header="centered",
+        main=(
+            "contact_line", "summary", "education", "experience", "certifications",
+            "projects", "skills_inline", "languages_inline",
+        ),
+        serif=True,
+        body_size=9,
+    ),
+    CVTemplate(
+        id="berlin",
+        palette=Palette(
+            accent="#2ECC71", heading="#1e8449", muted="#5f6a6a", divider="#d5f5e3",
+            sidebar_bg="#ECEFF1",
+        ),
+        geometry=Geometry(
+            header_h=66, header_gap=12, name_y=38, title_y=54, name_size=20,
+            sidebar_w=140, sidebar_left=True,
+        ),
+        header="rule",
+        main=("summary", "experience", "education", "projects"),
+        sidebar=("contact", "skills", "languages", "certifications"),
+    ),
+    CVTemplate(
+        id="silicon",
+        palette=Palette(accent="#333333", heading="#333333", muted="#666666", divider="#dddddd"),
+        geometry=_RULE_HEADER,
+        header="rule",
+        main=(
+            "contact_line", "summary", "experience", "projects", "skills_inline",
+            "education", "certifications", "languages_inline",
+        ),
+        body_size=9,
+    ),
+    CVTemplate(
+        id="paris",
+        palette=Palette(accent="#C0A062", heading="#333333", muted="#8c7a5b", divider="#eadfc8"),
+        geometry=_CENTERED_HEADER,
+        header="centered",
+        main=_SINGLE_COLUMN,
+        serif=True,
+        body_size=9,
+        upper_headings=False,
+    ),
+    CVTemplate(
+        id="nova",
+        palette=Palette(
+            accent="#9B59B6", heading="#E74C3C", muted="#3498DB", divider="#d7bde2",
+            header_sub="#f5eef8",
+        ),
+        geometry=Geometry(sidebar_w=135),
+        main=("summary", "experience", "projects", "education"),
+        sidebar=("contact", "skills", "languages", "certifications"),
+    ),
+]}
+
+
+def get_template(template_id: str | None) -> CVTemplate:
+    """Return the template declaration, falling back to the default."""
+    return TEMPLATES.get(template_id or DEFAULT_TEMPLATE) or TEMPLATES[DEFAULT_TEMPLATE]
+
+
+# ---------------------------------------------------------------------------
+# Compilation
+# ---------------------------------------------------------------------------
+
+class CompiledTemplate:
+    """Styles, colours and page template of one template at one page size.
+
+    Built once per process by :func:`compile_template`.  The shared
+    ``PageTemplate`` carries frame state while a document is being built,
+    so builds on the same compiled template take ``lock``.
+    """
+
+    def __init__(self, template: CVTemplate, page_size: str):
+        g, p = template.geometry, template.palette
+        self.template = template
+        self.id = template.id
+        self.page_size = PAGE_SIZES.get(page_size, A4)
+        self.page_w, self.page_h = self.page_size
+        self.font, self.font_bold = font_pair(template.serif)
+        self.colors = {name: colors.HexColor(value) for name, value in vars(p).items() if value}
+
+        self.content_w = self.page_w - 2 * g.margin_h
+        self.content_h = self.page_h - g.header_h - g.header_gap - g.margin_bot
+        self.two_column = bool(template.sidebar) and g.sidebar_w > 0
+        if self.two_column:
+            self.sidebar_w = g.sidebar_w
+            self.main_w = self.content_w - g.sidebar_w - g.sidebar_gap
+        else:
+            self.sidebar_w = 0.0
+            self.main_w = self.content_w
+
+        self.styles = self._build_styles()
+        self.lock = threading.Lock()
+        frame = Frame(
+            g.margin_h, g.margin_bot, self.content_w, self.content_h,
+            leftPadding=0, rightPadding=0, topPadding=0, bottomPadding=0,
+            id="body",
+        )
+        self.page_template = PageTemplate(
+            id=template.id, frames=[frame], onPage=partial(_draw_page, self),
+        )
+
+    def width(self, column: str) -> float:
+        """Usable width of a column (inside the body table padding)."""
+        if column == "sidebar":
+            return self.sidebar_w - self.template.geometry.sidebar_gap
+        return self.main_w - 4 if self.two_column else self.main_w
+
+    def heading(self, title: str) -> str:
+        return title.upper() if self.template.upper_headings else title
+
+    def _build_styles(self) -> dict[str, dict[str, ParagraphStyle]]:
+        normal = getSampleStyleSheet()["Normal"]
+        b, c, tid = self.template.body_size, self.colors, self.id
+
+        def style(name: str, size: float, leading: float, color: str, **kw) -> ParagraphStyle:
+            kw.setdefault("fontName", self.font)
+            return ParagraphStyle(
+                f"{tid}_{name}", parent=normal, fontSize=size, leading=leading,
+                textColor=c[color], **kw,
+            )
+
+        centered = self.template.header == "centered"
+        return {
+            "main": {
+                "title": style("section_title", b - 0.5, b + 2.5, "heading",
+                               fontName=self.font_bold, spaceBefore=8, spaceAfter=1),
+                "body": style("body", b, b + 4, "text"),
+                "meta": style("small_right", b - 1, b + 2.5, "muted", alignment=TA_RIGHT),
+                "bullet": style("bullet", b - 0.5, b + 3, "text", leftIndent=10, spaceAfter=1),
+                "contact": style("contact", b - 0.5, b + 3, "muted",
+                                 alignment=TA_CENTER if centered else TA_LEFT, spaceAfter=2),
+            },
+            "sidebar": {
+                "title": style("sidebar_section", b - 1, b + 1.5, "heading",
+                               fontName=self.font_bold, spaceBefore=8, spaceAfter=1),
+                "body": style("sidebar_body", b - 1, b + 2.5, "text"),
+                "meta": style("sidebar_meta", b - 1.5, b + 1.5, "muted"),
+                "bullet": style("sidebar_skill", b - 1, b + 1.5, "heading", leftIndent=6),
+                "contact": style("sidebar_contact", b - 1, b + 2.5, "text"),
+            },
+        }
+
+
+@lru_cache(maxsize=None)
+def compile_template(template_id: str | None, page_size: str = "a4") -> CompiledTemplate:
+    """Return the compiled template (built on first use, then reused)."""
+    return CompiledTemplate(get_template(template_id), page_size)
+
+
+# ---------------------------------------------------------------------------
+# Page decoration (header + sidebar band), drawn on every page
+# ---------------------------------------------------------------------------
+
+def _draw_page(ct: CompiledTemplate, canvas, doc) -> None:
+    g, c = ct.template.geometry, ct.colors
+    header = getattr(doc, "cv_header", None) or {}
+    name = (header.get("name") or "")[:65]
+    subtitle = (header.get("subtitle") or "")[:90]
+    top = ct.page_h
+
+    canvas.saveState()
+    if ct.two_column and "sidebar_bg" in c:
+        band_w = g.margin_h + ct.sidebar_w - g.sidebar_gap / 2
+        band_x = 0 if g.sidebar_left else ct.page_w - band_w
+        canvas.setFillColor(c["sidebar_bg"])
+        canvas.rect(band_x, 0, band_w, top - g.header_h, fill=1, stroke=0)
+
+    kind = ct.template.header
+    if kind == "bar":
+        canvas.setFillColor(c["accent"])
+        canvas.rect(0, top - g.header_h, ct.page_w, g.header_h, fill=1, stroke=0)
+        name_color, sub_color = c["header_text"], c["header_sub"]
+    else:
+        name_color, sub_color = c["heading"], c["muted"]
+
+    if kind == "centered":
+        mid = ct.page_w / 2
+        canvas.setFillColor(name_color)
+        canvas.setFont(ct.font_bold, g.name_size)
+        canvas.drawCentredString(mid, top - g.name_y, name)
+        if subtitle:
+            canvas.setFillColor(sub_color)
+            canvas.setFont(ct.font, 9.5)
+            canvas.drawCentredString(mid, top - g.title_y, subtitle)
+        canvas.setStrokeColor(c["accent"])
+        canvas.setLineWidth(0.8)
+        canvas.line(mid - 60, top - g.header_h + 4, mid + 60, top - g.header_h + 4)
+    else:
+        canvas.setFillColor(name_color)
+        canvas.setFont(ct.font_bold, g.name_size)
+        canvas.drawString(g.margin_h, top - g.name_y, name)
+        if subtitle:
+            canvas.setFillColor(sub_color)
+            canvas.setFont(ct.font, 9)
+            canvas.drawString(g.margin_h, top - g.title_y, subtitle)
+        if kind == "rule":
+            canvas.setStrokeColor(c["accent"])
+            canvas.setLineWidth(1.2)
+            canvas.line(g.margin_h, top - g.header_h + 4, ct.page_w - g.margin_h, top - g.header_h + 4)
+    canvas.restoreState()
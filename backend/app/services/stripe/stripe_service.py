@@ -1,11 +1,60 @@
 """Stripe payment service."""
+from __future__ import annotations
+
+import json
+import logging
 
 import stripe
 from app.core.config import settings
+from app.services.firebase.billing_service import (
+    drop_legacy_invoices,
+    get_event,
+    link_customer,
+    linked_customers,
+    mark_event,
+    uid_for_customer,
+    unprocessed_event_ids,
+    upsert_invoice,
+)
+from app.services.firebase.user_service import update_user
+
+logger = logging.getLogger(__name__)
+
+# Failed webhook events are replayed at startup until they reach this many attempts
+MAX_EVENT_ATTEMPTS = 5
 
 stripe.api_key = settings.STRIPE_SECRET_KEY
 
 
+# ---------------------------------------------------------------------------
+# Async client  (one pooled httpx connection pool per process)
+# ---------------------------------------------------------------------------
+
+_http_client: stripe.HTTPXClient | None = None
+_client: stripe.StripeClient | None = None
+
+
+def get_client() -> stripe.StripeClient:
+    """Return the shared StripeClient; use its ``*_async`` methods from endpoints."""
+    global _http_client, _client
+    if _client is None:
+        _http_client = stripe.HTTPXClient(timeout=20)
+        _client = stripe.StripeClient(
+            settings.STRIPE_SECRET_KEY,
+            http_client=_http_client,
+            max_network_retries=2,
+        )
+    return _client
+
+
+async def close_client() -> None:
+    """Close the pooled connections (app shutdown)."""
+    global _http_client, _client
+    if _http_client is not None:
+        await _http_client.close_async()
+    _http_client = _client = None
+
+
 async def create_checkout_session(
     user_uid: str,
     user_email: str,
@@ -19,42 +68,54 @@ async def create_checkout_session(
         else settings.STRIPE_PRICE_ID_PRO
     )
 
-    session = stripe.checkout.Session.create(
-        customer_email=user_email,
-        payment_method_types=["card"],
-        line_items=[{"price": price_id, "quantity": 1}],
-        mode="subscription",
-        success_url="http://localhost:3066/dashboard?checkout=success",
-        cancel_url="http://localhost:3066/dashboard?checkout=cancel",
-        metadata={"user_uid": user_uid, "plan": plan},
-    )
+    session = await get_client().checkout.sessions.create_async(params={
+        "customer_email": user_email,
+        "payment_method_types": ["card"],
+        "line_items": [{"price": price_id, "quantity": 1}],
+        "mode": "subscription",
+        "success_url": "http://localhost:3066/dashboard?checkout=success",
+        "cancel_url": "http://localhost:3066/dashboard?checkout=cancel",
+        "metadata": {"user_uid": user_uid, "plan": plan},
+    })
 
     return {"checkout_url": session.url, "session_id": session.id}
 
 
 async def create_portal_session(customer_id: str) -> dict:
     """Create a Stripe customer portal session."""
-    session = stripe.billing_portal.Session.create(
-        customer=customer_id,
-        return_url="http://localhost:3066/dashboard/settings",
-    )
+    session = await get_client().billing_portal.sessions.create_async(params={
+        "customer": customer_id,
+        "return_url": "http://localhost:3066/dashboard/settings",
+    })
     return {"portal_url": session.url}
 
 
-async def get_customer_invoices(customer_id: str) -> list:
-    """Get customer invoice history."""
-    invoices = stripe.Invoice.list(customer=customer_id, limit=20)
-    return [
-        {
-            "id": inv.id,
-            "date": inv.created,
-            "amount": inv.amount_paid / 100,
-            "currency": inv.currency.upper(),
-            "status": inv.status,
-            "pdf_url": inv.invoice_pdf,
-        }
-        for inv in invoices.data
-    ]
+async def backfill_invoices() -> int:
+    """Copy every invoice of every known customer into the local ledger.
+
+    One-off command for invoices issued before the webhook kept the ledger
+    (``python -m app.scripts.backfill_invoices``).  Idempotent.  Returns the
+    number of invoices written.
+    """
+    written = 0
+    for customer_id, uid in linked_customers():
+        params = {"customer": customer_id, "limit": 100}
+        while True:
+            page = await get_client().invoices.list_async(params=params)
+            for invoice in page.data:
+                if invoice.status == "paid":
+                    upsert_invoice(uid, invoice, "paid")
+                elif invoice.status == "open" and invoice.get("attempt_count"):
+                    upsert_invoice(uid, invoice, "failed")
+                else:
+                    continue
+                written += 1
+            if not page.has_more or not page.data:
+                break
+            params["starting_after"] = page.data[-1].id
+        drop_legacy_invoices(uid)
+        logger.info("Backfilled invoices for customer %s", customer_id)
+    return written
 
 
 def verify_webhook_signature(payload: bytes, signature: str) -> dict:
@@ -65,42 +126,81 @@ def verify_webhook_signature(payload: bytes, signature: str) -> dict:
     return event
 
 
-async def handle_webhook_event(event: dict, db) -> None:
-    """Handle a Stripe webhook event."""
+def handle_webhook_event(event: dict) -> None:
+    """Apply a Stripe webhook event to Firestore.
+
+    Handlers are idempotent (plain field sets, invoices keyed by their Stripe
+    id) so replaying an event from the ledger is safe.  Users are resolved
+    through the ``stripe_customers`` index instead of a query.
+    """
     event_type = event["type"]
+    obj = event["data"]["object"]
+    customer_id = obj.get("customer")
 
     if event_type == "checkout.session.completed":
-        session = event["data"]["object"]
-        user_uid = session["metadata"].get("user_uid")
-        plan = session["metadata"].get("plan", "starter")
-        customer_id = session.get("customer")
-
-        if user_uid:
-            user_ref = db.collection("users").document(user_uid)
-            user_ref.update({
-                "plan": plan,
-                "stripe_customer_id": customer_id,
-                "subscription_status": "active",
-            })
-
-    elif event_type == "customer.subscription.deleted":
-        subscription = event["data"]["object"]
-        customer_id = subscription["customer"]
-
-        # Find user by customer_id and downgrade
-        users = db.collection("users").where("stripe_customer_id", "==", customer_id).limit(1).get()
-        for user_doc in users:
-            user_doc.reference.update({
-                "plan": "free",
-                "subscription_status": "canceled",
-            })
+        metadata = obj.get("metadata") or {}
+        user_uid = (
+            obj.get("client_reference_id")
+            or metadata.get("uid")
+            or metadata.get("user_uid")
+        )
+        if not user_uid:
+            return
+        if customer_id:
+            link_customer(customer_id, user_uid)
+        update_user(user_uid, {
+            "plan": metadata.get("plan", "starter"),
+            "billing_cycle": metadata.get("billing_cycle", "monthly"),
+            "stripe_customer_id": customer_id,
+            "stripe_subscription_id": obj.get("subscription"),
+            "subscription_status": "active",
+        })
+        return
+
+    user_uid = uid_for_customer(customer_id) if customer_id else None
+    if not user_uid:
+        return
+
+    if event_type == "customer.subscription.deleted":
+        update_user(user_uid, {
+            "plan": "free",
+            "subscription_status": "canceled",
+        })
+
+    elif event_type == "invoice.paid":
+        upsert_invoice(user_uid, obj, "paid")
 
     elif event_type == "invoice.payment_failed":
-        invoice = event["data"]["object"]
-        customer_id = invoice["customer"]
-
-        users = db.collection("users").where("stripe_customer_id", "==", customer_id).limit(1).get()
-        for user_doc in users:
-            user_doc.reference.update({
-                "subscription_status": "past_due",
-            })
+        upsert_invoice(user_uid, obj, "failed")
+        update_user(user_uid, {"subscription_status": "past_due"})
+
+
+def process_event(event_id: str) -> None:
+    """Background worker: process a ledger entry recorded by the webhook.
+
+    Already processed events are skipped; failures are logged and left in
+    the ledger as ``failed`` so :func:`replay_unprocessed_events` can retry.
+    """
+    entry = get_event(event_id)
+    if entry is None or entry.get("status") == "processed":
+        return
+    if entry.get("attempts", 0) >= MAX_EVENT_ATTEMPTS:
+        logger.error("Stripe event %s gave up after %d attempts", event_id, entry["attempts"])
+        mark_event(event_id, "abandoned", entry.get("error"))
+        return
+    try:
+        handle_webhook_event(json.loads(entry["payload"]))
+    except Exception as exc:
+        logger.exception("Stripe event %s (%s) failed", event_id, entry.get("type"))
+        mark_event(event_id, "failed", str(exc))
+        return
+    mark_event(event_id, "processed")
+
+
+def replay_unprocessed_events() -> None:
+    """Process events left pending or failed by a previous worker (startup)."""
+    try:
+        for event_id in unprocessed_event_ids():
+            process_event(event_id)
+    except Exception:
+        logger.exception("Replaying Stripe events failed")
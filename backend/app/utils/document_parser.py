@@ -2,18 +2,13 @@
 
 from io import BytesIO
 from typing import Optional
-import PyPDF2
 
 
 def parse_pdf(file_bytes: bytes) -> str:
     """Extract text content from a PDF file."""
-    reader = PyPDF2.PdfReader(BytesIO(file_bytes))
-    text_parts = []
-    for page in reader.pages:
-        text = page.extract_text()
-        if text:
-            text_parts.append(text.strip())
-    return "\n\n".join(text_parts)
+    from app.services.pdf.extraction import extract_pdf
+
+    return extract_pdf(file_bytes).text
 
 
 def parse_docx(file_bytes: bytes) -> str:
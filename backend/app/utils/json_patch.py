@@ -0,0 +1,182 @@
+"""Minimal RFC 6902 (JSON Patch) implementation for CV content deltas."""
+
+import copy
+from typing import Any, List, Tuple
+
+
+class JsonPatchError(ValueError):
+    """Raised for malformed operations or paths that do not resolve."""
+
+
+class JsonPatchTestFailed(JsonPatchError):
+    """Raised when a ``test`` operation does not match."""
+
+
+def parse_pointer(pointer: str) -> List[str]:
+    """Split an RFC 6901 JSON Pointer into unescaped reference tokens."""
+    if pointer == "":
+        return []
+    if not pointer.startswith("/"):
+        raise JsonPatchError(f"Invalid JSON pointer: {pointer!r}")
+    return [t.replace("~1", "/").replace("~0", "~") for t in pointer[1:].split("/")]
+
+
+def _index(container: list, token: str, allow_end: bool = False) -> int:
+    if token == "-" and allow_end:
+        return len(container)
+    if not token.isdigit() or (len(token) > 1 and token.startswith("0")):
+        raise JsonPatchError(f"Invalid array index: {token!r}")
+    idx = int(token)
+    if idx > len(container) or (idx == len(container) and not allow_end):
+        raise JsonPatchError(f"Array index out of range: {token}")
+    return idx
+
+
+def _resolve(doc: Any, tokens: List[str]) -> Any:
+    node = doc
+    for token in tokens:
+        if isinstance(node, dict):
+            if token not in node:
+                raise JsonPatchError(f"Path not found: /{'/'.join(tokens)}")
+            node = node[token]
+        elif isinstance(node, list):
+            node = node[_index(node, token)]
+        else:
+            raise JsonPatchError(f"Path not found: /{'/'.join(tokens)}")
+    return node
+
+
+def _parent(doc: Any, tokens: List[str]) -> Tuple[Any, str]:
+    if not tokens:
+        raise JsonPatchError("Operations on the document root are not supported")
+    return _resolve(doc, tokens[:-1]), tokens[-1]
+
+
+def _add(doc: Any, tokens: List[str], value: Any) -> None:
+    parent, key = _parent(doc, tokens)
+    if isinstance(parent, dict):
+        parent[key] = value
+    elif isinstance(parent, list):
+        parent.insert(_index(parent, key, allow_end=True), value)
+    else:
+        raise JsonPatchError(f"Cannot add to a scalar at /{'/'.join(tokens)}")
+
+
+def _remove(doc: Any, tokens: List[str]) -> Any:
+    parent, key = _parent(doc, tokens)
+    if isinstance(parent, dict):
+        if key not in parent:
+            raise JsonPatchError(f"Path not found: /{'/'.join(tokens)}")
+        return parent.pop(key)
+    if isinstance(parent, list):
+        return parent.pop(_index(parent, key))
+    raise JsonPatchError(f"Path not found: /{'/'.join(tokens)}")
+
+
+def apply_patch(doc: Any, operations: List[dict]) -> Any:
+    """Apply *operations* to a deep copy of *doc* and return the result.
+
+    Supports add, remove, replace, move, copy and test.  The input is never
+    mutated, so a failing patch leaves the original untouched.
+    """
+    result = copy.deepcopy(doc)
+    for op in operations:
+        name = op.get("op")
+        tokens = parse_pointer(op.get("path", ""))
+        if name == "add":
+            _add(result, tokens, copy.deepcopy(op.get("value")))
+        elif name == "remove":
+            _remove(result, tokens)
+        elif name == "replace":
+            _remove(result, tokens)
+            _add(result, tokens, copy.deepcopy(op.get("value")))
+        elif name in ("move", "copy"):
+            if "from" not in op:
+                raise JsonPatchError(f"'{name}' operation requires 'from'")
+            from_tokens = parse_pointer(op["from"])
+            if name == "move":
+                if tokens[:len(from_tokens)] == from_tokens and tokens != from_tokens:
+                    raise JsonPatchError("Cannot move a value into one of its children")
+                value = _remove(result, from_tokens)
+            else:
+                value = copy.deepcopy(_resolve(result, from_tokens))
+            _add(result, tokens, value)
+        elif name == "test":
+            if _resolve(result, tokens) != op.get("value"):
+                raise JsonPatchTestFailed(f"Test failed at {op.get('path')}")
+        else:
+            raise JsonPatchError(f"Unsupported operation: {name!r}")
+    return result
+
+
+def touched_paths(doc: Any, operations: List[dict]) -> List[List[str]]:
+    """Return the minimal set of map-only paths modified by *operations*.
+
+    Firestore field paths cannot address array elements, so each path is cut
+    just before the first array it enters (the whole array is rewritten).
+    Paths nested under another touched path are dropped.
+    """
+    paths: List[List[str]] = []
+    for op in operations:
+        if op.get("op") == "test":
+            continue
+        pointers = [op.get("path", "")]
+        if op.get("op") == "move":
+            pointers.append(op.get("from", ""))
+        for pointer in pointers:
+            tokens = parse_pointer(pointer)
+            cut: List[str] = []
+            node = doc
+            for token in tokens:
+                if not isinstance(node, dict):
+                    break
+                cut.append(token)
+                node = node.get(token)
+            if cut:
+                paths.append(cut)
+
+    paths.sort(key=len)
+    minimal: List[List[str]] = []
+    for path in paths:
+        if not any(path[:len(p)] == p for p in minimal):
+            minimal.append(path)
+    return minimal
+
+
+def _escape(token: str) -> str:
+    return token.replace("~", "~0").replace("/", "~1")
+
+
+def make_patch(old: Any, new: Any, pointer: str = "") -> List[dict]:
+    """Return operations that turn *old* into *new* (``apply_patch`` inverse).
+
+    Dicts are diffed key by key and equal-length lists element by element;
+    lists that only grew get ``add`` operations at ``-``.  Anything else is
+    a ``replace`` of the whole value, which keeps the output small for the
+    typical "one field edited" case without a full LCS diff.
+    """
+    if old == new:
+        return []
+    if isinstance(old, dict) and isinstance(new, dict):
+        ops: List[dict] = []
+        for key in old:
+            if key not in new:
+                ops.append({"op": "remove", "path": f"{pointer}/{_escape(key)}"})
+        for key, value in new.items():
+            path = f"{pointer}/{_escape(key)}"
+            if key not in old:
+                ops.append({"op": "add", "path": path, "value": value})
+            else:
+                ops.extend(make_patch(old[key], value, path))
+        return ops
+    if isinstance(old, list) and isinstance(new, list):
+        if len(old) == len(new):
+            ops = []
+            for idx, (a, b) in enumerate(zip(old, new)):
+                ops.extend(make_patch(a, b, f"{pointer}/{idx}"))
+            return ops
+        if len(new) > len(old) and new[:len(old)] == old:
+            return [{"op": "add", "path": f"{pointer}/-", "value": v} for v in new[len(old):]]
+    if not pointer:
+        raise JsonPatchError("Cannot diff documents of different types at the root")
+    return [{"op": "replace", "path": pointer, "value": new}]